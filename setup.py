@@ -10,5 +10,6 @@ setup(
     long_description='A travel and trade game',
     author='Ross Housotn',
     author_email='ross.houston@gmail.com',
-    packages=find_packages()
+    packages=find_packages(),
+    package_data={'trader': ['*.jsonl']}
 )
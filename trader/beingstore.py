@@ -0,0 +1,149 @@
+from array import array
+from enum import IntEnum
+from trader.inventory import itemId
+from trader.occupancy import canonicalEdge
+
+
+class BeingStateCode(IntEnum):
+    NODE = 0
+    TRAVEL = 1
+    DEAD = 2
+
+
+_NO_NODE = -1
+
+
+class BeingStore:
+    """
+    Column store for where every being in a game is and what it is doing.
+    Each being gets a row and the columns are compact arrays: state code, node id (when at a node),
+    origin and destination node ids (when travelling), distance left, and fuel.
+    Being objects read and write their location through their row, and travelTick moves every
+    travelling being along in one pass over the columns.  The fuel column follows the fuel in each
+    being's inventory (inventories report every change, see inventoryChanged) so travelTick can burn
+    it without going through the inventories' change reporting.
+    Rows that change (including the goods and money of a being's inventory) are added to unsavedRows
+    so an incremental save only has to write those (see trader.savegame).
+    """
+    def __init__(self, csr):
+        """
+        csr - CSRGraph of the world (node ids come from here).
+        """
+        self._csr = csr
+        self.beings = []  # row -> Being
+        self.states = bytearray()
+        self.locations = array('l')
+        self.origins = array('l')
+        self.destinations = array('l')
+        self.distances = array('q')
+        self.fuels = array('q')
+        self.unsavedRows = set()  # Rows changed since the game was last saved
+        self._fuelId = itemId('fuel')
+
+    def __len__(self):
+        return len(self.beings)
+
+    def copy(self):
+        """Return a store with copies of all the columns but no beings (Being.fork puts them back, row by row)."""
+        retval = BeingStore.__new__(BeingStore)
+        retval._csr = self._csr
+        retval.beings = []
+        retval.states = bytearray(self.states)
+        retval.locations = array('l', self.locations)
+        retval.origins = array('l', self.origins)
+        retval.destinations = array('l', self.destinations)
+        retval.distances = array('q', self.distances)
+        retval.fuels = array('q', self.fuels)
+        retval.unsavedRows = set()
+        retval._fuelId = self._fuelId
+        return retval
+
+    def add(self, being):
+        """
+        Give a being a row (at no node) and return the row number.
+        being - Being object.
+        """
+        self.beings.append(being)
+        self.states.append(BeingStateCode.NODE)
+        self.locations.append(_NO_NODE)
+        self.origins.append(_NO_NODE)
+        self.destinations.append(_NO_NODE)
+        self.distances.append(0)
+        self.fuels.append(0)
+        row = len(self.beings) - 1
+        self.unsavedRows.add(row)
+        return row
+
+    def inventoryChanged(self, row, inventory):
+        """
+        Note that the goods or money of a being's inventory changed (inventories call this, see Inventory.watch).
+        row - The row number of the being.
+        inventory - Its Inventory object.
+        """
+        self.unsavedRows.add(row)
+        self.fuels[row] = inventory.count(self._fuelId)
+
+    def nodeName(self, nodeId):
+        """Return the name of a node id ('' for no node)."""
+        if nodeId == _NO_NODE:
+            return ''
+        return self._csr.nodeName(nodeId)
+
+    def nodeId(self, nodeName):
+        """Return the id of a node name (-1 for '')."""
+        if nodeName == '':
+            return _NO_NODE
+        return self._csr.nodeId(nodeName)
+
+    def rowsInState(self, state):
+        """Return a list of the rows of every being in a state (a BeingStateCode)."""
+        states = self.states
+        retval = []
+        row = states.find(state)
+        while row != -1:
+            retval.append(row)
+            row = states.find(state, row + 1)
+        return retval
+
+    def beingsInState(self, state):
+        """Return a list of every Being in a state (a BeingStateCode)."""
+        beings = self.beings
+        return [beings[row] for row in self.rowsInState(state)]
+
+    def travelTick(self):
+        """
+        Move every travelling being one day along its edge, burning one fuel each.
+        The fuel and distance columns are counted down first and the new fuel counts are then copied into
+        the inventories without any change reporting, so the caller must tell the SupplyLedger about the fuel
+        burnt (it is returned totalled by edge so that is one change per edge, not one per being).
+        Only beings whose trip just ended need anything else done to them so only they are returned.
+        Returns (arrived, outOfFuel, fuelBurnt): lists of Being objects and a dictionary of canonical edge ->
+        how much fuel was burnt on it.
+        """
+        rows = self.rowsInState(BeingStateCode.TRAVEL)
+        if not rows:
+            return ([], [], {})
+        fuels = self.fuels
+        distances = self.distances
+        for row in rows:
+            fuels[row] -= 1
+            distances[row] -= 1
+        self.unsavedRows.update(rows)
+
+        beings = self.beings
+        fuelId = self._fuelId
+        origins = self.origins
+        destinations = self.destinations
+        burnt = {}  # (origin id, destination id) -> fuel burnt going that way
+        for row in rows:
+            beings[row].inventory.setCountQuietly(fuelId, fuels[row])
+            key = (origins[row], destinations[row])
+            burnt[key] = burnt.get(key, 0) + 1
+        fuelBurnt = {}
+        for (origin, destination), amount in burnt.items():
+            edge = canonicalEdge(self.nodeName(origin), self.nodeName(destination))
+            fuelBurnt[edge] = fuelBurnt.get(edge, 0) + amount
+
+        arrived = [beings[row] for row in rows if distances[row] == 0]
+        outOfFuel = [beings[row] for row in rows if distances[row] != 0 and fuels[row] == 0]
+        return (arrived, outOfFuel, fuelBurnt)
@@ -1,9 +1,12 @@
-from enum import Enum
+from enum import Enum, IntEnum
 import itertools
 import random
+import time
+from trader.combatoracle import sampleOutcome
+from trader.eventlog import EventFamily
 
 
-class CombatEventCode(Enum):
+class CombatEventCode(IntEnum):
     DAMAGE = 1
     DEATH = 2
     ESCAPE = 3
@@ -25,11 +28,17 @@ class CombatAction(Enum):
 class Combat:
     """Manage a combat session between multiple vessels."""
     # TODO: Add some concept of groups of friendlies???
-    def __init__(self, vessels):
+    def __init__(self, vessels, emit=None, bounded=False, rng=random):
         """
-        vessels - dictionary of being names to Vessel objects to participate in the combat.
+        vessels - dictionary of being ids to Vessel objects to participate in the combat.
+        emit - A function object with args (event) that is called for every event as it happens.
+        bounded - If True the event log only keeps the last round's events.
+        rng - Where to get the dice rolls (a random.Random object or the random module).
         """
-        for vessel in vessels:
+        self._rng = rng
+        self._emit = emit
+        self._bounded = bounded
+        for vessel in vessels.values():
             assert(vessel)
 
         def maneuverability(v):
@@ -40,176 +49,384 @@ class Combat:
         # Life (hit points) is initialized to be the same as the defense rating
         self._life = {}
         for vesselPair in self._vesselPairs:
-            (beingName, vessel) = vesselPair
-            self._life[beingName] = vessel.defense
+            (beingId, vessel) = vesselPair
+            self._life[beingId] = vessel.defense
+        self._escaped = []  # Ids of the beings that got away (their life is zero too)
 
         # Initialize the event log
         self._eventLog = []
         for vesselPair in self._vesselPairs:
-            (beingName, vessel) = vesselPair
-            self._eventLog.append(JoinCombatEvent(beingName))
+            (beingId, vessel) = vesselPair
+            self._recordEvent(JoinCombatEvent(beingId))
 
     def keepGoing(self):
         """Returns true iff there is more than one combatant left."""
         numCombatants = 0
-        for beingName in self._life:
-            if self._life[beingName] > 0:
+        for beingId in self._life:
+            if self._life[beingId] > 0:
                 numCombatants += 1
         return numCombatants > 1
 
     def winner(self):
         """
-        Return the being name of the combat victor.
+        Return the being id of the combat victor.
         (or None if that hasn't been determined yet.)
         """
         if self.keepGoing():
             return None
-        for beingName in self._life:
-            if self._life[beingName] > 0:
-                return beingName
+        for beingId in self._life:
+            if self._life[beingId] > 0:
+                return beingId
         assert(False)
         return None
 
     def eventLog(self):
-        """Return the full event log for this combat."""
+        """Return the event log for this combat (just the last round's events if it is bounded)."""
         return self._eventLog
 
-    def _recordEvent(self, event, roundEvents):
+    def snapshot(self):
+        """Return a CombatSnapshot of where this combat is now (it doesn't change when the combat does)."""
+        return CombatSnapshot(tuple(beingId for (beingId, vessel) in self._vesselPairs),
+                              tuple(vessel.offense for (beingId, vessel) in self._vesselPairs),
+                              tuple(vessel.defense for (beingId, vessel) in self._vesselPairs),
+                              tuple(vessel.maneuverability for (beingId, vessel) in self._vesselPairs),
+                              [self._life[beingId] for (beingId, vessel) in self._vesselPairs],
+                              escaped=self._escaped)
+
+    def _recordEvent(self, event):
         """
         Record a combat event.
         event - The new event being recorded.
-        roundEvents - Collection of events for this round we'll add to.
         """
-        roundEvents += [event]
-        self._eventLog += [event]
+        self._eventLog.append(event)
+        if self._emit:
+            self._emit(event)
 
     def doRound(self, commands):
         """
         Do a single round of combat and return a list of CombatEvents that happened.
-        commands - Dictionary from being name -> CombatAction.
+        commands - Dictionary from being id -> CombatAction.
         Returns the combat events generated (in order) during the round.
         """
 
-        combatEvents = []  # CombatEvents for this round
+        if self._bounded:
+            del self._eventLog[:]
+        roundStart = len(self._eventLog)  # This round's events are the tail of the log
 
         # Find out which of the combatants want to flee
         fleers = []
-        for beingName in commands:
-            if commands[beingName] == CombatAction.FLEE:
-                fleers += [beingName]
+        for beingId in commands:
+            if commands[beingId] == CombatAction.FLEE:
+                fleers += [beingId]
 
         # If anybody wants to try to flee...
         if len(fleers) > 0:
             # ...everybody does an escape roll and only the best roll escapes.
-            bestEscapeRoll = [0, '']
+            bestEscapeRoll = [0, None]
             for vesselPair in self._vesselPairs:
-                (beingName, vessel) = vesselPair
-                escapeRoll = random.randint(0, vessel.maneuverability)
+                (beingId, vessel) = vesselPair
+                escapeRoll = self._rng.randint(0, vessel.maneuverability)
                 if escapeRoll > bestEscapeRoll[0]:
-                    bestEscapeRoll = [escapeRoll, beingName]
+                    bestEscapeRoll = [escapeRoll, beingId]
             if bestEscapeRoll[1] in fleers:
                 self._life[bestEscapeRoll[1]] = 0
+                self._escaped.append(bestEscapeRoll[1])
                 fleers.remove(bestEscapeRoll[1])
-                self._recordEvent(EscapeCombatEvent(bestEscapeRoll[1]), combatEvents)
+                self._recordEvent(EscapeCombatEvent(bestEscapeRoll[1]))
                 if not self.keepGoing():
-                    self._recordEvent(VictoryCombatEvent(self.winner()), combatEvents)
-                    return combatEvents
+                    self._recordEvent(VictoryCombatEvent(self.winner()))
+                    return self._eventLog[roundStart:]
             for fleer in fleers:
                 if fleer != bestEscapeRoll[1]:
-                    self._recordEvent(FailToEscapeCombatEvent(fleer), combatEvents)
+                    self._recordEvent(FailToEscapeCombatEvent(fleer))
 
         # Fight!
         for attackPair in itertools.permutations(self._vesselPairs, 2):
-            (attackBeingName, attackVessel) = attackPair[0]
-            (defendBeingName, defendVessel) = attackPair[1]
-            if self._life[attackBeingName] == 0 or self._life[defendBeingName] == 0:
+            (attackBeingId, attackVessel) = attackPair[0]
+            (defendBeingId, defendVessel) = attackPair[1]
+            if self._life[attackBeingId] == 0 or self._life[defendBeingId] == 0:
                 continue  # life of zero means you're already dead or were able to flee
-            if attackBeingName in fleers:
+            if attackBeingId in fleers:
                 continue  # If this attacker tried to flee and failed they don't get to attack
-            attackRoll = random.randint(0, attackVessel.offense)
-            defendRoll = random.randint(0, defendVessel.defense)
+            attackRoll = self._rng.randint(0, attackVessel.offense)
+            defendRoll = self._rng.randint(0, defendVessel.defense)
             if attackRoll > defendRoll:
                 damage = attackRoll - defendRoll
-                self._life[defendBeingName] -= damage
-                self._recordEvent(DamageCombatEvent(attackBeingName, defendBeingName, damage),
-                                  combatEvents)
-                if self._life[defendBeingName] <= 0:
-                    self._recordEvent(DeathCombatEvent(defendBeingName), combatEvents)
-                    self._life[defendBeingName] = 0
+                self._life[defendBeingId] -= damage
+                self._recordEvent(DamageCombatEvent(attackBeingId, defendBeingId, damage))
+                if self._life[defendBeingId] <= 0:
+                    self._recordEvent(DeathCombatEvent(defendBeingId))
+                    self._life[defendBeingId] = 0
 
         if not self.keepGoing():
-            self._recordEvent(VictoryCombatEvent(self.winner()), combatEvents)
-        return combatEvents
+            self._recordEvent(VictoryCombatEvent(self.winner()))
+        return self._eventLog[roundStart:]
+
+    def autoResolve(self):
+        """
+        Finish a two vessel combat in which both sides always fight in one go, by drawing how it ends
+        from trader.combatoracle instead of rolling every attack.
+        Returns the combat events that ended it (a death and a victory), or None if it can't be done
+        this way (it isn't two vessels, or the oracle can't work the fight out) and rounds have to be played.
+        """
+        if len(self._vesselPairs) != 2 or not self.keepGoing():
+            return None
+        ((firstId, firstVessel), (secondId, secondVessel)) = self._vesselPairs
+        outcome = sampleOutcome((firstVessel.offense, firstVessel.defense, self._life[firstId]),
+                                (secondVessel.offense, secondVessel.defense, self._life[secondId]),
+                                self._rng)
+        if outcome is None:
+            return None
+        (winner, lifeLeft) = outcome
+        (winnerId, loserId) = (firstId, secondId) if winner == 0 else (secondId, firstId)
+
+        if self._bounded:
+            del self._eventLog[:]
+        roundStart = len(self._eventLog)
+        self._life[winnerId] = lifeLeft
+        self._life[loserId] = 0
+        self._recordEvent(DeathCombatEvent(loserId))
+        self._recordEvent(VictoryCombatEvent(winnerId))
+        return self._eventLog[roundStart:]
+
+
+class CombatSnapshot:
+    """
+    A combat reduced to values: who is in it, their vessels' ratings, and how much life they have left.
+    Stepping a snapshot plays a round by the same rules (and with the same dice) as Combat.doRound,
+    but nobody's player is asked anything, no events are made, and no Being or Vessel is touched.
+    Clones share everything but the life list so an AI can afford thousands of them per decision.
+    """
+    __slots__ = ('ids', '_offense', '_defense', '_maneuverability', 'life', 'escaped', 'rounds')
+
+    def __init__(self, ids, offense, defense, maneuverability, life, escaped=()):
+        """
+        ids - Tuple of being ids in attack order (most maneuverable first).
+        offense, defense, maneuverability - Tuples of the vessels' ratings, in the same order.
+        life - List of how much life each has left, in the same order (zero for dead or escaped).
+        escaped - Ids of the beings that have escaped.
+        """
+        self.ids = ids
+        self._offense = offense
+        self._defense = defense
+        self._maneuverability = maneuverability
+        self.life = life
+        self.escaped = tuple(escaped)
+        self.rounds = 0  # How many rounds this snapshot (and the ones it was cloned from) has been stepped
+
+    def clone(self):
+        """Return a copy that can be stepped without changing this one."""
+        retval = CombatSnapshot.__new__(CombatSnapshot)
+        retval.ids = self.ids
+        retval._offense = self._offense
+        retval._defense = self._defense
+        retval._maneuverability = self._maneuverability
+        retval.life = list(self.life)
+        retval.escaped = self.escaped
+        retval.rounds = self.rounds
+        return retval
+
+    def lifeOf(self, beingId):
+        """Return how much life a being has left."""
+        return self.life[self.ids.index(beingId)]
+
+    def survived(self, beingId):
+        """Return True iff a being is still alive or got away."""
+        return self.lifeOf(beingId) > 0 or beingId in self.escaped
+
+    def keepGoing(self):
+        """Returns true iff there is more than one combatant left."""
+        return sum(1 for life in self.life if life > 0) > 1
+
+    def winner(self):
+        """Return the being id of the combat victor (or None if that hasn't been determined yet)."""
+        if self.keepGoing():
+            return None
+        for index, life in enumerate(self.life):
+            if life > 0:
+                return self.ids[index]
+        return None
+
+    def step(self, commands, rng=random):
+        """
+        Play one round, changing this snapshot.
+        commands - Dictionary from being id -> CombatAction.  Beings that aren't in it fight.
+        rng - Where to get the dice rolls (a random.Random object or the random module).
+        """
+        ids = self.ids
+        life = self.life
+        count = len(ids)
+        self.rounds += 1
+        fleers = [index for index in range(count) if commands.get(ids[index]) == CombatAction.FLEE]
+
+        if fleers:
+            bestRoll = 0
+            bestIndex = None
+            for index in range(count):
+                escapeRoll = rng.randint(0, self._maneuverability[index])
+                if escapeRoll > bestRoll:
+                    bestRoll = escapeRoll
+                    bestIndex = index
+            if bestIndex in fleers:
+                life[bestIndex] = 0
+                fleers.remove(bestIndex)
+                self.escaped += (ids[bestIndex],)
+                if not self.keepGoing():
+                    return
+
+        offense = self._offense
+        defense = self._defense
+        for attacker in range(count):
+            for defender in range(count):
+                if attacker == defender or life[attacker] == 0 or life[defender] == 0 or attacker in fleers:
+                    continue
+                attackRoll = rng.randint(0, offense[attacker])
+                defendRoll = rng.randint(0, defense[defender])
+                if attackRoll > defendRoll:
+                    life[defender] = max(life[defender] - (attackRoll - defendRoll), 0)
+
+    def rollout(self, policy, rng=random, maxRounds=100):
+        """
+        Return a clone that has been stepped until the combat is over (or maxRounds more rounds have been played).
+        policy - A function object with args (snapshot) that returns the commands for the next round.
+        rng - Where to get the dice rolls.
+        maxRounds - Most rounds to play.
+        """
+        retval = self.clone()
+        for x in range(maxRounds):
+            if not retval.keepGoing():
+                break
+            retval.step(policy(retval), rng)
+        return retval
+
+
+def fightPolicy(snapshot):
+    """A rollout policy where everybody always fights."""
+    return {}
+
+
+def evaluateCombatActions(snapshot, beingId, policy=fightPolicy, rollouts=100, timeBudget=None, rng=random,
+                          maxRounds=100):
+    """
+    Estimate how likely a being is to survive a combat after each action it could take this round.
+    Each action is tried as the being's command for the next round (everybody else follows policy)
+    and then the combat is rolled out with policy.  Actions take turns so they get the same number of rollouts.
+    Returns a dictionary of CombatAction -> fraction of rollouts the being survived (lived or escaped).
+    snapshot - CombatSnapshot of the combat.
+    beingId - Id of the being that is deciding.
+    policy - A function object with args (snapshot) that returns the commands for a round.
+    rollouts - How many rollouts to do for each action.
+    timeBudget - If not None, stop early once this many seconds have gone by.
+    rng - Where to get the dice rolls.
+    maxRounds - Most rounds to play in each rollout.
+    """
+    deadline = None if timeBudget is None else time.perf_counter() + timeBudget
+    survived = dict((action, 0) for action in CombatAction)
+    played = 0
+    while played < rollouts:
+        if deadline is not None and played and time.perf_counter() > deadline:
+            break
+        for action in CombatAction:
+            trial = snapshot.clone()
+            commands = dict(policy(trial))
+            commands[beingId] = action
+            trial.step(commands, rng)
+            if trial.rollout(policy, rng, maxRounds).survived(beingId):
+                survived[action] += 1
+        played += 1
+    return dict((action, survived[action] / played) for action in CombatAction)
 
 
 class CombatEvent:
     """Base class for all events possible in combat."""
+    __slots__ = ('eventCode',)
+    family = EventFamily.COMBAT
+
     def __init__(self, eventCode):
         """
         eventCode - CombatEvent that identifies the most derived class.
         """
-        self.eventCode = eventCode
+        self.eventCode = int(eventCode)
+
+    def columns(self):
+        """Return (actor, target, amount) for a ColumnarEventLog."""
+        return (self.being, None, 0)
 
 
 class DamageCombatEvent(CombatEvent):
     """Attacker has inflicted damage on a defender."""
+    __slots__ = ('attacker', 'defender', 'damage')
+
     def __init__(self, attacker, defender, damage):
         """
-        attacker - Name of the attacking being.
-        defender - Name of the defending being.
+        attacker - Id of the attacking being.
+        defender - Id of the defending being.
         damage - Amount of damage inflicted.
         """
         CombatEvent.__init__(self, CombatEventCode.DAMAGE)
-        self.attacker = str(attacker)
-        self.defender = str(defender)
+        self.attacker = attacker
+        self.defender = defender
         self.damage = int(damage)
 
+    def columns(self):
+        return (self.attacker, self.defender, self.damage)
+
 
 class DeathCombatEvent(CombatEvent):
     """A being has been destroyed."""
+    __slots__ = ('being',)
+
     def __init__(self, being):
         """
-        being - Name of the being destroyed.
+        being - Id of the being destroyed.
         """
         CombatEvent.__init__(self, CombatEventCode.DEATH)
-        self.being = str(being)
+        self.being = being
 
 
 class EscapeCombatEvent(CombatEvent):
     """A being has successfully escaped combat."""
+    __slots__ = ('being',)
+
     def __init__(self, being):
         """
-        being - Name of the being that escaped.
+        being - Id of the being that escaped.
         """
         CombatEvent.__init__(self, CombatEventCode.ESCAPE)
-        self.being = str(being)
+        self.being = being
 
 
 class FailToEscapeCombatEvent(CombatEvent):
     """A being has tried to escape combat and failed."""
+    __slots__ = ('being',)
+
     def __init__(self, being):
         """
-        being - Name of the being that tried to escape and failed.
+        being - Id of the being that tried to escape and failed.
         """
         CombatEvent.__init__(self, CombatEventCode.FAIL_TO_ESCAPE)
-        self.being = str(being)
+        self.being = being
 
 
 class JoinCombatEvent(CombatEvent):
     """A being has joined combat."""
+    __slots__ = ('being',)
+
     def __init__(self, being):
         """
-        vessel - Name of the vessel that joined.
+        being - Id of the being that joined.
         """
         CombatEvent.__init__(self, CombatEventCode.JOIN)
-        self.being = str(being)
+        self.being = being
 
 
 class VictoryCombatEvent(CombatEvent):
     """A being has won combat."""
+    __slots__ = ('being',)
+
     def __init__(self, being):
         """
-        vessel - Name of the vessel that won.
+        being - Id of the being that won.
         """
         CombatEvent.__init__(self, CombatEventCode.VICTORY)
-        self.being = str(being)
+        self.being = being
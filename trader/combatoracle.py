@@ -0,0 +1,127 @@
+"""
+Exact outcomes of a combat between two vessels that both always fight.
+
+Every round the first vessel (the more maneuverable one) attacks and then, if it is still alive, the
+second attacks back.  An attack does attackRoll - defendRoll damage when that is positive, where the
+rolls are uniform on 0..offense and 0..defense.  So the whole fight depends only on each side's
+offense, defense, and life, and its outcome distribution can be worked out once by dynamic
+programming over (first's life, second's life) and cached for those stats.
+"""
+from bisect import bisect_right
+from functools import lru_cache
+
+
+MAX_WORK = 5000000  # Fights that would take more steps than this to work out aren't (see combatOutcomes)
+
+
+@lru_cache(maxsize=1024)
+def damageOdds(offense, defense):
+    """Return a tuple where element k is the chance that an attack does k damage (element 0 is a miss)."""
+    odds = [0.0] * (offense + 1)
+    chance = 1.0 / ((offense + 1) * (defense + 1))
+    for attackRoll in range(offense + 1):
+        for defendRoll in range(defense + 1):
+            odds[max(attackRoll - defendRoll, 0)] += chance
+    return tuple(odds)
+
+
+@lru_cache(maxsize=4096)
+def combatOutcomes(first, second):
+    """
+    Return the outcomes of a two vessel fight as a tuple of (winner, life left, chance), most likely first.
+    winner is 0 if the first vessel wins and 1 if the second does.
+    Returns None if the fight can't be worked out: somebody starts with no life, neither side can hurt
+    the other (so it never ends), or it is too big to be worth it (see MAX_WORK).
+    first - (offense, defense, life) of the vessel that attacks first.
+    second - (offense, defense, life) of the vessel that attacks second.
+    """
+    (firstOffense, firstDefense, firstLife) = first
+    (secondOffense, secondDefense, secondLife) = second
+    if firstLife <= 0 or secondLife <= 0 or (firstOffense <= 0 and secondOffense <= 0):
+        return None
+    firstOdds = damageOdds(max(firstOffense, 0), secondDefense)
+    secondOdds = damageOdds(max(secondOffense, 0), firstDefense)
+    bothMiss = firstOdds[0] * secondOdds[0]
+    size = firstLife + secondLife
+    if firstLife * secondLife * (len(firstOdds) + len(secondOdds)) * size > MAX_WORK:
+        return None
+
+    # An outcome vector has the chance of the first winning with 1..firstLife life left at 0..firstLife-1
+    # and the chance of the second winning with 1..secondLife left after that.
+    # attacking[a][b] is the outcome vector when the first is about to attack with a life to the second's b,
+    # defending[a][b] when the second is about to attack back.  A round where both miss comes back to
+    # the same state, which is solved for instead of recursed into.
+    attacking = [[None] * (secondLife + 1) for a in range(firstLife + 1)]
+    defending = [[None] * (secondLife + 1) for a in range(firstLife + 1)]
+    for a in range(1, firstLife + 1):
+        for b in range(1, secondLife + 1):
+            firstHits = [0.0] * size
+            for damage in range(1, len(firstOdds)):
+                chance = firstOdds[damage]
+                if not chance:
+                    continue
+                if damage >= b:
+                    firstHits[a - 1] += chance
+                else:
+                    outcome = defending[a][b - damage]
+                    for i in range(size):
+                        firstHits[i] += chance * outcome[i]
+            secondHits = [0.0] * size
+            for damage in range(1, len(secondOdds)):
+                chance = secondOdds[damage]
+                if not chance:
+                    continue
+                if damage >= a:
+                    secondHits[firstLife + b - 1] += chance
+                else:
+                    outcome = attacking[a - damage][b]
+                    for i in range(size):
+                        secondHits[i] += chance * outcome[i]
+            # attack = firstOdds[0] * defend + firstHits and defend = secondOdds[0] * attack + secondHits
+            attack = [(firstOdds[0] * secondHits[i] + firstHits[i]) / (1.0 - bothMiss) for i in range(size)]
+            attacking[a][b] = attack
+            defending[a][b] = [secondOdds[0] * attack[i] + secondHits[i] for i in range(size)]
+
+    final = attacking[firstLife][secondLife]
+    outcomes = [(0, i + 1, final[i]) for i in range(firstLife) if final[i] > 0.0]
+    outcomes += [(1, i + 1, final[firstLife + i]) for i in range(secondLife) if final[firstLife + i] > 0.0]
+    outcomes.sort(key=lambda outcome: -outcome[2])
+    return tuple(outcomes)
+
+
+def winChance(first, second):
+    """Return the chance that the first vessel wins (or None if combatOutcomes can't say)."""
+    outcomes = combatOutcomes(first, second)
+    if outcomes is None:
+        return None
+    return sum(chance for (winner, lifeLeft, chance) in outcomes if winner == 0)
+
+
+@lru_cache(maxsize=4096)
+def _cumulative(first, second):
+    """Return (outcomes, running totals of their chances) for sampling."""
+    outcomes = combatOutcomes(first, second)
+    if outcomes is None:
+        return None
+    totals = []
+    total = 0.0
+    for (winner, lifeLeft, chance) in outcomes:
+        total += chance
+        totals.append(total)
+    return (outcomes, totals)
+
+
+def sampleOutcome(first, second, rng):
+    """
+    Draw how a fight ends with a single random number.
+    Returns (winner, life left) like combatOutcomes (or None if combatOutcomes can't say).
+    first, second - See combatOutcomes.
+    rng - Where to get the random number (a random.Random object or the random module).
+    """
+    table = _cumulative(first, second)
+    if table is None:
+        return None
+    (outcomes, totals) = table
+    index = min(bisect_right(totals, rng.random() * totals[-1]), len(outcomes) - 1)
+    (winner, lifeLeft, chance) = outcomes[index]
+    return (winner, lifeLeft)
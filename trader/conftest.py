@@ -0,0 +1,56 @@
+import random
+import networkx as nx
+import pytest
+from trader.players.randomPlayer import RandomPlayer
+
+
+# The ways of running a game that forking, replaying, seeking, and saving all have to cope with.
+# They don't all play out the same as each other: eventDriven games don't roll events on the days they skip
+# so fights go differently, and batchTravel games can pair beings up differently (see Game).
+GAME_OPTIONS = [{}, {'batchTravel': True}, {'eventDriven': True, 'lazyEvents': True}, {'autoResolveCombat': True}]
+
+
+def _snapshot(game):
+    return (game.day,
+            [(being.name, being.isDead(), being.currentLocation, being.destination, being.lastDestination,
+              being.inventory.money, sorted(being.inventory.goods.items()),
+              being.inventory.vessel.offense, len(being.inventory.vessel.upgrades)) for being in game.beings])
+
+
+def _players():
+    return [RandomPlayer(verbose=False) for x in range(4)]
+
+
+def _randomGraph(nodeCount, edgeCount, seed):
+    rng = random.Random(seed)
+    graph = nx.Graph()
+    for i in range(nodeCount):
+        graph.add_node('node{0}'.format(i), events=[])
+    while graph.number_of_edges() < edgeCount:
+        (node1, node2) = rng.sample(list(graph), 2)
+        graph.add_edge(node1, node2, weight=rng.randint(1, 50))
+    return graph
+
+
+@pytest.fixture(params=GAME_OPTIONS, ids=lambda gameOptions: ','.join(gameOptions) or 'default')
+def gameOptions(request):
+    """Game keyword arguments for each of GAME_OPTIONS."""
+    return request.param
+
+
+@pytest.fixture
+def snapshot():
+    """A function object with args (game) that returns what a game's beings look like, for comparing games."""
+    return _snapshot
+
+
+@pytest.fixture
+def players():
+    """A function object that returns a new list of four RandomPlayers."""
+    return _players
+
+
+@pytest.fixture
+def randomGraph():
+    """A function object with args (nodeCount, edgeCount, seed) that returns a random weighted networkx graph."""
+    return _randomGraph
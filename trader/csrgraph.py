@@ -0,0 +1,133 @@
+from array import array
+from bisect import bisect_left
+import networkx as nx
+
+
+def _sharedAttributes(attributes, shared):
+    """
+    Return a node attribute dictionary with its lists made tuples, reusing an equal one from before if there is one.
+    attributes - The node's networkx attribute dictionary.
+    shared - Dictionary of key -> attribute dictionary already handed out.
+    """
+    attributes = dict((name, tuple(value) if isinstance(value, list) else value) for name, value in attributes.items())
+    try:
+        key = tuple(sorted((name, tuple(map(id, value)) if isinstance(value, tuple) else id(value))
+                           for name, value in attributes.items()))
+    except TypeError:
+        return attributes  # Attribute names that can't be sorted
+    return shared.setdefault(key, attributes)
+
+
+class CSRGraph:
+    """
+    A read-only, compact copy of a world graph for the queries a game makes every turn.
+    Nodes get integer ids (in the order networkx lists them), adjacency is stored in
+    compressed sparse row form (an offsets array into a sorted targets array), and edge
+    weights sit in an array parallel to the targets.  Neighbor and distance lookups are
+    then just array indexing instead of networkx's dict of dicts.
+    The networkx graph is still what worlds are written with; this is built from it at load and
+    is then the only copy a World keeps (toNetworkx builds a networkx graph again when one is wanted).
+    """
+    def __init__(self, graph):
+        """
+        graph - networkx graph of the world.  Every edge needs an integer 'weight'.
+        """
+        self._names = tuple(graph.nodes())
+        self._ids = dict((name, nodeId) for nodeId, name in enumerate(self._names))
+        shared = {}  # Nodes with the same attributes share one dictionary (most nodes have the same events)
+        self._attributes = tuple(_sharedAttributes(graph.nodes[name], shared) for name in self._names)
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        self._weights = array('q')
+        for name in self._names:
+            neighborIds = sorted(self._ids[neighbor] for neighbor in graph.neighbors(name))
+            for neighborId in neighborIds:
+                self._targets.append(neighborId)
+                self._weights.append(int(graph[name][self._names[neighborId]]['weight']))
+            self._offsets.append(len(self._targets))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def nodes(self):
+        """Return a tuple of all node names in id order."""
+        return self._names
+
+    def nodeId(self, name):
+        """Return the integer id of a node."""
+        return self._ids[name]
+
+    def nodeName(self, nodeId):
+        """Return the name of the node with an integer id."""
+        return self._names[nodeId]
+
+    def neighborIds(self, nodeId):
+        """Return an array of the ids of a node's neighbors (sorted)."""
+        return self._targets[self._offsets[nodeId]:self._offsets[nodeId + 1]]
+
+    def neighbors(self, name):
+        """Return a tuple of the names of a node's neighbors."""
+        nodeId = self._ids[name]
+        names = self._names
+        return tuple(names[neighborId] for neighborId in self._targets[self._offsets[nodeId]:self._offsets[nodeId + 1]])
+
+    def degree(self, name):
+        """Return how many edges a node has."""
+        nodeId = self._ids[name]
+        return self._offsets[nodeId + 1] - self._offsets[nodeId]
+
+    def _edgeIndex(self, id1, id2):
+        start = self._offsets[id1]
+        end = self._offsets[id1 + 1]
+        i = bisect_left(self._targets, id2, start, end)
+        if i == end or self._targets[i] != id2:
+            return None
+        return i
+
+    def weightById(self, id1, id2):
+        """Return the weight of the edge between two node ids.  Raises KeyError if there isn't one."""
+        i = self._edgeIndex(id1, id2)
+        if i is None:
+            raise KeyError((self._names[id1], self._names[id2]))
+        return self._weights[i]
+
+    def weight(self, name1, name2):
+        """Return the weight of the edge between two nodes.  Raises KeyError if there isn't one."""
+        return self.weightById(self._ids[name1], self._ids[name2])
+
+    def hasEdge(self, name1, name2):
+        """Return True if there is an edge between two nodes."""
+        return self._edgeIndex(self._ids[name1], self._ids[name2]) is not None
+
+    def nodeAttributes(self, name):
+        """
+        Return the attribute dictionary of a node.  Lists in it are made tuples and nodes with
+        the same attributes share a dictionary, so it must not be changed.
+        """
+        return self._attributes[self._ids[name]]
+
+    def edges(self):
+        """Generator of (name1, name2, weight) for every edge, each listed once."""
+        names = self._names
+        for nodeId in range(len(names)):
+            for i in range(self._offsets[nodeId], self._offsets[nodeId + 1]):
+                if nodeId < self._targets[i]:
+                    yield (names[nodeId], names[self._targets[i]], self._weights[i])
+
+    def toNetworkx(self):
+        """
+        Return a networkx graph with the same nodes, node attributes, and edge weights.
+        Handy for world authoring tools and anything else that wants networkx's algorithms.
+        """
+        graph = nx.Graph()
+        for nodeId, name in enumerate(self._names):
+            graph.add_node(name, **self._attributes[nodeId])
+        for (name1, name2, weight) in self.edges():
+            graph.add_edge(name1, name2, weight=weight)
+        return graph
@@ -0,0 +1,152 @@
+from array import array
+from collections import OrderedDict
+import heapq
+
+
+DENSE_NODE_LIMIT = 512  # Worlds with at most this many nodes get the whole distance matrix up front
+UNREACHABLE = -1
+
+
+class DistanceOracle:
+    """
+    Answers shortest path questions about a world: the distance and next hop between any two
+    nodes and the cheapest edge out of each node.
+    Each source node has a row of distances and first hops worked out with Dijkstra over the
+    CSR graph.  Small worlds have every row computed up front (a dense matrix).  Big worlds
+    compute rows when they are first asked for and keep the most recently used ones.
+    Edge weights can be changed after the fact and only the rows that change could affect are dropped.
+    """
+    def __init__(self, csr, denseLimit=DENSE_NODE_LIMIT, cacheSize=256):
+        """
+        csr - CSRGraph of the world.
+        denseLimit - Worlds with at most this many nodes are precomputed as a dense matrix.
+        cacheSize - How many rows to keep for worlds bigger than that.
+        """
+        self._csr = csr
+        self._weights = array('q', csr._weights)  # Our own copy so weights can change without touching the World
+        self._minEdgeWeights = array('q', (self._minEdgeWeightOf(nodeId) for nodeId in range(len(csr))))
+        self.isDense = len(csr) <= denseLimit
+        self._cacheSize = None if self.isDense else cacheSize
+        self._rows = OrderedDict()  # source id -> (distances array, first hop ids array)
+        if self.isDense:
+            for nodeId in range(len(csr)):
+                self._rows[nodeId] = self._computeRow(nodeId)
+
+    def copy(self):
+        """Return an oracle that starts out knowing what this one does but has its own edge weights."""
+        retval = DistanceOracle.__new__(DistanceOracle)
+        retval._csr = self._csr
+        retval._weights = array('q', self._weights)
+        retval._minEdgeWeights = array('q', self._minEdgeWeights)
+        retval.isDense = self.isDense
+        retval._cacheSize = self._cacheSize
+        retval._rows = OrderedDict(self._rows)  # Rows are dropped when weights change, never changed, so they can be shared
+        return retval
+
+    def _minEdgeWeightOf(self, nodeId):
+        start = self._csr._offsets[nodeId]
+        end = self._csr._offsets[nodeId + 1]
+        if start == end:
+            return UNREACHABLE
+        return min(self._weights[start:end])
+
+    def _computeRow(self, sourceId):
+        """Dijkstra from one node.  Returns (distances, first hops) indexed by node id."""
+        csr = self._csr
+        offsets = csr._offsets
+        targets = csr._targets
+        weights = self._weights
+        distances = array('q', [UNREACHABLE]) * len(csr)
+        firstHops = array('l', [UNREACHABLE]) * len(csr)
+        distances[sourceId] = 0
+        firstHops[sourceId] = sourceId
+        queue = [(0, sourceId)]
+        while queue:
+            (distance, nodeId) = heapq.heappop(queue)
+            if distance > distances[nodeId]:
+                continue
+            for i in range(offsets[nodeId], offsets[nodeId + 1]):
+                neighborId = targets[i]
+                newDistance = distance + weights[i]
+                if distances[neighborId] == UNREACHABLE or newDistance < distances[neighborId]:
+                    distances[neighborId] = newDistance
+                    firstHops[neighborId] = neighborId if nodeId == sourceId else firstHops[nodeId]
+                    heapq.heappush(queue, (newDistance, neighborId))
+        return (distances, firstHops)
+
+    def _row(self, sourceId):
+        row = self._rows.get(sourceId)
+        if row is None:
+            row = self._computeRow(sourceId)
+            self._rows[sourceId] = row
+            if self._cacheSize is not None and len(self._rows) > self._cacheSize:
+                self._rows.popitem(last=False)
+        elif self._cacheSize is not None:
+            self._rows.move_to_end(sourceId)
+        return row
+
+    def shortestDistance(self, node1, node2):
+        """Return the length of the shortest path between two nodes (or None if there isn't one)."""
+        distance = self._row(self._csr.nodeId(node1))[0][self._csr.nodeId(node2)]
+        if distance == UNREACHABLE:
+            return None
+        return distance
+
+    def nextHop(self, node1, node2):
+        """
+        Return the neighbor of node1 to travel to first on a shortest path to node2.
+        Returns None if node2 can't be reached or is node1.
+        """
+        id1 = self._csr.nodeId(node1)
+        id2 = self._csr.nodeId(node2)
+        hop = self._row(id1)[1][id2]
+        if hop == UNREACHABLE or id1 == id2:
+            return None
+        return self._csr.nodeName(hop)
+
+    def minEdgeWeight(self, node):
+        """Return the weight of the shortest edge out of a node (or None if it has no edges)."""
+        weight = self._minEdgeWeights[self._csr.nodeId(node)]
+        if weight == UNREACHABLE:
+            return None
+        return weight
+
+    def edgeWeight(self, node1, node2):
+        """Return the current weight of the edge between two adjacent nodes.  Raises KeyError if they aren't."""
+        i = self._csr._edgeIndex(self._csr.nodeId(node1), self._csr.nodeId(node2))
+        if i is None:
+            raise KeyError((node1, node2))
+        return self._weights[i]
+
+    def setEdgeWeight(self, node1, node2, weight):
+        """
+        Change the weight of an existing edge.
+        Only rows whose shortest paths could be different are dropped (and recomputed when next asked for).
+        node1, node2 - Names of the nodes at either end of the edge.
+        weight - The new weight.
+        """
+        id1 = self._csr.nodeId(node1)
+        id2 = self._csr.nodeId(node2)
+        i1 = self._csr._edgeIndex(id1, id2)
+        i2 = self._csr._edgeIndex(id2, id1)
+        if i1 is None:
+            raise KeyError((node1, node2))
+        oldWeight = self._weights[i1]
+        if weight == oldWeight:
+            return
+        self._weights[i1] = weight
+        self._weights[i2] = weight
+        self._minEdgeWeights[id1] = self._minEdgeWeightOf(id1)
+        self._minEdgeWeights[id2] = self._minEdgeWeightOf(id2)
+
+        def affected(distances):
+            d1 = distances[id1]
+            d2 = distances[id2]
+            if weight < oldWeight:
+                # A shorter edge matters if it gets either end somewhere sooner
+                return ((d1 != UNREACHABLE and (d2 == UNREACHABLE or d1 + weight < d2)) or
+                        (d2 != UNREACHABLE and (d1 == UNREACHABLE or d2 + weight < d1)))
+            # A longer edge only matters if some shortest path was using it
+            return d1 != UNREACHABLE and (d1 + oldWeight == d2 or d2 + oldWeight == d1)
+        for sourceId in [sourceId for sourceId, (distances, firstHops) in self._rows.items() if affected(distances)]:
+            del self._rows[sourceId]
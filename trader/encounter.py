@@ -1,4 +1,5 @@
 from enum import Enum
+import random
 from trader.combat import Combat, CombatEventCode
 from trader.search import Search, SearchAction, SearchEventCode
 from trader.trade import Trade
@@ -35,39 +36,52 @@ class CombatEncounterState(EncounterState):
     def state(self):
         return EncounterStateCode.COMBAT
 
-    def __init__(self, beings):
+    def __init__(self, beings, emit=None, bounded=False, rng=None, autoResolve=False):
+        """
+        beings - The Being objects in the fight.
+        emit - See Combat.
+        bounded - See Combat.
+        rng - See Combat.
+        autoResolve - If True a fight between two beings whose players both always fight is finished
+                      in one go (see Combat.autoResolve).
+        """
         combatants = {}
         for being in beings:
-            combatants[being.name] = being.inventory.vessel
-        self.cmbt = Combat(combatants)
+            combatants[being.id] = being.inventory.vessel
+        self.cmbt = Combat(combatants, emit, bounded, rng or random)
         self.beings = beings
+        self._beingsById = dict((being.id, being) for being in beings)
+        self._autoResolve = autoResolve and len(beings) == 2
         self.roundEvents = None
 
     def doTurn(self, encounter):
-        commands = {}
+        self.roundEvents = None
+        if self._autoResolve:
+            self._autoResolve = False  # The players are only asked once per fight
+            (being1, being2) = self.beings
+            if (being1.player.alwaysFights(encounter._game, being2) and
+                    being2.player.alwaysFights(encounter._game, being1)):
+                self.roundEvents = self.cmbt.autoResolve()
 
-        # Get combat actions from each player
-        for being in self.beings:
-            combatAction = being.player.chooseCombatAction(encounter._game, being, self.cmbt)
-            commands[being.name] = combatAction
+        if self.roundEvents is None:
+            commands = {}
+
+            # Get combat actions from each player
+            for being in self.beings:
+                combatAction = being.player.chooseCombatAction(encounter._game, being, self.cmbt)
+                commands[being.id] = combatAction
 
-        # Do the round
-        self.roundEvents = self.cmbt.doRound(commands)
+            # Do the round
+            self.roundEvents = self.cmbt.doRound(commands)
 
         # Report the events for the round to each player
         for being in self.beings:
-            being.player.combatEvents(None, self.roundEvents)
+            being.player.combatEvents(encounter._game, self.roundEvents)
 
-        # For each event in the last round...
+        # Anybody who died in the last round is dead for good
         for event in self.roundEvents:
-            # ...if that event was a death...
             if event.eventCode == CombatEventCode.DEATH:
-                # ...go looking through the Being objects...
-                for being in self.beings:
-                    # ...and when we find a name match...
-                    if being.name == event.being:
-                        # ...make him dead.
-                        being.makeDead()
+                self._beingsById[event.being].makeDead(encounter._game)
 
         if self.cmbt.keepGoing():
             return EncounterStateCode.COMBAT
@@ -84,8 +98,8 @@ class TradeEncounterState(EncounterState):
     def state(self):
         return EncounterStateCode.TRADE
 
-    def __init__(self, game, beings):
-        self.trade = Trade(game, beings)
+    def __init__(self, game, beings, emit=None, bounded=False):
+        self.trade = Trade(game, beings, emit, bounded)
         self.beings = beings
         assert(len(self.beings) == 2)
         self.roundEvents = None
@@ -103,10 +117,10 @@ class TradeEncounterState(EncounterState):
         commands = {}
 
         tradeAction = self.beings[0].player.chooseTradeAction(encounter._game, self.beings[0], self.beings[1])
-        commands[self.beings[0].name] = tradeAction
+        commands[self.beings[0].id] = tradeAction
 
         tradeAction = self.beings[1].player.chooseTradeAction(encounter._game, self.beings[1], self.beings[0])
-        commands[self.beings[1].name] = tradeAction
+        commands[self.beings[1].id] = tradeAction
 
         self.roundEvents = self.trade.doRound(commands)
         if self.trade.keepGoing():
@@ -124,8 +138,8 @@ class SearchAndSeizureEncounterState(EncounterState):
     def state(self):
         return EncounterStateCode.SEARCH
 
-    def __init__(self, game, beings):
-        self.search = Search(game, beings)
+    def __init__(self, game, beings, emit=None, bounded=False):
+        self.search = Search(game, beings, emit, bounded)
         self.beings = beings
         assert(len(self.beings) == 2)
         self.roundEvents = None
@@ -134,12 +148,12 @@ class SearchAndSeizureEncounterState(EncounterState):
         commands = {}
 
         searchAction = self.beings[0].player.chooseSearchAction(encounter._game, self.beings[0], self.beings[1])
-        commands[self.beings[0].name] = searchAction
+        commands[self.beings[0].id] = searchAction
 
         searchAction = self.beings[1].player.chooseSearchAction(encounter._game, self.beings[1], self.beings[0])
-        commands[self.beings[1].name] = searchAction
+        commands[self.beings[1].id] = searchAction
 
-        if commands[self.beings[0].name] == SearchAction.PASS and commands[self.beings[1].name] == SearchAction.PASS:
+        if commands[self.beings[0].id] == SearchAction.PASS and commands[self.beings[1].id] == SearchAction.PASS:
             return EncounterStateCode.END_ENCOUNTER
 
         self.roundEvents = self.search.doRound(commands)
@@ -164,25 +178,40 @@ class Encounter:
         """
         game - Game object
         beings - A list of Being objects.
-        initStates - A dictionary being name -> EncounterState
+        initStates - A dictionary being id -> EncounterState
         """
         self._game = game
         self._beings = beings
-        self._state = TradeEncounterState(game, self._beings)
+        self.id = game.newEncounterId()
+        self._emit = self._emitEvent if game.wantsEvents() else None
+        self._bounded = game.boundedLogs
+        initState = EncounterStateCode.TRADE
         for being in beings:
-            if initStates[being.name] == EncounterStateCode.SEARCH:
-                self._state = SearchAndSeizureEncounterState(game, self._beings)
-            elif initStates[being.name] == EncounterStateCode.COMBAT:
-                self._state = CombatEncounterState(self._beings)
+            if initStates[being.id] == EncounterStateCode.SEARCH:
+                initState = EncounterStateCode.SEARCH
+            elif initStates[being.id] == EncounterStateCode.COMBAT:
+                initState = EncounterStateCode.COMBAT
                 break
+        self._state = self._newState(initState)
+
+    def _newState(self, stateCode):
+        """Return a new EncounterState object for an EncounterStateCode."""
+        if stateCode == EncounterStateCode.COMBAT:
+            return CombatEncounterState(self._beings, self._emit, self._bounded, self._game.rng,
+                                        self._game.autoResolveCombat)
+        elif stateCode == EncounterStateCode.SEARCH:
+            return SearchAndSeizureEncounterState(self._game, self._beings, self._emit, self._bounded)
+        return TradeEncounterState(self._game, self._beings, self._emit, self._bounded)
+
+    def _emitEvent(self, event):
+        """Pass an event from the current state on to the game's event sinks."""
+        self._game.emitEvent(self.id, event)
 
     def doTurn(self):
         nextState = self._state.doTurn(self)
         if nextState != self._state.state():
-            if nextState == EncounterStateCode.SEARCH:
-                self._state = SearchAndSeizureEncounterState(self._game, self._beings)
-            elif nextState == EncounterStateCode.COMBAT:
-                self._state = CombatEncounterState(self._beings)
+            if nextState in (EncounterStateCode.SEARCH, EncounterStateCode.COMBAT):
+                self._state = self._newState(nextState)
             elif nextState == EncounterStateCode.END_ENCOUNTER:
                 pass
             else:
@@ -200,7 +229,7 @@ class Encounter:
     def eventLog(self):
         """
         Return the event log for the current state.
-        This function currently DOES NOT return events for previous states.
+        This function currently DOES NOT return events for previous states (use an EventSink to see everything).
         """
         return self._state.eventLog()
 
@@ -0,0 +1,66 @@
+from trader.occupancy import canonicalEdge
+
+
+class EventIndex:
+    """
+    Inverted index from places to the event profiles that can happen there.
+    It is built once when the world is loaded so the daily event refresh never has to
+    walk every profile (or re-sort every edge a profile lists) to find out what applies where.
+    """
+    def __init__(self, graph, eventProfiles):
+        """
+        graph - The world's CSRGraph.  Each node has an 'events' attribute with its local EventProfile objects.
+        eventProfiles - The global EventProfile objects.
+        """
+        self._globalProfiles = {}  # event name -> global EventProfile
+        self._nodeProfiles = {}  # (nodeName, event name) -> local EventProfile
+        self._globalNodes = {}  # event name -> tuple of node names it affects
+        self._globalEdges = {}  # event name -> tuple of canonical edges it affects
+        self._globalProfilesByNode = {}  # nodeName -> list of global EventProfile objects that can reach it
+        self._globalProfilesByEdge = {}  # canonical edge -> list of global EventProfile objects that can reach it
+
+        for eventProfile in eventProfiles:
+            self._globalProfiles[eventProfile.name] = eventProfile
+            self._globalNodes[eventProfile.name] = tuple(eventProfile.nodes)
+            for node in eventProfile.nodes:
+                self._globalProfilesByNode.setdefault(node, []).append(eventProfile)
+            edges = tuple(canonicalEdge(edge[0], edge[1]) for edge in eventProfile.edges)
+            self._globalEdges[eventProfile.name] = edges
+            for edge in edges:
+                self._globalProfilesByEdge.setdefault(edge, []).append(eventProfile)
+
+        for node in graph:
+            for eventProfile in graph.nodeAttributes(node)['events']:
+                self._nodeProfiles[(node, eventProfile.name)] = eventProfile
+
+    def globalProfile(self, eventName):
+        """Return the global EventProfile with this name (or None)."""
+        return self._globalProfiles.get(eventName)
+
+    def globalProfilesAtNode(self, nodeName):
+        """Return a list of the global EventProfile objects that can happen at a node."""
+        return self._globalProfilesByNode.get(nodeName, [])
+
+    def globalProfilesAtEdge(self, edge):
+        """Return a list of the global EventProfile objects that can happen on an edge."""
+        return self._globalProfilesByEdge.get(canonicalEdge(edge[0], edge[1]), [])
+
+    def nodesFor(self, eventName):
+        """Return a tuple of the node names a global event affects."""
+        return self._globalNodes.get(eventName, ())
+
+    def edgesFor(self, eventName):
+        """Return a tuple of the canonical edges a global event affects."""
+        return self._globalEdges.get(eventName, ())
+
+    def profile(self, eventName, nodeName=None):
+        """
+        Return the EventProfile for an event name.
+        Events local to nodeName win over global events with the same name.
+        eventName - Name of the event.
+        nodeName - Name of the node we're asking about (if any).
+        """
+        eventProfile = self._nodeProfiles.get((nodeName, eventName))
+        if eventProfile:
+            return eventProfile
+        return self._globalProfiles.get(eventName)
@@ -0,0 +1,111 @@
+from array import array
+from collections import Counter
+from enum import IntEnum
+from trader.eventsink import EventSink
+
+
+class EventFamily(IntEnum):
+    """Which kind of encounter an event came from (event codes are only unique within a family)."""
+    COMBAT = 0
+    TRADE = 1
+    SEARCH = 2
+
+
+NO_BEING = -1  # actor/target for events that don't have one
+
+
+class ColumnarEventLog(EventSink):
+    """
+    A game's history of encounter events kept as columns of machine integers instead of objects.
+    Each row is (day, encounter id, family, code, actor, target, amount) where actor and target are
+    being ids.  A row costs about 40 bytes so a million events fit in a few tens of megabytes,
+    appending is a handful of array appends, and aggregates are single passes over a column or two.
+    """
+    def __init__(self):
+        self.days = array('l')
+        self.encounters = array('l')
+        self.families = bytearray()
+        self.codes = bytearray()
+        self.actors = array('l')
+        self.targets = array('l')
+        self.amounts = array('q')
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, index):
+        """Return row index as a tuple of (day, encounterId, family, code, actor, target, amount)."""
+        return (self.days[index], self.encounters[index], self.families[index], self.codes[index],
+                self.actors[index], self.targets[index], self.amounts[index])
+
+    def __iter__(self):
+        return zip(self.days, self.encounters, self.families, self.codes, self.actors, self.targets, self.amounts)
+
+    def append(self, day, encounterId, family, code, actor=NO_BEING, target=NO_BEING, amount=0):
+        """
+        Add one row to the log.
+        day - Day the event happened on.
+        encounterId - Id of the encounter the event happened in.
+        family - EventFamily of the event.
+        code - The event's code within its family.
+        actor - Id of the being that did it (or NO_BEING).
+        target - Id of the being it was done to (or NO_BEING).
+        amount - Damage, money, or goods involved (or zero).
+        """
+        self.days.append(day)
+        self.encounters.append(encounterId)
+        self.families.append(family)
+        self.codes.append(code)
+        self.actors.append(actor)
+        self.targets.append(target)
+        self.amounts.append(amount)
+
+    def record(self, day, encounterId, event):
+        """
+        Add a combat, trade, or search event object to the log.
+        day - Day the event happened on.
+        encounterId - Id of the encounter the event happened in.
+        event - The event object.
+        """
+        (actor, target, amount) = event.columns()
+        self.append(day, encounterId, event.family, event.eventCode,
+                    NO_BEING if actor is None else actor,
+                    NO_BEING if target is None else target,
+                    amount)
+
+    def emit(self, day, encounterId, event):
+        self.record(day, encounterId, event)
+
+    def clear(self):
+        """Forget every row."""
+        self.__init__()
+
+    def _matches(self, family, code):
+        """Generator of the row numbers with a family (and code if it isn't None)."""
+        families = self.families
+        codes = self.codes
+        for index in range(len(families)):
+            if families[index] == family and (code is None or codes[index] == code):
+                yield index
+
+    def count(self, family, code=None):
+        """Return how many events of a family (and code if given) have been logged."""
+        return sum(1 for index in self._matches(family, code))
+
+    def totalAmount(self, family, code=None):
+        """Return the sum of the amounts of the events of a family (and code if given)."""
+        amounts = self.amounts
+        return sum(amounts[index] for index in self._matches(family, code))
+
+    def amountsByActor(self, family, code=None):
+        """Return a Counter of actor id -> summed amount for the events of a family (and code if given)."""
+        retval = Counter()
+        actors = self.actors
+        amounts = self.amounts
+        for index in self._matches(family, code):
+            retval[actors[index]] += amounts[index]
+        return retval
+
+    def encounterRows(self, encounterId):
+        """Return a list of the rows logged for one encounter (in order)."""
+        return [self[index] for index, logged in enumerate(self.encounters) if logged == encounterId]
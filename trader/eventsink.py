@@ -0,0 +1,109 @@
+from collections import deque
+import json
+
+
+class EventSink:
+    """
+    Base class for the things a Game streams encounter events to as they happen.
+    A sink sees every combat, trade, and search event exactly once, in order, so it can keep as much
+    or as little of a game's history as it likes while the sessions themselves keep almost none.
+    """
+    def emit(self, day, encounterId, event):
+        """
+        Receive one event.
+        day - Day the event happened on.
+        encounterId - Id of the encounter the event happened in.
+        event - The CombatEvent, TradeEvent, or SearchEvent object.
+        """
+        raise NotImplementedError("emit is virtual and must be overridden.")
+
+    def attach(self, game):
+        """
+        Called by the Game the sink is given to, before any events are emitted.
+        game - The Game object.
+        """
+        pass
+
+    def close(self):
+        """Let go of anything the sink holds on to (files and so on)."""
+        pass
+
+
+class NullSink(EventSink):
+    """Throws every event away."""
+    def emit(self, day, encounterId, event):
+        pass
+
+
+class RingBufferSink(EventSink):
+    """Keeps only the most recent events."""
+    def __init__(self, maxlen=1000):
+        """maxlen - How many events to keep."""
+        self._events = deque(maxlen=maxlen)
+
+    def __len__(self):
+        return len(self._events)
+
+    def emit(self, day, encounterId, event):
+        self._events.append((day, encounterId, event))
+
+    def events(self):
+        """Return a list of (day, encounterId, event) for the kept events, oldest first."""
+        return list(self._events)
+
+
+class FileSink(EventSink):
+    """
+    Writes every event to a file as a line of JSON:
+      {"day": 3, "encounter": 0, "family": 0, "code": 1, "actor": 0, "target": 1, "amount": 5, "text": "..."}
+    actor, target, and amount are the event's ColumnarEventLog columns (-1 for no being).
+    text is the event's description with being names in it (only for events that can describe themselves).
+    """
+    def __init__(self, f):
+        """f - Name of the file to write (it is truncated) or a file object that is open for writing."""
+        if isinstance(f, str):
+            self._file = open(f, 'w')
+            self._ownsFile = True
+        else:
+            self._file = f
+            self._ownsFile = False
+        self._game = None
+
+    def attach(self, game):
+        self._game = game
+
+    def emit(self, day, encounterId, event):
+        (actor, target, amount) = event.columns()
+        record = {'day': day,
+                  'encounter': encounterId,
+                  'family': int(event.family),
+                  'code': event.eventCode,
+                  'actor': -1 if actor is None else actor,
+                  'target': -1 if target is None else target,
+                  'amount': amount}
+        if self._game is not None and hasattr(event, 'describe'):
+            record['text'] = event.describe(self._game)
+        self._file.write(json.dumps(record))
+        self._file.write('\n')
+
+    def close(self):
+        if self._ownsFile:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+class CallbackSink(EventSink):
+    """Calls a function for every event."""
+    def __init__(self, callback):
+        """callback - A function object with args (day, encounterId, event)."""
+        self._callback = callback
+
+    def emit(self, day, encounterId, event):
+        self._callback(day, encounterId, event)
@@ -1,26 +1,26 @@
 import argparse
 from collections import Counter
+import itertools
 import random
 from trader.search import SearchAction, SearchEvent
 from trader.trade import TradeAction, TradeEvent
+from trader.beingstore import BeingStateCode, BeingStore
 from trader.combat import Combat, CombatAction, CombatEvent, DeathReason
+from trader.market import PriceEngine, SupplyLedger
 from trader.encounter import Encounter, EncounterStateCode
+from trader.eventlog import ColumnarEventLog
+from trader.inventory import GoodsView, Inventory, itemId  # noqa: F401
+from trader.occupancy import OccupancyIndex, canonicalEdge
+from trader.profiles import EventStateTable
 from trader.profiles import Vessel
 from trader.profiles import VesselUpgrade
+from trader.registry import BeingRegistry
+from trader.savegame import loadGame, saveGame
+from trader.scheduler import DayScheduler
+from trader.worldloader import loadWorld, readCustomWorld  # noqa: F401
 from typing import Optional, List, Tuple, Dict
 
 
-random.seed()
-
-
-def readCustomWorld(filename: str) -> dict:
-    worldGlobals: dict = {}
-    with open(filename) as f:
-        code = compile(f.read(), filename, 'exec')
-        exec(code, worldGlobals)
-    return worldGlobals
-
-
 class Game:
     """
     This class encapsulates the entire game.
@@ -29,23 +29,59 @@ class Game:
     It also serves as the primary interface for Player objects to interact with the game.
     """
 
-    def __init__(self, players, customWorld=None):
+    def __init__(self, players, customWorld=None, eventDriven=False, lazyEvents=False, world=None, batchTravel=False,
+                 recordEvents=False, eventSink=None, boundedLogs=False, seed=None, autoResolveCombat=False):
         """
         players - Player objects.
         customWorld - Name of a Python script that defines a custom world.
+        eventDriven - If True each call to doTurn jumps straight to the next day on which
+                      something can happen instead of stepping through idle travel days.
+        lazyEvents - If True node and edge events are only worked out the first time somebody
+                     asks for them on a given day instead of for every place every day.
+        world - An already loaded World object to play in (customWorld is ignored if this is given).
+                Worlds are never changed by a game so one World can be shared by many games.
+        batchTravel - If True every travelling being is moved along in one pass over the being store
+                      and only beings that arrive, run out of fuel, or are somewhere crowded enough
+                      for an encounter get any per-being work done.  Encounters are looked for once
+                      everybody has moved rather than after each being's turn, so when several beings
+                      could meet, who meets whom can differ from a game played without batchTravel.
+        recordEvents - If True every encounter event is kept in eventHistory (a ColumnarEventLog).
+        eventSink - An EventSink that every encounter event is streamed to as it happens.
+        boundedLogs - If True combat, trade, and search sessions only keep their last round's events
+                      so memory stays flat however long the game runs (use eventSink to see the rest).
+        seed - Seed for the game's own random numbers (event rolls, dice, starting places).
+               Players draw from elsewhere so a game can be replayed from its seed and its players' decisions.
+        autoResolveCombat - If True a fight between two beings whose players both say they always fight
+                            is decided with one draw from trader.combatoracle instead of round by round.
         """
         self.day = 0  # And on the first day Ross initialized to zero...
-        worldGlobals = {}
-        if not customWorld:
-            customWorld = 'trader/world.py'
-        # execfile(customWorld, worldGlobals)
-        worldGlobals = readCustomWorld(customWorld)
-        self.graph = worldGlobals['graph']
-        self.eventProfiles = worldGlobals['events']
-        self.items = worldGlobals['items']
+        self.seed = seed if seed is not None else random.randrange(2 ** 63)
+        self.rng = random.Random(self.seed)
+        if not world:
+            world = loadWorld(customWorld)
+        self.world = world
+        self.csr = world.csr
+        self.distanceOracle = world.distanceOracle  # Shortest paths between any two nodes
+        self.routePlanner = world.routePlanner
+        self._sharedRouting = True  # True while distanceOracle and routePlanner are shared with the World or a fork
+        self._changedEdges = {}  # Canonical edge -> weight for every edge setEdgeWeight was called for
+        self.eventProfiles = world.eventProfiles
+        self.items = world.items
+        self.eventIndex = world.eventIndex
+        self._eventLookback = world.eventLookback
         self.globalEvents = []
+        self._globalEventSet = set()
+        self.eventStates = EventStateTable(self.rng)  # What is happening where in this game (the profiles are shared)
 
         self.beings = []
+        self.beingRegistry = BeingRegistry()  # Stable integer ids for beings
+        self.beingStore = BeingStore(self.csr)  # Where every being is, in columns
+        self.batchTravel = batchTravel
+        self.autoResolveCombat = autoResolveCombat
+        self.occupancy = OccupancyIndex(self.distance, lambda: self.day)
+        self.scheduler = DayScheduler() if eventDriven else None
+        self.priceEngine = PriceEngine(self)  # Before the ledger, which tells it about supply changes
+        self.supplyLedger = SupplyLedger(self)
         playerNumber = 1
         for p in players:
             beingName = p.initGame(playerNumber)
@@ -81,14 +117,30 @@ class Game:
                           name=beingName,
                           player=p,
                           inventory=inv,
-                          initialLocation=list(self.graph)[random.randint(0, len(self.graph)-1)])
+                          initialLocation=self.csr.nodes()[self.rng.randint(0, len(self.csr)-1)])
             self.beings.append(being)
+            self.occupancy.add(being)
+            self.supplyLedger.add(being)
             playerNumber += 1
+        self.dailyUpdateBeings = self._findDailyUpdateBeings()
 
+        self.lazyEvents = lazyEvents
         self.nodeEventNames = {}  # Dictionary of nodeName -> list of event names happening there now
         self.edgeEventNames = {}  # Dictionary of (nodeName0, nodeName1) -> list of event names happening there now
+        self._nodeEventDays = {}  # Dictionary of nodeName -> day its entry in nodeEventNames was worked out for
 
         self.encounters = []
+        self._encounterBeingIds = set()  # Ids of the beings in self.encounters
+        self._nextEncounterId = 0
+        self._turnRow = None  # Being store row of the being whose turn it is (while beings take turns one at a time)
+        self.eventHistory = ColumnarEventLog() if recordEvents else None
+        self.eventSink = eventSink
+        if eventSink is not None:
+            eventSink.attach(self)
+        self.boundedLogs = boundedLogs
+        self._eventSinks = [sink for sink in (self.eventHistory, eventSink) if sink is not None]
+        self.keyframes = None  # A KeyframeWriter that is ticked at the end of every turn (if any)
+        self._saveFilename = None  # Name of the file this game was last saved to (or loaded from), for incremental saves
 
         # This doesn't do anything now, but I leave it in to validate the DOT generating stuff
         # self.generateDotFile()
@@ -99,10 +151,18 @@ class Game:
         name - Name of the Being object we're looking for.
         Will return None if no Being object with that name was found.
         """
-        for being in self.beings:
-            if being.name == name:
-                return being
-        return None
+        return self.beingRegistry.beingByName(name)
+
+    def getBeingById(self, beingId):
+        """
+        Return a Being object given its id.
+        beingId - Integer id of the Being object.
+        """
+        return self.beingRegistry.being(beingId)
+
+    def beingName(self, beingId):
+        """Return the name of the being with an id (events refer to beings by id)."""
+        return self.beingRegistry.name(beingId)
 
     def generateDotFile(self):
         """
@@ -112,34 +172,36 @@ class Game:
         this code kind of assumes in terms of picking the right colors, etc.
         """
 
+        graph = self.world.toNetworkx()
+
         # Go through all the nodes and set our current location red
         # (if it's a node)
-        for node in self.graph:
+        for node in graph:
             if node == self.currentLocation:
-                self.graph.add_node_attribute(node, color='red')
-                self.graph.add_node_attribute(node, fontcolor='red')
+                graph.add_node_attribute(node, color='red')
+                graph.add_node_attribute(node, fontcolor='red')
             else:
-                self.graph.add_node_attribute(node, color='white')
-                self.graph.add_node_attribute(node, fontcolor='white')
+                graph.add_node_attribute(node, color='white')
+                graph.add_node_attribute(node, fontcolor='white')
 
         # Normalize the weights
         weights = []
-        for edge in self.graph.edges():
-            weights.append(self.graph.edge_weight(edge[0], edge[1]))
+        for edge in graph.edges():
+            weights.append(graph.edge_weight(edge[0], edge[1]))
         minWeight = float(min(weights))
 
         # Go through all the edges and set our current location red
         # (if it's an edge)
-        for edge in self.graph.edges():
+        for edge in graph.edges():
             if self.destination in edge and self.lastDestination in edge:
-                self.graph.add_edge_attribute(edge[0], edge[1], ('color', 'red'))
+                graph.add_edge_attribute(edge[0], edge[1], ('color', 'red'))
             else:
-                self.graph.add_edge_attribute(edge[0], edge[1], ('color', 'white'))
-            normalizedWeight = self.graph.edge_weight(edge[0], edge[1]) / minWeight
-            self.graph.add_edge_attribute(edge[0], edge[1], ('len', normalizedWeight))
+                graph.add_edge_attribute(edge[0], edge[1], ('color', 'white'))
+            normalizedWeight = graph.edge_weight(edge[0], edge[1]) / minWeight
+            graph.add_edge_attribute(edge[0], edge[1], ('len', normalizedWeight))
 
         # Turn this into DOT and return the string
-        # return pygraph.graph_to_dot(self.graph)
+        # return pygraph.graph_to_dot(graph)
         assert False, 'This function does not work yet'
         # networkx.drawing.nx_pydot.write_dot(graph, path)
 
@@ -148,105 +210,129 @@ class Game:
         Return a tuple of possible destinations based on player's current location.
         being - The Being object.
         """
-        return tuple(self.graph.neighbors(being.currentLocation))
+        return self.csr.neighbors(being.currentLocation)
 
-    def _localSupply(self, nodeName):
+    def localPrices(self, nodeName):
         """
-        Return a Counter object with the local supply for a particular node and adjacent nodes and edges.
+        Return a Counter object with the local prices for a particular node.
         nodeName - Name of the node.
         """
-        retval = Counter()
-        nodesToSearch = [nodeName] + self.graph.neighbors(nodeName)
-        for node in nodesToSearch:
-            for being in self.beings:
-                if being.currentLocation == node:
-                    retval += being.inventory.goods
-                elif being.lastDestination in nodesToSearch and being.destination in nodesToSearch:
-                    retval += being.inventory.goods
-        return retval
+        return self.priceEngine.localPrices(nodeName)
 
-    def _localDemand(self, nodeName):
-        """
-        Return a Counter object with the local demand for a particular node.
-        nodeName - Name of the node.
+    def distance(self, node1, node2):
+        """Return the distance between two adjacent nodes (see distanceOracle for any two nodes)."""
+        return self.distanceOracle.edgeWeight(node1, node2)
+
+    def setEdgeWeight(self, node1, node2, weight):
+        """
+        Change the distance between two adjacent nodes for the rest of this game.
+        Beings already on the edge keep the distance they have left to their destination.  Beings going
+        opposite ways meet by the new weight: a being that has d to go is weight - d from the other end.
+        """
+        if self._sharedRouting:
+            # The World and forks share these with us until we change an edge
+            self.distanceOracle = self.distanceOracle.copy()
+            self.routePlanner = self.routePlanner.withOracle(self.distanceOracle)
+            self._sharedRouting = False
+        self.distanceOracle.setEdgeWeight(node1, node2, weight)
+        self._changedEdges[canonicalEdge(node1, node2)] = weight
+        self.routePlanner.clear()
+
+    def _routeStart(self, being):
+        """Return (node, fuel) for where a being's next route starts and the fuel it will have there."""
+        fuel = being.inventory.goods['fuel']
+        if being.currentLocation != '':
+            return (being.currentLocation, fuel)
+        return (being.destination, fuel - being._state._distance)
+
+    def planRoute(self, being, destination):
+        """
+        Return the shortest Route a being can take to a node with the fuel it has (or None if it can't get there).
+        A being that is travelling is routed from the node it is heading to (which is the first node of the route).
+        being - The Being object.
+        destination - Name of the node to get to.
         """
-        demandMod = Counter(0)
-
-        # Each node can set 'demandMod' to modify demand based on environment, culture, or history
-        nodeAttrDict = self.getNodeAttrDict(nodeName)
-        if 'demandMod' in nodeAttrDict:
-            demandMod = nodeAttrDict['demandMod']
-
-        # Events on this node modify demand
-        for item in self.items:
-            demandMod[item.name] += item.dynamicFunc(self.day, self.nodeEventNames[nodeName])
+        return self.planRoutes([(being, destination)])[0]
 
-    def localPrices(self, nodeName):
+    def planRoutes(self, beingsAndDestinations):
         """
-        Return a Counter object with the local prices for a particular node.
-        nodeName - Name of the node.
+        Plan routes for many beings at once (see planRoute).
+        beingsAndDestinations - Iterable of (Being, destination node name) tuples.
+        Returns a list with a Route (or None) for each.
         """
-        supply = self._localSupply(nodeName)
-        demand = self._localDemand(nodeName)
-        retval = Counter(0)
-        for item in self.items:
-            itemDemand = (demand[item.name]*10) + 100
-            itemSupply = min(supply[item.name], 10)
-            # factor = (itemDemand / itemSupply)
-            retval[item.name] = item.price * (itemDemand / itemSupply)
-        return retval
+        queries = []
+        for (being, destination) in beingsAndDestinations:
+            (source, fuel) = self._routeStart(being)
+            queries.append((source, destination, max(fuel, 0)))
+        return self.routePlanner.planRoutes(queries)
 
-    def distance(self, node1, node2):
-        """Return the distance between two nodes."""
-        return int(self.getEdgeAttrDict(node1, node2)['weight'])
-
-    def _calculateAndSetNodeEvents(self, nodeName):
+    def _calculateAndSetNodeEvents(self, nodeName, day):
         """
         Calculates and returns a tuple of event names happening on a given node.
         nodeName - Name of a node.
+        day - The day to calculate the events for.
         """
         assert(nodeName)
         nodeAttrDict = self.getNodeAttrDict(nodeName)
         eventNames = []
         events = nodeAttrDict['events']
         for eventProfile in events:
-            if eventProfile.isHappening(self.day, eventNames):
+            if eventProfile.isHappening(day, eventNames, self.eventStates, nodeName):
+                eventNames.append(eventProfile.name)
+        for eventProfile in self.eventIndex.globalProfilesAtNode(nodeName):
+            if eventProfile.name in self._globalEventSet:
                 eventNames.append(eventProfile.name)
-        for eventProfile in self.eventProfiles:
-            if eventProfile.name in self.globalEvents:
-                if nodeName in eventProfile.nodes:
-                    eventNames.append(eventProfile.name)
         self.nodeEventNames[nodeName] = eventNames
+        self._nodeEventDays[nodeName] = day
+
+    def getNodeEvents(self, nodeName):
+        """
+        Return a list of the names of events happening on a node today.
+        nodeName - Name of a node.
+        """
+        lastDay = self._nodeEventDays.get(nodeName)
+        if lastDay != self.day:
+            # Nobody has looked at this node for a while.  Roll the days an event that is
+            # still going on today could have started on, then today itself.
+            firstDay = max(self.day - self._eventLookback, 1)
+            if lastDay is not None:
+                firstDay = max(firstDay, lastDay + 1)
+            for day in range(firstDay, self.day + 1):
+                self._calculateAndSetNodeEvents(nodeName, day)
+        return self.nodeEventNames[nodeName]
 
     def getCurrentNodeEvents(self, being):
         assert(being.currentLocation != '')
         assert(being.lastDestination == '')
         assert(being.destination == '')
-        return self.nodeEventNames[being.currentLocation]
+        return self.getNodeEvents(being.currentLocation)
 
-    def _calculateAndSetEdgeEvents(self, edgeName):
+    def _calculateAndSetEdgeEvents(self):
         """
-        Calculate and return the names of events happening on this edge.
-        edgeName - Tuple of two node names that define an edge.
+        Calculate and set the names of events happening on edges.
+        Only global events happen on edges so only the edges they affect are touched.
         """
-        assert(edgeName[0])
-        assert(edgeName[1])
-        eventNames = []
-        for eventProfile in self.eventProfiles:
-            if eventProfile.name in self.globalEvents:
-                currentEdge = sorted([edgeName[0], edgeName[1]])
-                for edge in eventProfile.edges:
-                    if currentEdge == sorted(edge):
-                        eventNames.append(eventProfile.name)
-        canonicalEdgeName = tuple(sorted([edgeName[0], edgeName[1]]))
-        self.edgeEventNames[canonicalEdgeName] = eventNames
+        self.edgeEventNames = {}
+        for eventName in self.globalEvents:
+            for edge in self.eventIndex.edgesFor(eventName):
+                self.edgeEventNames.setdefault(edge, []).append(eventName)
+
+    def getEdgeEvents(self, edge):
+        """
+        Return a list of the names of events happening on an edge today.
+        edge - Tuple of two node names that define an edge.
+        """
+        edge = canonicalEdge(edge[0], edge[1])
+        if self.lazyEvents and edge not in self.edgeEventNames:
+            self.edgeEventNames[edge] = [eventProfile.name for eventProfile in self.eventIndex.globalProfilesAtEdge(edge)
+                                         if eventProfile.name in self._globalEventSet]
+        return self.edgeEventNames.get(edge, [])
 
     def getCurrentEdgeEvents(self, being):
         assert(being.currentLocation == '')
         assert(being.lastDestination != '')
         assert(being.destination != '')
-        canonicalEdgeName = tuple(sorted([being.lastDestination, being.destination]))
-        return self.edgeEventNames[canonicalEdgeName]
+        return self.getEdgeEvents((being.lastDestination, being.destination))
 
     def getNodeEventDescription(self, eventName, being):
         """
@@ -257,15 +343,9 @@ class Game:
         being - The Being object (from which we'll get the location).
         returns - A string describing the event.
         """
-        nodeAttrDict = self.getNodeAttrDict(being.currentLocation)
-        eventProfiles = nodeAttrDict['events']
-        for eventProfile in eventProfiles:
-            if eventProfile.name == eventName:
-                return eventProfile.description
-        for eventProfile in self.eventProfiles:
-            if eventProfile.name == eventName:
-                return eventProfile.description
-        assert(False)  # This event can't happen at this node!
+        eventProfile = self.eventIndex.profile(eventName, being.currentLocation)
+        assert(eventProfile)  # This event can't happen at this node!
+        return eventProfile.description
 
     def encounterCheck(self, being):
         """
@@ -274,63 +354,288 @@ class Game:
         """
         if being.isDead():  # Skip the dead
             return
+        if being.id in self._encounterBeingIds:
+            return  # Already busy
 
         if being.currentLocation != '':  # Node
-            for otherBeing in self.beings:
-                if otherBeing.name == being.name:
-                    continue  # Skip yourself
-                if otherBeing.isDead():
-                    continue  # Skip the dead
-                if otherBeing.currentLocation == being.currentLocation:
-                    self.createEncounter(being, otherBeing)
-                    return
+            candidates = self.occupancy.beingsAtNode(being.currentLocation)
         else:  # Edge
-            for otherBeing in self.beings:
-                if otherBeing.name == being.name:
-                    continue  # Skip yourself
-                if otherBeing.isDead():
-                    continue  # Skip the dead
-                if sorted([otherBeing.lastDestination, otherBeing.destination]) == sorted([being.lastDestination, being.destination]):  # noqa: E501
-                    # These two are on the same edge, check their distances
-                    if otherBeing.destination == being.destination:  # same direction
-                        if being._state._distance == otherBeing._state._distance:
-                            self.createEncounter(being, otherBeing)
-                            return
-                    else:  # opposing directions
-                        distance = self.distance(being.lastDestination, being.destination)
-                        if being._state._distance + otherBeing._state._distance == distance:
-                            self.createEncounter(being, otherBeing)
-                            return
+            # Only beings at the same position (same direction) or exactly opposite us (opposing direction) count
+            edge = canonicalEdge(being.lastDestination, being.destination)
+            distance = self.distance(being.lastDestination, being.destination)
+            distanceLeft = being._state._distance
+            candidates = (self._beingsAtPosition(edge, being.destination, distanceLeft) +
+                          self._beingsAtPosition(edge, being.lastDestination, distance - distanceLeft))
+        for otherBeing in candidates:
+            if otherBeing is being:
+                continue  # Skip yourself
+            if otherBeing.isDead():
+                continue  # Skip the dead
+            if self.createEncounter(being, otherBeing):
+                return
+
+    def _beingsAtPosition(self, edge, destination, distanceLeft):
+        """
+        Return the beings on an edge heading to destination that are distanceLeft from it right now.
+        The occupancy index files travelling beings by the day they arrive, which is only their position
+        once they have moved today.  When beings take their turns one at a time, the ones whose turn
+        hasn't come yet are still a day further back.
+        """
+        beings = self.occupancy.beingsAtPosition(edge, destination, distanceLeft)
+        if self._turnRow is None:
+            return beings
+        return ([otherBeing for otherBeing in beings if otherBeing._row <= self._turnRow] +
+                [otherBeing for otherBeing in self.occupancy.beingsAtPosition(edge, destination, distanceLeft - 1)
+                 if otherBeing._row > self._turnRow])
 
     def createEncounter(self, being1, being2):
         """
         Create an encounter between two beings.
         being1 - Being object.
         being2 - Being object.
+        Returns True iff the encounter was created (it isn't if either being is already in one).
         """
 
         # If either of these beings are already in an encounter bug out
-        for encounter in self.encounters:
-            for being in encounter._beings:
-                if being.name == being1 or being.name == being2:
-                    return
+        if being1.id in self._encounterBeingIds or being2.id in self._encounterBeingIds:
+            return False
+        self._encounterBeingIds.add(being1.id)
+        self._encounterBeingIds.add(being2.id)
 
         # Call each player to get initState
         initStates = {}
-        initStates[being1.name] = being1.player.voteInitState(self, being2)
-        initStates[being2.name] = being2.player.voteInitState(self, being1)
+        initStates[being1.id] = being1.player.voteInitState(self, being2)
+        initStates[being2.id] = being2.player.voteInitState(self, being1)
 
         # Create the encounter and put it in the collection
         self.encounters.append(Encounter(self,
                                          [being1, being2],
                                          initStates))
+        return True
+
+    def wantsEvents(self):
+        """Return True if anybody is listening for encounter events."""
+        return len(self._eventSinks) > 0
+
+    def emitEvent(self, encounterId, event):
+        """
+        Send an encounter event to the event history and event sink.
+        encounterId - Id of the encounter the event happened in.
+        event - The CombatEvent, TradeEvent, or SearchEvent object.
+        """
+        for sink in self._eventSinks:
+            sink.emit(self.day, encounterId, event)
+
+    def newEncounterId(self):
+        """Return an id for a new encounter (unique within this game)."""
+        encounterId = self._nextEncounterId
+        self._nextEncounterId += 1
+        return encounterId
+
+    def captureState(self):
+        """
+        Return everything about this game that changes as it is played, as plain data.
+        That is the day, the random number generator, every being (where it is, what it is doing,
+        and what it has), what events are going on, and any edge weights that were changed.
+        Indexes and caches are left out because they can be rebuilt from the rest (each being carries
+        its OccupancyIndex entry so the index can be rebuilt in the same order).
+        The World and the players are left out too; restoreState puts the state into a Game that has them.
+        """
+        state = self._captureGameState()
+        state['beings'] = [self._captureBeing(being) for being in self.beings]
+        state['eventStates'] = self.eventStates.snapshot()
+        return state
+
+    def captureChanges(self):
+        """
+        Return what captureState would but with only what changed since forgetChanges was last called:
+        'beings' only has the beings in beingStore.unsavedRows and 'eventStates' is what EventStateTable.changes returns.
+        """
+        state = self._captureGameState()
+        beings = self.beingStore.beings
+        state['beings'] = [self._captureBeing(beings[row]) for row in sorted(self.beingStore.unsavedRows)]
+        state['eventStates'] = self.eventStates.changes()
+        return state
+
+    def forgetChanges(self):
+        """Start keeping track of what changes from now on (see captureChanges)."""
+        self.beingStore.unsavedRows.clear()
+        self.eventStates.unsavedSlots.clear()
+
+    def _captureBeing(self, being):
+        store = self.beingStore
+        row = being._row
+        inventory = being.inventory
+        return (being.name, store.states[row], store.locations[row], store.origins[row],
+                store.destinations[row], store.distances[row],
+                dict(inventory.goods), inventory.money, inventory.vessel, self.occupancy.entry(being))
+
+    def _captureGameState(self):
+        """Return the parts of captureState that aren't about beings or events."""
+        return {'day': self.day,
+                'seed': self.seed,
+                'rng': self.rng.getstate(),
+                'globalEvents': list(self.globalEvents),
+                'nodeEventNames': dict((node, list(names)) for node, names in self.nodeEventNames.items()),
+                'edgeEventNames': dict((edge, list(names)) for edge, names in self.edgeEventNames.items()),
+                'nodeEventDays': dict(self._nodeEventDays),
+                'nextEncounterId': self._nextEncounterId,
+                'scheduler': self.scheduler.snapshot() if self.scheduler else None,
+                'changedEdges': [(node1, node2, weight) for (node1, node2), weight in self._changedEdges.items()]}
+
+    def restoreState(self, state):
+        """
+        Put this game into a state returned by captureState.
+        The game must be in the same World and have the same players (in the same order).
+        state - Dictionary returned by captureState.
+        """
+        self.day = state['day']
+        self.seed = state['seed']
+        self.rng.setstate(state['rng'])
+        self.eventStates.restore(state['eventStates'])
+        self.globalEvents = list(state['globalEvents'])
+        self._globalEventSet = set(self.globalEvents)
+        self.nodeEventNames = dict((node, list(names)) for node, names in state['nodeEventNames'].items())
+        self.edgeEventNames = dict((edge, list(names)) for edge, names in state['edgeEventNames'].items())
+        self._nodeEventDays = dict(state['nodeEventDays'])
+        self._nextEncounterId = state['nextEncounterId']
+        if self.scheduler and state['scheduler']:
+            self.scheduler.restore(state['scheduler'])
+
+        changedEdges = dict(((node1, node2), weight) for (node1, node2, weight) in state['changedEdges'])
+        for (node1, node2, weight) in self.csr.edges():
+            weight = changedEdges.get(canonicalEdge(node1, node2), weight)
+            if self.distance(node1, node2) != weight:
+                self.setEdgeWeight(node1, node2, weight)
+
+        # Put every being back and rebuild the supply counts and the occupancy index from scratch
+        self.supplyLedger = SupplyLedger(self)
+        store = self.beingStore
+        entries = []
+        for (name, stateCode, location, origin, destination, distance, goods, money, vessel, entry) in state['beings']:
+            being = self.beingRegistry.beingByName(name)
+            row = being._row
+            being.inventory.attach(None, None)
+            being.inventory.goods = goods
+            being.inventory.money = money
+            being.inventory.vessel = vessel
+            store.states[row] = stateCode
+            store.locations[row] = location
+            store.origins[row] = origin
+            store.destinations[row] = destination
+            store.distances[row] = distance
+            being._dead = stateCode == BeingStateCode.DEAD
+            being._state = _newBeingState(being, self)
+            if not being._dead:
+                self.supplyLedger.add(being)
+            if entry is not None:
+                entries.append((being, entry))
+        self.occupancy.rebuild(entries)
+        self.dailyUpdateBeings = self._findDailyUpdateBeings()
+        store.unsavedRows.update(range(len(store)))
+        self.priceEngine.invalidate()
+        self.encounters = []
+        self._encounterBeingIds = set()
+
+    def _findDailyUpdateBeings(self):
+        """
+        Return the set of living beings whose players want to hear about every travel day.
+        This is worked out once and then kept up to date as beings die.
+        """
+        return set(being for being in self.beings if not being.isDead() and being.player.wantsDailyUpdates())
+
+    def fork(self, policy=None):
+        """
+        Return a copy of this game that can be played on without changing this one (for looking ahead).
+        Forking is cheap.  The World is shared, shortest paths and route searches are shared until either
+        game changes an edge weight, and inventories share their goods until either game changes them.
+        The copy doesn't record events, stream them to sinks, or take keyframes.
+        Only fork between turns.
+        policy - A function object with args (being) that returns the Player object to play that being in the copy.
+                 None means the copy is played by this game's Player objects.
+        """
+        assert(not self.encounters)
+        clone = type(self).__new__(type(self))
+        clone.day = self.day
+        clone.seed = self.seed
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        clone.world = self.world
+        clone.csr = self.csr
+        clone.distanceOracle = self.distanceOracle
+        clone.routePlanner = self.routePlanner
+        clone._sharedRouting = self._sharedRouting = True
+        clone._changedEdges = dict(self._changedEdges)
+        clone.eventProfiles = self.eventProfiles
+        clone.items = self.items
+        clone.eventIndex = self.eventIndex
+        clone._eventLookback = self._eventLookback
+        clone.globalEvents = list(self.globalEvents)
+        clone._globalEventSet = set(self._globalEventSet)
+        clone.eventStates = EventStateTable(clone.rng)
+        clone.eventStates.restore(self.eventStates.snapshot())
+
+        clone.beings = []
+        clone.beingRegistry = BeingRegistry()
+        clone.beingStore = self.beingStore.copy()
+        for being in self.beings:
+            clone.beings.append(being.fork(clone, policy(being) if policy else being.player))
+        clone.batchTravel = self.batchTravel
+        clone.autoResolveCombat = self.autoResolveCombat
+        clone.occupancy = OccupancyIndex(clone.distance, lambda: clone.day)
+        clone.occupancy.restore(self.occupancy.snapshot(), clone.beingRegistry.being)
+        clone.scheduler = None
+        if self.scheduler:
+            clone.scheduler = DayScheduler()
+            clone.scheduler.restore(self.scheduler.snapshot())
+        clone.priceEngine = PriceEngine(clone)
+        clone.supplyLedger = self.supplyLedger.fork(clone)
+        clone.dailyUpdateBeings = clone._findDailyUpdateBeings()
+
+        # The lists in these are replaced, never changed, so copying the dictionaries is enough
+        clone.lazyEvents = self.lazyEvents
+        clone.nodeEventNames = dict(self.nodeEventNames)
+        clone.edgeEventNames = dict(self.edgeEventNames)
+        clone._nodeEventDays = dict(self._nodeEventDays)
+
+        clone.encounters = []
+        clone._encounterBeingIds = set()
+        clone._nextEncounterId = self._nextEncounterId
+        clone._turnRow = None
+        clone.eventHistory = None
+        clone.eventSink = None
+        clone.boundedLogs = self.boundedLogs
+        clone._eventSinks = []
+        clone.keyframes = None
+        clone._saveFilename = None
+        return clone
+
+    def save(self, filename, incremental=False):
+        """
+        Save this game to a file (see trader.savegame).
+        filename - Name of the save file.
+        incremental - If True and this game was last saved to (or loaded from) the same file,
+                      only the beings that changed since then are written.
+        """
+        saveGame(self, filename, incremental)
+
+    @classmethod
+    def load(cls, filename, players, world=None, **gameOptions):
+        """
+        Return a new Game in the state it was last saved in.
+        filename - Name of the save file.
+        players - Player objects, in the same order as when the game was saved.
+        world - An already loaded World object to play in (instead of the one the save names).
+        gameOptions - Game keyword arguments that don't change how it plays (recordEvents, eventSink, ...).
+        """
+        return loadGame(cls, filename, players, world, **gameOptions)
 
     def getNodeAttrDict(self, node):
         """
         Get the attributes from a node from the graph and make them a dictionary.
         node - The name of the node you want attributes for.
         """
-        return self.graph.nodes[node]
+        return self.csr.nodeAttributes(node)
         # attrList = self.graph.node_attributes(node)
         # for attr in attrList:
         #     if type(attr) == type({}):
@@ -343,7 +648,9 @@ class Game:
         node1 - The name of the first node.
         node2 - The name of the second node.
         """
-        return self.graph.get_edge_data(node1, node2)
+        if not self.csr.hasEdge(node1, node2):
+            return None
+        return {'weight': self.distance(node1, node2)}
         # attrList = self.graph.edge_attributes((node1, node2))
         # for attr in attrList:
         #     if type(attr) == type({}):
@@ -355,28 +662,151 @@ class Game:
         # retval['wt'] = self.graph.edge_weight(node1, node2)
         # return retval
 
-    def _calculateAndSetGlobalEvents(self):
-        """Calculate the global events and record their names."""
+    def _calculateAndSetGlobalEvents(self, day):
+        """
+        Calculate the global events and record their names.
+        day - The day to calculate the events for.
+        """
         self.globalEvents = []
         for eventProfile in self.eventProfiles:
-            if eventProfile.isHappening(self.day, self.globalEvents):
+            if eventProfile.isHappening(day, self.globalEvents, self.eventStates):
                 self.globalEvents += [eventProfile.name]
+        self._globalEventSet = set(self.globalEvents)
+
+    def _calculateAndSetEvents(self, day):
+        """
+        Calculate and set the global, node, and edge events for a day.
+        In lazy mode node and edge events are left to be worked out when somebody asks for them.
+        day - The day to calculate the events for.
+        """
+        self._calculateAndSetGlobalEvents(day)
+        if self.lazyEvents:
+            self.edgeEventNames = {}
+            return
+        for node in self.csr:
+            self._calculateAndSetNodeEvents(node, day)
+        self._calculateAndSetEdgeEvents()
+
+    def _skipIdleDays(self):
+        """
+        Jump the clock forward to the day before the next interesting day.
+        Every being is travelling quietly on the skipped days so they are moved along in one go.
+        """
+        nextDay = self.scheduler.nextInterestingDay(self)
+        skipDays = nextDay - self.day - 1
+        if skipDays <= 0:
+            return
+
+        for being in self.beings:
+            if not being.isDead():
+                being._state.skipDays(self, skipDays)
+
+        # Nobody was around to see the events on the skipped days, but an event that started
+        # on one of the last few of them could still be going on so roll those days.
+        for day in range(max(self.day + 1, nextDay - self._eventLookback), nextDay):
+            self._calculateAndSetEvents(day)
+        self.day = nextDay - 1
+
+    def _doBatchTravelTurn(self):
+        """Do every being's turn with all the travelling beings moved along in one go."""
+        store = self.beingStore
+        atNodes = store.beingsInState(BeingStateCode.NODE)
+        (arrived, outOfFuel, fuelBurnt) = store.travelTick()
+        fuelId = itemId('fuel')
+        for edge, amount in fuelBurnt.items():
+            self.supplyLedger.changedAt(edge, fuelId, -amount)
+        for being in sorted(self.dailyUpdateBeings, key=lambda being: being._row):
+            row = being._row
+            if store.states[row] == BeingStateCode.TRAVEL and store.distances[row] and store.fuels[row]:
+                being.player.safeTravelUpdate(self, store.distances[row])
+        for being in outOfFuel:
+            being.makeDead(self)
+            being.player.death(self, DeathReason.OUT_OF_FUEL)
+        for being in arrived:
+            being.arrived(self)
+        for being in atNodes:
+            being.doTurn(self)
+
+        # Only beings that share a node or an edge with somebody can have an encounter
+        for node in list(self.occupancy.occupiedNodes()):
+            self._pairOffAtNode(self.occupancy.beingsAtNode(node))
+        for edge in list(self.occupancy.occupiedEdges()):
+            self._pairOffOnEdge(edge)
+
+    def _pairOffAtNode(self, beings):
+        """
+        Give beings that are all at the same node encounters with each other.
+        This pairs them the way calling encounterCheck for each of them in order would (each one that isn't
+        busy yet meets the next one that isn't) without looking through everybody already busy every time.
+        beings - List of Being objects.
+        """
+        waiting = None
+        for being in list(beings):
+            if being.id in self._encounterBeingIds:
+                continue
+            if waiting is None:
+                waiting = being
+            elif self.createEncounter(waiting, being):
+                waiting = None
+
+    def _pairOffOnEdge(self, edge):
+        """
+        Give beings on an edge encounters with the beings they can meet there, in beingsOnEdge order.
+        A being meets the first one that isn't busy at its own position, or else going the other way opposite it,
+        or else going the other way just past it (everybody moved at once, so those two passed each other since
+        yesterday without ever being at the same position).
+        edge - A canonical edge.
+        """
+        positions = self.occupancy.positionsOnEdge(edge)
+        if len(positions) == 1 and len(positions[0][2]) == 1:
+            return
+        weight = self.distance(edge[0], edge[1])
+        beingsAt = dict(((destination, distanceLeft), beings) for (destination, distanceLeft, beings) in positions)
+        busy = self._encounterBeingIds
+        firstFree = {}  # Position -> index of the first being there that might not be busy yet
+
+        def nextFree(position, being):
+            beings = beingsAt.get(position)
+            if not beings:
+                return None
+            index = firstFree.get(position, 0)
+            while index < len(beings) and beings[index].id in busy:
+                index += 1
+            firstFree[position] = index
+            for otherBeing in itertools.islice(beings, index, None):
+                if otherBeing is not being and otherBeing.id not in busy:
+                    return otherBeing
+            return None
+
+        for (destination, distanceLeft, beings) in positions:
+            origin = edge[0] if destination == edge[1] else edge[1]
+            for being in list(beings):
+                if being.id in busy:
+                    continue
+                for position in ((destination, distanceLeft), (origin, weight - distanceLeft),
+                                 (origin, weight - distanceLeft - 1)):
+                    otherBeing = nextFree(position, being)
+                    if otherBeing is not None and self.createEncounter(being, otherBeing):
+                        break
 
     def doTurn(self):
         """Process one turn of the game engine."""
+        if self.scheduler:
+            self._skipIdleDays()
         self.day += 1
 
         # Calculate and set all the events
-        self._calculateAndSetGlobalEvents()
-        for node in self.graph.nodes():
-            self._calculateAndSetNodeEvents(node)
-        for edge in self.graph.edges():
-            self._calculateAndSetEdgeEvents(edge)
+        self._calculateAndSetEvents(self.day)
 
-        for being in self.beings:
-            # print('\nTURN: {0}'.format(being.name))
-            being.doTurn(self)
-            self.encounterCheck(being)
+        if self.batchTravel:
+            self._doBatchTravelTurn()
+        else:
+            for being in self.beings:
+                # print('\nTURN: {0}'.format(being.name))
+                self._turnRow = being._row
+                being.doTurn(self)
+                self.encounterCheck(being)
+            self._turnRow = None
 
         # Resolve all the encounters
         for encounter in self.encounters:
@@ -384,8 +814,16 @@ class Game:
                 keepGoing = encounter.doTurn()
                 if not keepGoing:
                     break
+            if self.scheduler:
+                # Fuel may have changed hands so reschedule whoever is still out on the edge
+                for being in encounter.beings():
+                    if not being.isDead() and being.currentLocation == '':
+                        self.scheduler.beingTravelling(self, being)
         self.encounters = []
+        self._encounterBeingIds = set()
 
+        if self.keyframes:
+            self.keyframes.tick(self)
         return True
 
 
@@ -415,6 +853,14 @@ class Player:
         """
         raise NotImplementedError("safeTravelUpdate is virtual and must be overridden.")
 
+    def wantsDailyUpdates(self) -> bool:
+        """
+        Return True iff safeTravelUpdate must be called for every single day of travel.
+        An event-driven Game can only skip idle travel days when no living player wants them.
+        This is asked once when the game starts so the answer mustn't change.
+        """
+        return True
+
     def voteInitState(self, game: Game, being: 'Being') -> EncounterStateCode:
         """
         Vote on what state to begin an encounter in.
@@ -435,6 +881,16 @@ class Player:
         """
         raise NotImplementedError("chooseCombatAction is virtual and must be overridden.")
 
+    def alwaysFights(self, game: Game, being: 'Being') -> bool:
+        """
+        Return True iff you would choose FIGHT every round of a fight with this enemy whatever happens.
+        Games with autoResolveCombat decide a fight between two beings that both say so in one go,
+        without calling chooseCombatAction (combatEvents just gets the death and the victory).
+        game - Game object.
+        being - Being object of the enemy.
+        """
+        return False
+
     def combatEvents(self, game: Game, events: List[CombatEvent]):
         """
         A series of updates for ongoing combat.
@@ -564,39 +1020,6 @@ class Player:
         raise NotImplementedError("death is virtual and must be overridden.")
 
 
-class Inventory:
-    """
-    """
-    def __init__(self,
-                 goods: Counter = Counter(),
-                 vessel: Optional[Vessel] = None,
-                 money: int = 0):
-        self.goods = goods
-        self.vessel = vessel
-        self.money = int(money)
-
-    def __str__(self):
-        return 'goods={0}\nvessel={1}\nmoney={2}'.format(self.goods,
-                                                         self.vessel,
-                                                         self.money)
-
-    def add(self, otherInventory: 'Inventory'):
-        """
-        Add another inventory into this inventory (EXCEPT the vessel).
-        otherInventory - The other inventory we are adding.
-        """
-        self.goods += otherInventory.goods
-        self.money += otherInventory.money
-
-    def subtract(self, otherInventory: 'Inventory'):
-        """
-        Subtract another inventory into this inventory (EXCEPT the vessel).
-        otherInventory - The other inventory we are subtracting.
-        """
-        self.goods -= otherInventory.goods
-        self.money -= otherInventory.money
-
-
 class Being:
     """
     """
@@ -604,16 +1027,71 @@ class Being:
                  inventory: Optional[Inventory] = None, initialLocation: str = ''):
         self.name = name
         self.player = player
+        self.id = game.beingRegistry.register(self)
         if inventory:
             self.inventory = inventory
         else:
             self.inventory = Inventory()
+        self._store = game.beingStore
+        self._row = self._store.add(self)  # Location and travel state live in the store's columns
+        self.inventory.watch(self._store, self._row)
         self.destination = ''
         self.lastDestination = ''
         self.currentLocation = initialLocation
         self._state: BeingState = NodeBeingState(self, game)
         self._dead = False
 
+    @property
+    def currentLocation(self):
+        """Name of the node the being is at ('' if it isn't at one)."""
+        return self._store.nodeName(self._store.locations[self._row])
+
+    @currentLocation.setter
+    def currentLocation(self, nodeName):
+        self._store.locations[self._row] = self._store.nodeId(nodeName)
+        self._store.unsavedRows.add(self._row)
+
+    @property
+    def lastDestination(self):
+        """Name of the node the being is travelling from ('' if it isn't travelling)."""
+        return self._store.nodeName(self._store.origins[self._row])
+
+    @lastDestination.setter
+    def lastDestination(self, nodeName):
+        self._store.origins[self._row] = self._store.nodeId(nodeName)
+        self._store.unsavedRows.add(self._row)
+
+    @property
+    def destination(self):
+        """Name of the node the being is travelling to ('' if it isn't travelling)."""
+        return self._store.nodeName(self._store.destinations[self._row])
+
+    @destination.setter
+    def destination(self, nodeName):
+        self._store.destinations[self._row] = self._store.nodeId(nodeName)
+        self._store.unsavedRows.add(self._row)
+
+    def fork(self, game: Game, player: Player):
+        """
+        Return a copy of this being for a forked game (see Game.fork).
+        game - The forked Game.  Its being store has copies of all the rows.
+        player - Player object that plays the copy.
+        """
+        retval = Being.__new__(Being)
+        retval.name = self.name
+        retval.player = player
+        retval.id = game.beingRegistry.register(retval)
+        assert(retval.id == self.id)
+        retval.inventory = self.inventory.fork()
+        retval._store = game.beingStore
+        retval._row = self._row
+        retval.inventory.watch(game.beingStore, retval._row)
+        game.beingStore.beings.append(retval)
+        assert(game.beingStore.beings[retval._row] is retval)
+        retval._dead = self._dead
+        retval._state = _newBeingState(retval, game)
+        return retval
+
     def __str__(self):
         return 'name={0}\nplayer={1}\ninventory={2}\ndestination={3}\nlastDestination={4}\ncurrentLocation={5}\nstate={6}\n'.format(self.name, self.player, self.inventory, self.destination, self.lastDestination, self.currentLocation, self._state)  # noqa: E501
 
@@ -630,6 +1108,11 @@ class Being:
         self.lastDestination = self.currentLocation
         self.destination = newDestination
         self.currentLocation = ''
+        self._store.states[self._row] = BeingStateCode.TRAVEL
+        game.occupancy.update(self)
+        game.supplyLedger.move(self)
+        if game.scheduler:
+            game.scheduler.beingTravelling(game, self)
 
     def arrived(self, game: Game):
         """
@@ -640,11 +1123,19 @@ class Being:
         self.lastDestination = ''
         self.destination = ''
         self._state = NodeBeingState(self, game)
+        self._store.states[self._row] = BeingStateCode.NODE
+        game.occupancy.update(self)
+        game.supplyLedger.move(self)
         self.player.arrived(game)
 
-    def makeDead(self):
+    def makeDead(self, game: Game):
         self._state = DeadBeingState(self)
         self._dead = True
+        self._store.states[self._row] = BeingStateCode.DEAD
+        self._store.unsavedRows.add(self._row)
+        game.occupancy.remove(self)
+        game.supplyLedger.remove(self)
+        game.dailyUpdateBeings.discard(self)
 
     def isDead(self):
         return self._dead
@@ -661,6 +1152,14 @@ class BeingState:
         """
         raise NotImplementedError("doTurn is virtual and must be overridden.")
 
+    def skipDays(self, game: Game, days: int):
+        """
+        Fast forward through days on which nothing happens to this being.
+        game - Game object.
+        days - Number of days to skip.
+        """
+        pass
+
 
 class NodeBeingState(BeingState):
     """State where a being is at a node."""
@@ -669,11 +1168,8 @@ class NodeBeingState(BeingState):
 
     def _playerHasEnoughFuelToGetAnywhere(self, game: Game):
         """Return True iff the player has enough fuel to get to any destination."""
-        for destination in game.possibleDestinations(self._being):
-            distToDest = game.distance(self._being.currentLocation, destination)
-            if self._being.inventory.goods['fuel'] >= distToDest:
-                return True
-        return False
+        minDistance = game.distanceOracle.minEdgeWeight(self._being.currentLocation)
+        return minDistance is not None and self._being.inventory.goods['fuel'] >= minDistance
 
     def doTurn(self, game: Game):
         nodeEvents = game.getCurrentNodeEvents(self._being)
@@ -681,6 +1177,7 @@ class NodeBeingState(BeingState):
 
         # Does the player have enough fuel to get anywhere?
         if not self._playerHasEnoughFuelToGetAnywhere(game):
+            self._being.makeDead(game)
             self._being.player.death(game, DeathReason.OUT_OF_FUEL)
             return False
 
@@ -702,6 +1199,17 @@ class TravelBeingState(BeingState):
         self._being = being
         self._distance = distance
 
+    @property
+    def _distance(self):
+        """How far the being still has to go (kept in the being store)."""
+        return self._being._store.distances[self._being._row]
+
+    @_distance.setter
+    def _distance(self, distance):
+        store = self._being._store
+        store.distances[self._being._row] = distance
+        store.unsavedRows.add(self._being._row)
+
     def doTurn(self, game: Game):
         # edgeEvents = game.getCurrentEdgeEvents(self._being)
 
@@ -712,11 +1220,18 @@ class TravelBeingState(BeingState):
             self._being.arrived(game)
         else:
             if self._being.inventory.goods['fuel'] == 0:
+                self._being.makeDead(game)
                 self._being.player.death(game, DeathReason.OUT_OF_FUEL)
                 return False
             self._being.player.safeTravelUpdate(game, self._distance)
         return True
 
+    def skipDays(self, game: Game, days: int):
+        assert(days < self._distance)
+        assert(days < self._being.inventory.goods['fuel'])
+        self._being.inventory.goods['fuel'] -= days
+        self._distance -= days
+
 
 class DeadBeingState(BeingState):
     """State where a being is dead."""
@@ -727,6 +1242,16 @@ class DeadBeingState(BeingState):
         return False
 
 
+def _newBeingState(being: Being, game: Game):
+    """Return a BeingState object for what a being's row in the being store says it is doing."""
+    stateCode = being._store.states[being._row]
+    if stateCode == BeingStateCode.DEAD:
+        return DeadBeingState(being)
+    elif stateCode == BeingStateCode.TRAVEL:
+        return TravelBeingState(being, being._store.distances[being._row])
+    return NodeBeingState(being, game)
+
+
 if __name__ == '__main__':
     # Command line arguments and options setup
 
@@ -735,17 +1260,28 @@ if __name__ == '__main__':
                         help='an integer for the accumulator')
     parser.add_argument('-w', '--world', type=str, default='',
                         help='use a custom world')
+    parser.add_argument('-j', '--journal', type=str, default='',
+                        help='record the game in a journal file so it can be replayed')
     args = parser.parse_args()
 
     from trader.players.stdInPlayer import StdInPlayer
     from trader.players.randomPlayer import RandomPlayer
     from trader.players.merchant import MerchantPlayer
-    g = Game([StdInPlayer(),
-              RandomPlayer(verbose=False),
-              RandomPlayer(verbose=False),
-              RandomPlayer(verbose=False),
-              MerchantPlayer()],
-             args.world)
-    keepGoing = True
-    while keepGoing:
-        keepGoing = g.doTurn()
+    players = [StdInPlayer(),
+               RandomPlayer(verbose=False),
+               RandomPlayer(verbose=False),
+               RandomPlayer(verbose=False),
+               MerchantPlayer()]
+    journal = None
+    if args.journal:
+        from trader.journal import recordGame
+        (g, journal) = recordGame(args.journal, players, customWorld=args.world)
+    else:
+        g = Game(players, args.world)
+    try:
+        keepGoing = True
+        while keepGoing:
+            keepGoing = g.doTurn()
+    finally:
+        if journal:
+            journal.close(g.day)
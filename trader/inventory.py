@@ -0,0 +1,400 @@
+from array import array
+from collections import Counter
+from collections.abc import MutableMapping
+from trader.profiles import Vessel
+from typing import Mapping, Optional
+
+
+_itemIds: dict = {}  # good name -> integer id
+_itemNames: list = []  # integer id -> good name
+
+
+def itemId(name):
+    """Return the integer id of a good, giving it the next free one the first time it is seen."""
+    goodId = _itemIds.get(name)
+    if goodId is None:
+        goodId = len(_itemNames)
+        _itemIds[name] = goodId
+        _itemNames.append(name)
+    return goodId
+
+
+def existingItemId(name):
+    """Return the integer id of a good (or None if it has never been seen)."""
+    return _itemIds.get(name)
+
+
+def itemName(goodId):
+    """Return the name of the good with an integer id."""
+    return _itemNames[goodId]
+
+
+def itemCount():
+    """Return how many goods have ids."""
+    return len(_itemNames)
+
+
+def registerItems(names):
+    """Give ids to a collection of good names (worlds do this when they load so their items get the low ids)."""
+    for name in names:
+        itemId(name)
+
+
+class GoodsView(MutableMapping):
+    """
+    A Counter-like view of an Inventory's goods keyed by good name.
+    Like a Counter, missing goods count as zero, goods that were set (even to zero) are listed,
+    and adding or subtracting inventories drops anything that isn't positive.
+    Changes made through the view go straight into the inventory.  That includes update, subtract,
+    and the in-place operators (+=, -=, |=, &=), which work the way they do on a Counter.  The other
+    operators (+, -, |, &) leave the inventory alone and return a new Counter.
+    """
+    __slots__ = ('_inventory',)
+
+    def __init__(self, inventory):
+        self._inventory = inventory
+
+    def __getitem__(self, name):
+        goodId = _itemIds.get(name)
+        if goodId is None:
+            return 0
+        return self._inventory.count(goodId)
+
+    def __setitem__(self, name, value):
+        self._inventory.setCount(itemId(name), value)
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        goodId = _itemIds[name]
+        self._inventory.setCount(goodId, 0)
+        self._inventory._present[goodId] = 0
+
+    def __contains__(self, name):
+        goodId = _itemIds.get(name)
+        present = self._inventory._present
+        return goodId is not None and goodId < len(present) and present[goodId] != 0
+
+    def __iter__(self):
+        present = self._inventory._present
+        return iter([_itemNames[goodId] for goodId in range(len(present)) if present[goodId]])
+
+    def __len__(self):
+        return sum(self._inventory._present)
+
+    def __repr__(self):
+        return 'GoodsView({0})'.format(dict(self.items()))
+
+    def copy(self):
+        """Return a Counter with the same goods."""
+        return Counter(dict(self.items()))
+
+    def total(self):
+        """Return the sum of the counts of all the goods."""
+        return sum(self.values())
+
+    def most_common(self, n=None):
+        """Return a list of the n most common goods and their counts (all of them if n is None)."""
+        return self.copy().most_common(n)
+
+    def elements(self):
+        """Return an iterator over the goods repeating each as many times as its count."""
+        return self.copy().elements()
+
+    def update(self, iterable=None, **kwds):
+        """
+        Add counts to the goods (like Counter.update, this adds rather than replaces).
+        iterable - A mapping of good name -> count, or an iterable of good names (each counts as one).
+        """
+        self._addCounts(iterable, kwds, 1)
+
+    def subtract(self, iterable=None, **kwds):
+        """
+        Take counts away from the goods (like Counter.subtract, counts can go to zero or below).
+        iterable - A mapping of good name -> count, or an iterable of good names (each counts as one).
+        """
+        self._addCounts(iterable, kwds, -1)
+
+    def _addCounts(self, iterable, kwds, sign):
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                for name, count in iterable.items():
+                    self[name] += sign * count
+            else:
+                for name in iterable:
+                    self[name] += sign
+        for name, count in kwds.items():
+            self[name] += sign * count
+
+    def _keepPositive(self):
+        for name in [name for name, count in self.items() if count <= 0]:
+            del self[name]
+        return self
+
+    def __add__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        return self.copy() + _asCounter(other)
+
+    def __radd__(self, other):
+        if not isinstance(other, Counter):
+            return NotImplemented
+        return other + self.copy()
+
+    def __sub__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        return self.copy() - _asCounter(other)
+
+    def __rsub__(self, other):
+        if not isinstance(other, Counter):
+            return NotImplemented
+        return other - self.copy()
+
+    def __or__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        return self.copy() | _asCounter(other)
+
+    def __ror__(self, other):
+        if not isinstance(other, Counter):
+            return NotImplemented
+        return other | self.copy()
+
+    def __and__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        return self.copy() & _asCounter(other)
+
+    def __rand__(self, other):
+        if not isinstance(other, Counter):
+            return NotImplemented
+        return other & self.copy()
+
+    def __iadd__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        for name, count in list(other.items()):
+            self[name] += count
+        return self._keepPositive()
+
+    def __isub__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        for name, count in list(other.items()):
+            self[name] -= count
+        return self._keepPositive()
+
+    def __ior__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        for name, count in list(other.items()):
+            if count > self[name]:
+                self[name] = count
+        return self._keepPositive()
+
+    def __iand__(self, other):
+        if not isinstance(other, (Counter, GoodsView)):
+            return NotImplemented
+        for name, count in list(self.items()):
+            if other[name] < count:
+                self[name] = other[name]
+        return self._keepPositive()
+
+
+def _asCounter(goods):
+    """Return goods as a Counter (a GoodsView is copied into one, anything else is returned as it is)."""
+    if isinstance(goods, GoodsView):
+        return goods.copy()
+    return goods
+
+
+class Inventory:
+    """
+    The goods, vessel, and money a being has.
+    Goods are counted in an array indexed by integer good id (see itemId).  The goods
+    attribute is a Counter-like view keyed by name for code that wants to work with names.
+    """
+    __slots__ = ('_counts', '_present', 'vessel', '_money', '_supplyLedger', '_owner', '_shared', '_store', '_row')
+
+    def __init__(self,
+                 goods: Optional[Mapping[str, int]] = None,
+                 vessel: Optional[Vessel] = None,
+                 money: int = 0):
+        self._counts = array('q')
+        self._present = bytearray()  # 1 for goods that are listed (like the keys of a Counter)
+        self.vessel = vessel
+        self._money = int(money)
+        self._supplyLedger = None  # Told about changes to goods while a being in a game owns this
+        self._owner = None
+        self._shared = False  # True while _counts and _present are shared with a fork (see fork)
+        self._store = None  # BeingStore told when goods or money change (see watch)
+        self._row = None
+        if goods:
+            for name, count in goods.items():
+                self.setCount(itemId(name), count)
+
+    def __str__(self):
+        return 'goods={0}\nvessel={1}\nmoney={2}'.format(dict(self.goods.items()),
+                                                         self.vessel,
+                                                         self.money)
+
+    @property
+    def money(self):
+        return self._money
+
+    @money.setter
+    def money(self, money):
+        self._money = money
+        if self._store is not None:
+            self._store.inventoryChanged(self._row, self)
+
+    @property
+    def goods(self):
+        return GoodsView(self)
+
+    @goods.setter
+    def goods(self, goods):
+        goods = dict(goods.items())  # It may be our own view (inventory.goods += other ends by setting it back)
+        for goodId in range(len(self._counts)):
+            self.setCount(goodId, 0)
+            self._present[goodId] = 0
+        for name, count in goods.items():
+            self.setCount(itemId(name), count)
+
+    def __getstate__(self):
+        # Good ids are handed out in the order goods are first seen, which can differ from process to
+        # process, so goods are pickled by name.  A copy isn't attached to a SupplyLedger.
+        return (dict(self.goods.items()), self.vessel, self.money)
+
+    def __setstate__(self, state):
+        (goods, vessel, money) = state
+        self.__init__(goods, vessel, money)
+
+    def attach(self, supplyLedger, owner):
+        """
+        Report changes to goods to a SupplyLedger.
+        supplyLedger - The SupplyLedger (or None to stop reporting).
+        owner - The Being that owns this inventory.
+        """
+        self._supplyLedger = supplyLedger
+        self._owner = owner
+
+    def watch(self, store, row):
+        """
+        Tell a BeingStore whenever the goods or money change (see BeingStore.inventoryChanged).
+        store - The BeingStore (or None to stop).
+        row - The row number of the being that owns this inventory.
+        """
+        self._store = store
+        self._row = row
+        if store is not None:
+            store.inventoryChanged(row, self)
+
+    def fork(self):
+        """
+        Return a copy of this inventory that shares its goods with this one until either of them changes them.
+        The vessel is shared too (nothing changes vessels during play).  The copy isn't attached to a SupplyLedger
+        and isn't watched.
+        """
+        retval = Inventory.__new__(Inventory)
+        retval._counts = self._counts
+        retval._present = self._present
+        retval.vessel = self.vessel
+        retval._money = self._money
+        retval._supplyLedger = None
+        retval._owner = None
+        retval._shared = True
+        retval._store = None
+        retval._row = None
+        self._shared = True
+        return retval
+
+    def _own(self):
+        """Stop sharing goods with a fork (called before they are changed)."""
+        self._counts = array('q', self._counts)
+        self._present = bytearray(self._present)
+        self._shared = False
+
+    def _grow(self, size):
+        self._counts.extend(array('q', bytes(8 * (size - len(self._counts)))))
+        self._present.extend(bytes(size - len(self._present)))
+
+    def counts(self):
+        """Return the array of good counts indexed by good id (it can be shorter than itemCount())."""
+        return self._counts
+
+    def count(self, goodId):
+        """Return how many of a good (by id) there are."""
+        if goodId < len(self._counts):
+            return self._counts[goodId]
+        return 0
+
+    def setCount(self, goodId, value):
+        """
+        Set how many of a good (by id) there are.
+        goodId - Integer id of the good.
+        value - The new count.
+        """
+        if self._shared:
+            self._own()
+        counts = self._counts
+        if goodId >= len(counts):
+            self._grow(goodId + 1)
+        self._present[goodId] = 1
+        delta = value - counts[goodId]
+        if delta:
+            counts[goodId] = value
+            if self._supplyLedger:
+                self._supplyLedger.changed(self._owner, goodId, delta)
+        if self._store is not None:
+            self._store.inventoryChanged(self._row, self)
+
+    def setCountQuietly(self, goodId, value):
+        """
+        Set how many of a good (by id) there are without telling the SupplyLedger or the BeingStore.
+        This is for BeingStore.travelTick, which keeps its own columns and reports the change to the ledger in bulk.
+        goodId - Integer id of the good (the inventory must already have some).
+        value - The new count.
+        """
+        if self._shared:
+            self._own()
+        self._counts[goodId] = value
+
+    def _combine(self, otherInventory, sign):
+        """Add (sign 1) or subtract (sign -1) the other inventory's goods and drop anything left below zero."""
+        if self._shared:
+            self._own()
+        counts = self._counts
+        present = self._present
+        otherCounts = otherInventory._counts
+        if len(otherCounts) > len(counts):
+            self._grow(len(otherCounts))
+        for goodId in range(len(counts)):
+            old = counts[goodId]
+            new = old + sign * otherCounts[goodId] if goodId < len(otherCounts) else old
+            if new < 0:
+                new = 0
+            present[goodId] = new > 0
+            if new != old:
+                counts[goodId] = new
+                if self._supplyLedger:
+                    self._supplyLedger.changed(self._owner, goodId, new - old)
+        if self._store is not None:
+            self._store.inventoryChanged(self._row, self)
+
+    def add(self, otherInventory: 'Inventory'):
+        """
+        Add another inventory into this inventory (EXCEPT the vessel).
+        otherInventory - The other inventory we are adding.
+        """
+        self._combine(otherInventory, 1)
+        self.money += otherInventory.money
+
+    def subtract(self, otherInventory: 'Inventory'):
+        """
+        Subtract another inventory into this inventory (EXCEPT the vessel).
+        otherInventory - The other inventory we are subtracting.
+        """
+        self._combine(otherInventory, -1)
+        self.money -= otherInventory.money
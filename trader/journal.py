@@ -0,0 +1,564 @@
+"""
+An append-only binary journal of a game, and a replay engine that plays it back.
+
+A game's own random numbers all come from its seed, so the seed plus every decision its players made
+is enough to play the game again exactly, without any player code.
+
+File layout (all integers little endian):
+  magic         8 bytes  b'TRADERJ1'
+  header size   uint32
+  header        JSON object: seed, number of players, and the Game options that change how it plays
+  records...    day uint32, player uint16, kind uint8, payload size uint16, payload
+
+Records are only ever appended, and the reader walks a memory map of the file so a journal
+of any size can be replayed without reading it all in.
+
+A journal can have a keyframe file next to it (see keyframes.py) so seekGame can start from a
+snapshot near the day it wants instead of playing the whole game again.
+"""
+from enum import IntEnum
+import json
+import mmap
+import os
+import random
+import struct
+from trader.combat import CombatAction
+from trader.encounter import EncounterStateCode
+from trader.game import Game, Inventory, Player
+from trader.keyframes import KeyframeReader, KeyframeWriter
+from trader.search import SearchAction
+from trader.trade import TradeAction
+
+
+MAGIC = b'TRADERJ1'
+_HEADER_SIZE = struct.Struct('<I')
+_RECORD = struct.Struct('<IHBH')  # day, player, kind, payload size
+_STRING_SIZE = struct.Struct('<H')
+_NO_PLAYER = 0xffff  # player number of records that aren't decisions
+
+# The Game options that are saved in the header so a replay plays the same way
+GAME_OPTIONS = ('customWorld', 'eventDriven', 'lazyEvents', 'batchTravel', 'autoResolveCombat')
+
+
+class DecisionCode(IntEnum):
+    INIT_GAME = 0
+    DESTINATION = 1
+    INIT_STATE = 2
+    COMBAT_ACTION = 3
+    TRADE_ACTION = 4
+    TRADE_REQUEST = 5
+    SEARCH_ACTION = 6
+    BOARD_REQUEST = 7
+    BRIBE_SOLICITATION = 8
+    SEIZE = 9
+    ALWAYS_FIGHTS = 10
+    END = 255  # Last record of a finished recording; its day is the day the game was on
+
+
+class JournalError(ValueError):
+    """A journal can't be read or doesn't match the game replaying it."""
+    pass
+
+
+class JournalExhausted(JournalError):
+    """A replay wanted a decision after the last one in an unfinished journal."""
+    pass
+
+
+def _packString(value):
+    data = value.encode('utf-8')
+    return _STRING_SIZE.pack(len(data)) + data
+
+
+def _unpackString(data, offset):
+    """Return (string, offset just past it)."""
+    (size,) = _STRING_SIZE.unpack_from(data, offset)
+    offset += _STRING_SIZE.size
+    return (data[offset:offset + size].decode('utf-8'), offset + size)
+
+
+class _Codec:
+    """Turns one kind of decision into payload bytes and back."""
+    def __init__(self, encode, decode):
+        """
+        encode - A function object with args (game, value) that returns bytes.
+        decode - A function object with args (game, payload) that returns the value.
+        """
+        self.encode = encode
+        self.decode = decode
+
+
+def _boolCodec():
+    return _Codec(lambda game, value: struct.pack('<?', value),
+                  lambda game, payload: bool(payload[0]))
+
+
+def _enumCodec(enumClass):
+    return _Codec(lambda game, value: struct.pack('<B', value.value),
+                  lambda game, payload: enumClass(payload[0]))
+
+
+def _encodeInitGame(game, value):
+    (beingName, wantsDailyUpdates) = value
+    return struct.pack('<?', wantsDailyUpdates) + _packString(beingName)
+
+
+def _decodeInitGame(game, payload):
+    return (_unpackString(payload, 1)[0], bool(payload[0]))
+
+
+def _encodeDestination(game, value):
+    # Node names are written as their ids in the world graph
+    return struct.pack('<i', game.csr.nodeId(value) if value else -1)
+
+
+def _decodeDestination(game, payload):
+    (nodeId,) = struct.unpack('<i', payload)
+    return game.csr.nodeName(nodeId) if nodeId >= 0 else None
+
+
+_TRADE_ACTION = struct.Struct('<BBqq')  # action, which of quantity/goodName/price are None, quantity, price
+
+
+def _encodeTradeAction(game, value):
+    (tradeAction, quantity, goodName, price) = value
+    nones = (quantity is None) | ((goodName is None) << 1) | ((price is None) << 2)
+    return _TRADE_ACTION.pack(tradeAction.value, nones, quantity or 0, price or 0) + _packString(goodName or '')
+
+
+def _decodeTradeAction(game, payload):
+    (tradeAction, nones, quantity, price) = _TRADE_ACTION.unpack_from(payload)
+    (goodName, offset) = _unpackString(payload, _TRADE_ACTION.size)
+    return (TradeAction(tradeAction),
+            None if nones & 1 else quantity,
+            None if nones & 2 else goodName,
+            None if nones & 4 else price)
+
+
+def _encodeBribe(game, value):
+    (searchAction, bribeAmount) = value
+    return struct.pack('<Bq', searchAction.value, bribeAmount)
+
+
+def _decodeBribe(game, payload):
+    (searchAction, bribeAmount) = struct.unpack('<Bq', payload)
+    return (SearchAction(searchAction), bribeAmount)
+
+
+def _encodeSeize(game, inventory):
+    goods = dict(inventory.goods)
+    parts = [struct.pack('<qH', inventory.money, len(goods))]
+    for goodName, count in goods.items():
+        parts.append(struct.pack('<q', count) + _packString(goodName))
+    return b''.join(parts)
+
+
+def _decodeSeize(game, payload):
+    (money, numGoods) = struct.unpack_from('<qH', payload)
+    offset = struct.calcsize('<qH')
+    goods = {}
+    for x in range(numGoods):
+        (count,) = struct.unpack_from('<q', payload, offset)
+        (goodName, offset) = _unpackString(payload, offset + 8)
+        goods[goodName] = count
+    return Inventory(goods=goods, money=money)
+
+
+_CODECS = {
+    DecisionCode.INIT_GAME: _Codec(_encodeInitGame, _decodeInitGame),
+    DecisionCode.DESTINATION: _Codec(_encodeDestination, _decodeDestination),
+    DecisionCode.INIT_STATE: _enumCodec(EncounterStateCode),
+    DecisionCode.COMBAT_ACTION: _enumCodec(CombatAction),
+    DecisionCode.TRADE_ACTION: _Codec(_encodeTradeAction, _decodeTradeAction),
+    DecisionCode.TRADE_REQUEST: _boolCodec(),
+    DecisionCode.SEARCH_ACTION: _enumCodec(SearchAction),
+    DecisionCode.BOARD_REQUEST: _enumCodec(SearchAction),
+    DecisionCode.BRIBE_SOLICITATION: _Codec(_encodeBribe, _decodeBribe),
+    DecisionCode.SEIZE: _Codec(_encodeSeize, _decodeSeize),
+    DecisionCode.ALWAYS_FIGHTS: _boolCodec(),
+}
+
+
+class JournalWriter:
+    """Writes a journal file."""
+    def __init__(self, filename, header):
+        """
+        filename - Name of the journal file (it is truncated).
+        header - Dictionary saved at the top of the file (see recordGame).
+        """
+        self._file = open(filename, 'wb')
+        data = json.dumps(header).encode('utf-8')
+        self._file.write(MAGIC + _HEADER_SIZE.pack(len(data)) + data)
+        self._game = None
+        self.keyframes = None  # KeyframeWriter of the same game (closed along with the journal)
+
+    def bind(self, game):
+        """Tell the writer which game it is journaling (decisions about nodes are written as node ids)."""
+        self._game = game
+
+    def decision(self, day, playerNumber, decisionCode, value):
+        """
+        Append a player decision.
+        day - The day it was made on.
+        playerNumber - Index of the player in the game's list of players.
+        decisionCode - DecisionCode saying what was decided.
+        value - What the player returned.
+        """
+        payload = _CODECS[decisionCode].encode(self._game, value)
+        self._file.write(_RECORD.pack(day, playerNumber, decisionCode, len(payload)) + payload)
+
+    def tell(self):
+        """Return the offset the next record will be written at."""
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+        if self.keyframes:
+            self.keyframes.flush()
+
+    def close(self, endDay=None):
+        """
+        Close the journal.
+        endDay - The day the game got to.  If given the journal is marked finished and a replay
+                 plays through to that day even if nobody decided anything on the last few days.
+        """
+        if self._file.closed:
+            return
+        if endDay is not None:
+            self._file.write(_RECORD.pack(endDay, _NO_PLAYER, DecisionCode.END, 0))
+        self._file.close()
+        if self.keyframes:
+            self.keyframes.close()
+
+
+class JournalRecord:
+    """One decision read back from a journal."""
+    __slots__ = ('day', 'playerNumber', 'decisionCode', 'payload')
+
+    def __init__(self, day, playerNumber, decisionCode, payload):
+        self.day = day
+        self.playerNumber = playerNumber
+        self.decisionCode = decisionCode
+        self.payload = payload  # bytes
+
+
+class JournalReader:
+    """Reads a journal file through a memory map."""
+    def __init__(self, filename):
+        """filename - Name of the journal file."""
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise JournalError('{0} is empty'.format(filename))
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise JournalError('{0} is not a journal'.format(filename))
+        offset = len(MAGIC)
+        (size,) = _HEADER_SIZE.unpack_from(self._map, offset)
+        offset += _HEADER_SIZE.size
+        self.header = json.loads(self._map[offset:offset + size].decode('utf-8'))
+        self._recordsStart = offset + size
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, offset=None):
+        """
+        Generator of the JournalRecord objects in the file, in order.
+        offset - Where to start (an offset returned by JournalWriter.tell) instead of the first record.
+        """
+        journalMap = self._map
+        if offset is None:
+            offset = self._recordsStart
+        end = len(journalMap)
+        while offset + _RECORD.size <= end:
+            (day, playerNumber, decisionCode, size) = _RECORD.unpack_from(journalMap, offset)
+            offset += _RECORD.size
+            if offset + size > end:
+                break  # A record cut short by a crash
+            yield JournalRecord(day, playerNumber, decisionCode, journalMap[offset:offset + size])
+            offset += size
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+class RecordingPlayer:
+    """Passes everything through to a real player and journals the decisions it makes."""
+    def __init__(self, player, playerNumber, journal):
+        """
+        player - The Player object doing the deciding.
+        playerNumber - Index of the player in the game's list of players.
+        journal - JournalWriter object.
+        """
+        self._player = player
+        self._playerNumber = playerNumber
+        self._journal = journal
+
+    def __getattr__(self, name):
+        return getattr(self._player, name)
+
+    def _record(self, game, decisionCode, value):
+        self._journal.decision(game.day if game else 0, self._playerNumber, decisionCode, value)
+        return value
+
+    def initGame(self, playerNumber):
+        beingName = self._player.initGame(playerNumber)
+        self._record(None, DecisionCode.INIT_GAME, (beingName, self._player.wantsDailyUpdates()))
+        return beingName
+
+    def chooseDestination(self, game):
+        return self._record(game, DecisionCode.DESTINATION, self._player.chooseDestination(game))
+
+    def voteInitState(self, game, being):
+        return self._record(game, DecisionCode.INIT_STATE, self._player.voteInitState(game, being))
+
+    def chooseCombatAction(self, game, being, cmbt):
+        return self._record(game, DecisionCode.COMBAT_ACTION, self._player.chooseCombatAction(game, being, cmbt))
+
+    def alwaysFights(self, game, being):
+        return self._record(game, DecisionCode.ALWAYS_FIGHTS, bool(self._player.alwaysFights(game, being)))
+
+    def chooseTradeAction(self, game, meBeing, themBeing):
+        return self._record(game, DecisionCode.TRADE_ACTION,
+                            self._player.chooseTradeAction(game, meBeing, themBeing))
+
+    def evaluateTradeRequest(self, game, meBeing, themBeing, tradeAction, quantity, goodName, price):
+        return self._record(game, DecisionCode.TRADE_REQUEST,
+                            self._player.evaluateTradeRequest(game, meBeing, themBeing, tradeAction,
+                                                              quantity, goodName, price))
+
+    def chooseSearchAction(self, game, meBeing, themBeing):
+        return self._record(game, DecisionCode.SEARCH_ACTION,
+                            self._player.chooseSearchAction(game, meBeing, themBeing))
+
+    def evaluateBoardRequest(self, game, meBeing, themBeing):
+        return self._record(game, DecisionCode.BOARD_REQUEST,
+                            self._player.evaluateBoardRequest(game, meBeing, themBeing))
+
+    def evaluateBribeSolicitation(self, game, meBeing, themBeing):
+        return self._record(game, DecisionCode.BRIBE_SOLICITATION,
+                            self._player.evaluateBribeSolicitation(game, meBeing, themBeing))
+
+    def seize(self, game, themInventory):
+        return self._record(game, DecisionCode.SEIZE, self._player.seize(game, themInventory))
+
+
+class _ReplayCursor:
+    """The shared position of every ReplayPlayer in a journal."""
+    def __init__(self, reader):
+        self._reader = reader
+        self.seek(None)
+        self.game = None
+
+    def seek(self, offset):
+        """Carry on from the record at offset (None for the first one)."""
+        self._records = self._reader.records(offset)
+        self.next = next(self._records, None)
+
+    def take(self, playerNumber, decisionCode):
+        """Return the decoded value of the next record, which has to be this player's decision of this kind."""
+        record = self.next
+        if record is None or record.decisionCode == DecisionCode.END:
+            raise JournalExhausted('journal ran out of decisions on day {0}'.format(self.game.day if self.game else 0))
+        if record.playerNumber != playerNumber or record.decisionCode != decisionCode:
+            raise JournalError('day {0}: replay wanted {1} from player {2} but the journal has {3} from player {4}'.format(
+                record.day, decisionCode.name, playerNumber, DecisionCode(record.decisionCode).name, record.playerNumber))
+        value = _CODECS[decisionCode].decode(self.game, record.payload)
+        self.next = next(self._records, None)
+        return value
+
+
+class ReplayPlayer(Player):
+    """A player that makes exactly the decisions a journal says it made (and ignores everything it's told)."""
+    def __init__(self, playerNumber, cursor):
+        self._playerNumber = playerNumber
+        self._cursor = cursor
+        self._wantsDailyUpdates = False
+
+    def _take(self, decisionCode):
+        return self._cursor.take(self._playerNumber, decisionCode)
+
+    def initGame(self, playerNumber):
+        (beingName, self._wantsDailyUpdates) = self._take(DecisionCode.INIT_GAME)
+        return beingName
+
+    def chooseDestination(self, game):
+        return self._take(DecisionCode.DESTINATION)
+
+    def safeTravelUpdate(self, game, distanceLeft):
+        pass
+
+    def wantsDailyUpdates(self):
+        return self._wantsDailyUpdates
+
+    def voteInitState(self, game, being):
+        return self._take(DecisionCode.INIT_STATE)
+
+    def chooseCombatAction(self, game, being, cmbt):
+        return self._take(DecisionCode.COMBAT_ACTION)
+
+    def alwaysFights(self, game, being):
+        return self._take(DecisionCode.ALWAYS_FIGHTS)
+
+    def combatEvents(self, game, events):
+        pass
+
+    def arrived(self, game):
+        pass
+
+    def nodeEvents(self, game, events):
+        pass
+
+    def advertiseTrade(self, game, meBeing):
+        return {}
+
+    def readTradeAdvertisement(self, game, prices):
+        pass
+
+    def chooseTradeAction(self, game, meBeing, themBeing):
+        return self._take(DecisionCode.TRADE_ACTION)
+
+    def evaluateTradeRequest(self, game, meBeing, themBeing, tradeAction, quantity, goodName, price):
+        return self._take(DecisionCode.TRADE_REQUEST)
+
+    def tradeEvents(self, game, events):
+        pass
+
+    def chooseSearchAction(self, game, meBeing, themBeing):
+        return self._take(DecisionCode.SEARCH_ACTION)
+
+    def evaluateBoardRequest(self, game, meBeing, themBeing):
+        return self._take(DecisionCode.BOARD_REQUEST)
+
+    def evaluateBribeSolicitation(self, game, meBeing, themBeing):
+        return self._take(DecisionCode.BRIBE_SOLICITATION)
+
+    def seize(self, game, themInventory):
+        return self._take(DecisionCode.SEIZE)
+
+    def searchEvents(self, game, events):
+        pass
+
+    def death(self, game, deathReason):
+        pass
+
+
+def keyframeFilename(filename):
+    """Return the name of the keyframe file that goes with a journal."""
+    return filename + '.keyframes'
+
+
+def recordGame(filename, players, seed=None, keyframeInterval=None, **gameOptions):
+    """
+    Start a Game whose seed and player decisions are journaled to a file.
+    Returns (game, journal).  Call journal.close(game.day) when the game is over.
+    filename - Name of the journal file.
+    players - Player objects.
+    seed - Seed for the game's random numbers (a random one is picked if None).
+    keyframeInterval - If not None a keyframe is taken every this many days (see seekGame).
+    gameOptions - Any other Game keyword arguments.  Those in GAME_OPTIONS are saved in the journal.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 63)  # The header is written before the Game exists so pick it here
+    header = {'seed': seed, 'players': len(players)}
+    for option in GAME_OPTIONS:
+        if option in gameOptions:
+            header[option] = gameOptions[option]
+    journal = JournalWriter(filename, header)
+    recordingPlayers = [RecordingPlayer(player, playerNumber, journal) for playerNumber, player in enumerate(players)]
+    try:
+        game = Game(recordingPlayers, seed=seed, **gameOptions)
+    except Exception:
+        journal.close()
+        raise
+    journal.bind(game)
+    if keyframeInterval is not None:
+        journal.keyframes = KeyframeWriter(keyframeFilename(filename), keyframeInterval, journal)
+        game.keyframes = journal.keyframes
+    return (game, journal)
+
+
+def _startReplay(reader, world, gameOptions):
+    """Return (game, cursor) for a Game that takes its decisions from a journal, ready to play its first day."""
+    header = reader.header
+    cursor = _ReplayCursor(reader)
+    players = [ReplayPlayer(playerNumber, cursor) for playerNumber in range(header['players'])]
+    for option in GAME_OPTIONS:
+        if option in header:
+            gameOptions[option] = header[option]
+    game = Game(players, seed=header['seed'], world=world, **gameOptions)
+    cursor.game = game
+    return (game, cursor)
+
+
+def _playJournal(game, cursor, lastDay=None):
+    """
+    Play a game from wherever it is until the journal ends (or lastDay is reached).
+    game - Game whose players are ReplayPlayers reading from cursor.
+    cursor - The _ReplayCursor.
+    lastDay - Day to stop at (or None to play the whole journal).
+    """
+    try:
+        while cursor.next is not None:
+            if lastDay is not None and game.day >= lastDay:
+                return
+            if cursor.next.decisionCode == DecisionCode.END:
+                endDay = cursor.next.day if lastDay is None else min(cursor.next.day, lastDay)
+                while game.day < endDay:
+                    game.doTurn()
+                return
+            if game.day > cursor.next.day:
+                raise JournalError('replay passed day {0} without making its decisions'.format(cursor.next.day))
+            game.doTurn()
+    except JournalExhausted:
+        if cursor.next is not None:
+            raise
+
+
+def replayGame(filename, world=None, **gameOptions):
+    """
+    Play a journaled game again from start to finish and return the Game as it was when the recording stopped.
+    No player code runs; every decision comes from the journal.  A journal that was never closed
+    (the recording crashed) is played up to its last complete decision.
+    filename - Name of the journal file.
+    world - An already loaded World object to play in (instead of the journal's customWorld).
+    gameOptions - Game keyword arguments that don't change how it plays (recordEvents, eventSink, ...).
+    """
+    with JournalReader(filename) as reader:
+        (game, cursor) = _startReplay(reader, world, gameOptions)
+        _playJournal(game, cursor)
+        return game
+
+
+def seekGame(filename, day, world=None, **gameOptions):
+    """
+    Return the Game of a journal as it was at the end of a day (or at the end of the journal if that is sooner).
+    Event driven games skip days, so for them it is the end of the first turn that got to day or past it.
+    If the journal has a keyframe file the game starts from the latest keyframe at or before day
+    and only the days after it are played; otherwise it is played from the start.
+    filename - Name of the journal file.
+    day - Day to stop at.
+    world - An already loaded World object to play in (instead of the journal's customWorld).
+    gameOptions - Game keyword arguments that don't change how it plays (recordEvents, eventSink, ...).
+    """
+    with JournalReader(filename) as reader:
+        (game, cursor) = _startReplay(reader, world, gameOptions)
+        if os.path.exists(keyframeFilename(filename)):
+            with KeyframeReader(keyframeFilename(filename)) as keyframes:
+                keyframeDay = keyframes.nearest(day)
+                if keyframeDay is not None:
+                    (state, journalOffset) = keyframes.load(keyframeDay, game.world)
+                    game.restoreState(state)
+                    cursor.seek(journalOffset)
+        _playJournal(game, cursor, day)
+        return game
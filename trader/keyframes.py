@@ -0,0 +1,245 @@
+"""
+Keyframes: snapshots of a game's state taken every so many days, so a recorded game can be
+picked up at any day by restoring the nearest keyframe before it and replaying only the days after.
+
+File layout (all integers little endian):
+  magic      8 bytes  b'TRADERK2'
+  frames...  day uint32, journal offset uint64, size uint32, zlib compressed pickle of Game.captureState()
+  index      count uint32, then (day uint32, frame offset uint64) for every frame   (written by close)
+  trailer    index offset uint64, b'TRADERKI'
+
+A file that was never closed has no index; the reader rebuilds it by walking the frames.
+"""
+from bisect import bisect_right
+import io
+import mmap
+import pickle
+import queue
+import struct
+import threading
+import zlib
+
+
+MAGIC = b'TRADERK2'
+INDEX_MAGIC = b'TRADERKI'
+_FRAME = struct.Struct('<IQI')  # day, journal offset, size
+_INDEX_COUNT = struct.Struct('<I')
+_INDEX_ENTRY = struct.Struct('<IQ')  # day, frame offset
+_TRAILER = struct.Struct('<Q8s')  # index offset, INDEX_MAGIC
+
+
+class KeyframeError(ValueError):
+    """A keyframe file can't be read."""
+    pass
+
+
+def _worldItem(name):
+    """Stands in for World.items[name] in pickles (_StateUnpickler swaps in the real lookup)."""
+    raise pickle.UnpicklingError('World items can only be unpickled by _StateUnpickler')
+
+
+class _StatePickler(pickle.Pickler):
+    """Pickler that writes the World's items (vessels and so on) by name instead of by value."""
+    def __init__(self, f, world):
+        pickle.Pickler.__init__(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._items = dict((id(item), name) for name, item in world.items.items())
+
+    def reducer_override(self, obj):
+        # Unlike persistent_id this isn't called for ints, strings, lists and so on, which are most of a state
+        name = self._items.get(id(obj))
+        if name is not None:
+            return (_worldItem, (name,))
+        return NotImplemented
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """Unpickler that looks the World's items back up by name."""
+    def __init__(self, f, world):
+        pickle.Unpickler.__init__(self, f)
+        self._world = world
+
+    def find_class(self, module, name):
+        if module == __name__ and name == '_worldItem':
+            return self._world.items.__getitem__
+        return pickle.Unpickler.find_class(self, module, name)
+
+
+def dumpState(state, world):
+    """Return the bytes of a state returned by Game.captureState (compressed)."""
+    f = io.BytesIO()
+    _StatePickler(f, world).dump(state)
+    return zlib.compress(f.getvalue())
+
+
+def loadState(data, world):
+    """Return the state saved by dumpState."""
+    return _StateUnpickler(io.BytesIO(zlib.decompress(data)), world).load()
+
+
+class KeyframeWriter:
+    """
+    Takes a keyframe of a game every interval days and appends it to a file.
+    The state is captured and pickled during the tick (it has to be, the game moves on right after)
+    but compressing and writing happen on a background thread so the tick loop doesn't wait on them.
+    """
+    def __init__(self, filename, interval=1000, journal=None):
+        """
+        filename - Name of the keyframe file (it is truncated).
+        interval - How many days apart keyframes are.
+        journal - JournalWriter of the same game (each keyframe notes how far the journal had got).
+        """
+        assert(interval > 0)
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC)
+        self._interval = interval
+        self._journal = journal
+        self._nextDay = interval
+        self._index = []  # (day, frame offset) for every frame written
+        self._queue = queue.Queue(maxsize=4)  # Bounded so a slow disk slows the game instead of eating memory
+        self._error = None
+        self._thread = threading.Thread(target=self._writeFrames, name='KeyframeWriter', daemon=True)
+        self._thread.start()
+
+    def tick(self, game):
+        """
+        Take a keyframe if it's time for one.  Games call this at the end of every turn.
+        game - Game object.
+        """
+        if game.day >= self._nextDay:
+            self.capture(game)
+            self._nextDay = (game.day // self._interval + 1) * self._interval
+
+    def capture(self, game):
+        """
+        Take a keyframe now.
+        game - Game object.
+        """
+        if self._error:
+            raise self._error
+        journalOffset = self._journal.tell() if self._journal else 0
+        f = io.BytesIO()
+        _StatePickler(f, game.world).dump(game.captureState())
+        self._queue.put((game.day, journalOffset, f.getvalue()))
+
+    def _writeFrames(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            (day, journalOffset, pickled) = item
+            try:
+                data = zlib.compress(pickled)
+                self._index.append((day, self._file.tell()))
+                self._file.write(_FRAME.pack(day, journalOffset, len(data)))
+                self._file.write(data)
+            except Exception as e:
+                self._error = e
+            self._queue.task_done()
+
+    def flush(self):
+        """Wait for every keyframe taken so far to be written."""
+        self._queue.join()
+        self._file.flush()
+
+    def close(self):
+        """Write the rest of the keyframes and the index."""
+        if self._file.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        indexOffset = self._file.tell()
+        self._file.write(_INDEX_COUNT.pack(len(self._index)))
+        for (day, frameOffset) in self._index:
+            self._file.write(_INDEX_ENTRY.pack(day, frameOffset))
+        self._file.write(_TRAILER.pack(indexOffset, INDEX_MAGIC))
+        self._file.close()
+        if self._error:
+            raise self._error
+
+
+class KeyframeReader:
+    """Reads a keyframe file through a memory map."""
+    def __init__(self, filename):
+        """filename - Name of the keyframe file."""
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise KeyframeError('{0} is empty'.format(filename))
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise KeyframeError('{0} is not a keyframe file'.format(filename))
+        self._days = []
+        self._offsets = []
+        if not self._readIndex():
+            self._scanFrames()
+
+    def _readIndex(self):
+        """Read the index written by KeyframeWriter.close.  Returns False if there isn't one."""
+        end = len(self._map)
+        if end < len(MAGIC) + _TRAILER.size:
+            return False
+        (indexOffset, indexMagic) = _TRAILER.unpack_from(self._map, end - _TRAILER.size)
+        if indexMagic != INDEX_MAGIC:
+            return False
+        (count,) = _INDEX_COUNT.unpack_from(self._map, indexOffset)
+        offset = indexOffset + _INDEX_COUNT.size
+        for x in range(count):
+            (day, frameOffset) = _INDEX_ENTRY.unpack_from(self._map, offset)
+            self._days.append(day)
+            self._offsets.append(frameOffset)
+            offset += _INDEX_ENTRY.size
+        return True
+
+    def _scanFrames(self):
+        """Rebuild the index by walking the frames (for files that were never closed)."""
+        offset = len(MAGIC)
+        end = len(self._map)
+        while offset + _FRAME.size <= end:
+            (day, journalOffset, size) = _FRAME.unpack_from(self._map, offset)
+            if offset + _FRAME.size + size > end:
+                break  # A frame cut short by a crash
+            self._days.append(day)
+            self._offsets.append(offset)
+            offset += _FRAME.size + size
+
+    def __len__(self):
+        return len(self._days)
+
+    def days(self):
+        """Return a list of the days there are keyframes for (in order)."""
+        return list(self._days)
+
+    def nearest(self, day):
+        """Return the latest keyframe day at or before day (or None if there isn't one)."""
+        i = bisect_right(self._days, day)
+        if i == 0:
+            return None
+        return self._days[i - 1]
+
+    def load(self, day, world):
+        """
+        Return (state, journalOffset) for the keyframe taken on a day.
+        state is what Game.captureState returned; journalOffset is how far the game's journal had got.
+        day - A day returned by days or nearest.
+        world - The World the game was played in.
+        """
+        i = bisect_right(self._days, day) - 1
+        if i < 0 or self._days[i] != day:
+            raise KeyError(day)
+        offset = self._offsets[i]
+        (frameDay, journalOffset, size) = _FRAME.unpack_from(self._map, offset)
+        start = offset + _FRAME.size
+        return (loadState(self._map[start:start + size], world), journalOffset)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
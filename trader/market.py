@@ -0,0 +1,268 @@
+from array import array
+from collections import Counter
+from trader.inventory import itemId
+from trader.occupancy import canonicalEdge
+
+
+MAX_PRICED_SUPPLY = 10  # Supply beyond this doesn't push prices down any further
+
+
+class SupplyLedger:
+    """
+    Running totals of the goods being carried at every node and on every edge.
+    Totals are arrays indexed by good id (see trader.inventory.itemId) and are kept up to date
+    with deltas: inventories report every change to their goods, and beings report when they move.
+    Nothing ever has to add up every being's inventory again.  Every change is passed on to the
+    game's PriceEngine so it can drop the prices it had worked out around that location.
+    """
+    def __init__(self, game):
+        """
+        game - Game object.
+        """
+        self._game = game
+        self._totals = {}  # nodeName or canonical edge -> array of goods indexed by good id
+        self._where = {}  # Being -> the location it is counted at
+
+    def _locationFor(self, being):
+        if being.currentLocation != '':
+            return being.currentLocation
+        return canonicalEdge(being.lastDestination, being.destination)
+
+    def _apply(self, location, counts, sign):
+        self._game.priceEngine.supplyChanged(location)
+        total = self._totals.get(location)
+        if total is None:
+            total = array('q')
+            self._totals[location] = total
+        if len(total) < len(counts):
+            total.extend(array('q', bytes(8 * (len(counts) - len(total)))))
+        for goodId in range(len(counts)):
+            if counts[goodId]:
+                total[goodId] += sign * counts[goodId]
+
+    def add(self, being):
+        """
+        Start counting a being's goods where it is now.
+        being - Being object.
+        """
+        assert(being not in self._where)
+        location = self._locationFor(being)
+        self._where[being] = location
+        self._apply(location, being.inventory.counts(), 1)
+        being.inventory.attach(self, being)
+
+    def fork(self, game):
+        """
+        Return a copy of this ledger for a forked game (see Game.fork) with the copy's beings attached to it.
+        game - The forked Game.  Its beings have the same ids as ours.
+        """
+        retval = SupplyLedger(game)
+        retval._totals = dict((location, array('q', total)) for location, total in self._totals.items())
+        for being, location in self._where.items():
+            forkedBeing = game.getBeingById(being.id)
+            retval._where[forkedBeing] = location
+            forkedBeing.inventory.attach(retval, forkedBeing)
+        return retval
+
+    def remove(self, being):
+        """
+        Stop counting a being's goods (if they are counted at all).
+        being - Being object.
+        """
+        location = self._where.pop(being, None)
+        if location is None:
+            return
+        self._apply(location, being.inventory.counts(), -1)
+        being.inventory.attach(None, None)
+
+    def move(self, being):
+        """
+        Move a being's goods to wherever it is now.
+        being - Being object.
+        """
+        location = self._where.get(being)
+        if location is None:
+            return
+        newLocation = self._locationFor(being)
+        if newLocation != location:
+            self._apply(location, being.inventory.counts(), -1)
+            self._apply(newLocation, being.inventory.counts(), 1)
+            self._where[being] = newLocation
+
+    def changed(self, being, goodId, delta):
+        """
+        Record a change to the amount of one good a being has (inventories call this).
+        being - Being object.
+        goodId - Integer id of the good.
+        delta - How much the amount went up (negative if it went down).
+        """
+        location = self._where.get(being)
+        if location is None:
+            return
+        self.changedAt(location, goodId, delta)
+
+    def changedAt(self, location, goodId, delta):
+        """
+        Record a change to the amount of one good carried at a location, made up of changes to the goods of
+        beings counted there that weren't reported one by one (see BeingStore.travelTick).
+        location - A node name or a canonical edge.
+        goodId - Integer id of the good.
+        delta - How much the amount went up (negative if it went down).
+        """
+        self._game.priceEngine.supplyChanged(location, goodId)
+        total = self._totals[location]
+        if goodId >= len(total):
+            total.extend(array('q', bytes(8 * (goodId + 1 - len(total)))))
+        total[goodId] += delta
+
+    def rebuild(self):
+        """Recount everything from the tracked beings' inventories."""
+        self._game.priceEngine.invalidate()
+        self._totals = {}
+        for being, location in self._where.items():
+            self._apply(location, being.inventory.counts(), 1)
+
+    def locations(self):
+        """Return the locations (node names and canonical edges) that have goods counted at them."""
+        return self._totals.keys()
+
+    def totalAt(self, location, goodId):
+        """
+        Return how much of a good is at a location.
+        location - A node name or a canonical edge.
+        goodId - Integer id of the good.
+        """
+        total = self._totals.get(location)
+        if total is None or goodId >= len(total):
+            return 0
+        return total[goodId]
+
+    def totalsAt(self, location):
+        """
+        Return the array of goods at a location indexed by good id (it can be shorter than itemCount()).
+        location - A node name or a canonical edge.
+        """
+        return self._totals.get(location, array('q'))
+
+
+class PriceEngine:
+    """
+    Works out the local price of every item at a node.
+    Supply is what the beings at a node, at its neighbors, and on the edges between them are carrying.
+    It comes from the game's SupplyLedger so it costs the same however many beings there are.
+    Demand is the node's 'demandMod' attribute plus each item's dynamicFunc for the node's events.
+    Each distinct set of events only calls the dynamicFuncs once a day.
+    A node's prices are worked out the first time they are asked for on a day and then served from its
+    row until the day changes or the ledger reports that the supply around the node changed.
+    Only the node asked about is looked at, so with lazy events no other node's events get worked out.
+    """
+    def __init__(self, game):
+        """
+        game - Game object.
+        """
+        self._game = game
+        self._itemNames = tuple(game.items)
+        self._itemIndex = dict((name, i) for i, name in enumerate(self._itemNames))
+        self._itemIds = tuple(itemId(name) for name in self._itemNames)
+        self._pricedIds = frozenset(self._itemIds)
+        self._basePrices = array('d', (game.items[name].price for name in self._itemNames))
+        self._day = None
+        self._prices = {}  # nodeName -> array of prices in _itemNames order (only for today)
+        self._dynamicDemand = {}  # tuple of event names -> array of demand from the items' dynamicFuncs (today)
+
+    def itemNames(self):
+        """Return a tuple of the item names in the order the price rows use."""
+        return self._itemNames
+
+    def invalidate(self):
+        """Forget today's prices (call this when supply or demand changes during the day)."""
+        self._day = None
+        self._prices = {}
+        self._dynamicDemand = {}
+
+    def supplyChanged(self, location, goodId=None):
+        """
+        Forget the prices at the nodes that count the supply at a location (the SupplyLedger calls this).
+        location - A node name or a canonical edge.
+        goodId - Integer id of the good that changed (None for any).
+        """
+        if not self._prices or (goodId is not None and goodId not in self._pricedIds):
+            return
+        csr = self._game.csr
+        prices = self._prices
+        if isinstance(location, tuple):
+            (node1, node2) = location
+            prices.pop(node1, None)
+            prices.pop(node2, None)
+            for node in csr.neighbors(node1):
+                if node in prices and csr.hasEdge(node, node2):
+                    del prices[node]
+        else:
+            prices.pop(location, None)
+            for node in csr.neighbors(location):
+                prices.pop(node, None)
+
+    def supplyRow(self, nodeName):
+        """Return the array of local supply at a node in itemNames order."""
+        csr = self._game.csr
+        ledger = self._game.supplyLedger
+        itemIds = self._itemIds
+        row = array('q', bytes(8 * len(itemIds)))
+
+        def add(location):
+            totals = ledger.totalsAt(location)
+            for i in range(len(itemIds)):
+                if itemIds[i] < len(totals):
+                    row[i] += totals[itemIds[i]]
+
+        # What is sitting at the node and its neighbors is local, and so is what is on an edge
+        # with both ends among them
+        neighborhood = (nodeName,) + csr.neighbors(nodeName)
+        around = frozenset(neighborhood)
+        for node in neighborhood:
+            add(node)
+            for neighbor in csr.neighbors(node):
+                if node < neighbor and neighbor in around:
+                    add((node, neighbor))
+        return row
+
+    def supply(self):
+        """Return a dictionary of nodeName -> array of local supply in itemNames order."""
+        return dict((node, self.supplyRow(node)) for node in self._game.csr)
+
+    def _demandRow(self, nodeName):
+        row = array('d', bytes(8 * len(self._itemNames)))
+        demandMod = self._game.getNodeAttrDict(nodeName).get('demandMod', {})
+        for name, mod in demandMod.items():
+            i = self._itemIndex.get(name)
+            if i is not None:
+                row[i] += mod
+        events = tuple(self._game.getNodeEvents(nodeName))
+        eventDemand = self._dynamicDemand.get(events)
+        if eventDemand is None:
+            eventDemand = array('d', (self._game.items[name].dynamicFunc(self._game.day, events)
+                                      if self._game.items[name].dynamicFunc else 0
+                                      for name in self._itemNames))
+            self._dynamicDemand[events] = eventDemand
+        for i in range(len(row)):
+            row[i] += eventDemand[i]
+        return row
+
+    def priceRow(self, nodeName):
+        """Return the array of prices at a node in itemNames order."""
+        if self._day != self._game.day:
+            self.invalidate()
+            self._day = self._game.day
+        row = self._prices.get(nodeName)
+        if row is None:
+            demand = self._demandRow(nodeName)
+            supply = self.supplyRow(nodeName)
+            basePrices = self._basePrices
+            row = array('d', (basePrices[i] * ((demand[i] * 10) + 100) / max(min(supply[i], MAX_PRICED_SUPPLY), 1)
+                              for i in range(len(basePrices))))
+            self._prices[nodeName] = row
+        return row
+
+    def localPrices(self, nodeName):
+        """Return a Counter of item name -> price at a node."""
+        return Counter(dict(zip(self._itemNames, self.priceRow(nodeName))))
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+import sys
+import weakref
+
+
+class _EventSet(frozenset):
+    """A frozenset that can be weakly referenced (plain ones can't, subclasses can)."""
+    pass
+
+
+# frozenset of event names -> the one copy of it everybody shares.  Sets are only kept while something
+# (like a MemoizedFunction's cache) still holds on to them, so the table can't grow without bound.
+_internedEvents: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def internEvents(events):
+    """Return the shared frozenset for a collection of event names."""
+    eventSet = frozenset(events)
+    interned = _internedEvents.get(eventSet)
+    if interned is None:
+        interned = _EventSet(eventSet)
+        _internedEvents[eventSet] = interned
+    return interned
+
+
+class MemoizedFunction:
+    """
+    Wraps a world function with args (day, events) that only depends on the day (or on where the
+    day falls in a repeating period) and on which events are happening, not on their order.
+    Results are kept in a bounded LRU cache keyed by (day or day % period, interned set of events).
+    """
+    def __init__(self, func, period=None, maxsize=1024):
+        """
+        func - A function object with args (day, events).
+        period - If given the function only depends on day % period (1 means it ignores the day).
+        maxsize - How many results to keep.
+        """
+        self.func = func
+        self.period = period
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # (day key, frozenset of events) -> result
+        self.__module__ = getattr(func, '__module__', None)
+        self.__name__ = getattr(func, '__name__', None)
+        self.__qualname__ = getattr(func, '__qualname__', None)
+        self.__doc__ = getattr(func, '__doc__', None)
+
+    def __call__(self, day, events):
+        key = (day % self.period if self.period else day, internEvents(events))
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+        self.misses += 1
+        result = self.func(day, events)
+        cache[key] = result
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return result
+
+    def __repr__(self):
+        return 'MemoizedFunction({0!r}, period={1})'.format(self.func, self.period)
+
+    def cacheInfo(self):
+        """Return (hits, misses, maxsize, current size)."""
+        return (self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def cacheClear(self):
+        """Forget every cached result and reset the counters."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        # Wrappers that live in a module (like the ones in trader.worldfuncs) are pickled by name.
+        # Others are pickled with their function, without the cached results.
+        module = sys.modules.get(self.__module__) if self.__module__ else None
+        if module is not None and getattr(module, self.__qualname__ or '', None) is self:
+            return self.__qualname__
+        return (MemoizedFunction, (self.func, self.period, self.maxsize))
+
+
+def memoize(func=None, period=None, maxsize=1024):
+    """
+    Opt in to memoizing a world function.  Use it on a function or as a decorator:
+        @memoize(period=100)
+        def ButterPriceFunc(day, events): ...
+    func - A function object with args (day, events).
+    period - If given the function only depends on day % period (1 means it ignores the day).
+    maxsize - How many results to keep.
+    """
+    if func is None:
+        return lambda func: MemoizedFunction(func, period, maxsize)
+    return MemoizedFunction(func, period, maxsize)
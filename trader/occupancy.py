@@ -0,0 +1,220 @@
+def canonicalEdge(node1, node2):
+    """Return the canonical (sorted) tuple name of the edge between two nodes."""
+    if node1 <= node2:
+        return (node1, node2)
+    return (node2, node1)
+
+
+class OccupancyIndex:
+    """
+    A live index of where every being is.
+    Nodes map to the beings sitting at them.  Edges map to the beings travelling on them,
+    keyed by (destination, arrival day).  Beings on the same edge with the same arrival day are at
+    the same position, and that key doesn't change while they travel so nobody has to be re-filed
+    every day.  Positions are still asked about as (destination, distanceLeft) from today.
+    This lets an encounter check look only at beings that are co-located instead of all of them.
+    Every filing gets a number, and so does every place when it gets its first being.  Those numbers
+    (see entry) are all it takes to rebuild the index in the same order from the beings themselves.
+    """
+    def __init__(self, distanceFunc, dayFunc=lambda: 0):
+        """
+        distanceFunc - A function object with args (node1, node2) that returns the weight of the edge between them.
+        dayFunc - A function object with no args that returns today's day number.
+        """
+        self._distanceFunc = distanceFunc
+        self._dayFunc = dayFunc
+        self._nodes = {}  # nodeName -> list of Being objects at that node
+        self._edges = {}  # canonical edge -> {(destination, arrival day) -> list of Being objects}
+        self._where = {}  # Being -> the key it is filed under (so we can remove it without recomputing)
+        self._filed = {}  # Being -> the number of its filing
+        self._opened = {}  # Node name or canonical edge -> the number of the filing that first put somebody there
+        self._sequence = 0  # Number of the next filing
+
+    def _keyFor(self, being):
+        if being.currentLocation != '':
+            return (being.currentLocation, None)
+        edge = canonicalEdge(being.lastDestination, being.destination)
+        return (edge, (being.destination, self._dayFunc() + being._state._distance))
+
+    def add(self, being):
+        """
+        Start tracking a being at its current location.
+        being - Being object.
+        """
+        assert(being not in self._where)
+        self._file(being, self._sequence, self._sequence)
+        self._sequence += 1
+
+    def _file(self, being, opened, filed):
+        key = self._keyFor(being)
+        (location, position) = key
+        if position is None:
+            beings = self._nodes.get(location)
+            if beings is None:
+                beings = self._nodes[location] = []
+                self._opened[location] = opened
+            beings.append(being)
+        else:
+            positions = self._edges.get(location)
+            if positions is None:
+                positions = self._edges[location] = {}
+                self._opened[location] = opened
+            positions.setdefault(position, []).append(being)
+        self._where[being] = key
+        self._filed[being] = filed
+
+    def remove(self, being):
+        """
+        Stop tracking a being (if it is tracked at all).
+        being - Being object.
+        """
+        key = self._where.pop(being, None)
+        if key is None:
+            return
+        del self._filed[being]
+        (location, position) = key
+        if position is None:
+            beings = self._nodes[location]
+            beings.remove(being)
+            if not beings:
+                del self._nodes[location]
+                del self._opened[location]
+        else:
+            positions = self._edges[location]
+            beings = positions[position]
+            beings.remove(being)
+            if not beings:
+                del positions[position]
+                if not positions:
+                    del self._edges[location]
+                    del self._opened[location]
+
+    def entry(self, being):
+        """
+        Return (opened, filed) for a being (or None if it isn't tracked): the number of the filing that
+        first put somebody where it is and the number of its own filing.  Neither changes until it moves.
+        being - Being object.
+        """
+        key = self._where.get(being)
+        if key is None:
+            return None
+        return (self._opened[key[0]], self._filed[being])
+
+    def rebuild(self, entries):
+        """
+        Replace everything with the beings in entries, filed where they are now in the order entry said.
+        entries - Iterable of (Being object, what entry returned for it).
+        """
+        self._nodes = {}
+        self._edges = {}
+        self._where = {}
+        self._filed = {}
+        self._opened = {}
+        self._sequence = 0
+        entries = sorted(entries, key=lambda item: item[1][1])
+        for being, (opened, filed) in entries:
+            self._file(being, opened, filed)
+            self._sequence = max(self._sequence, opened + 1, filed + 1)
+
+        # Places are looked at in the order they were opened
+        opened = self._opened
+        self._nodes = dict(sorted(self._nodes.items(), key=lambda item: opened[item[0]]))
+        self._edges = dict(sorted(self._edges.items(), key=lambda item: opened[item[0]]))
+
+    def snapshot(self):
+        """
+        Return where everybody is filed as plain data, with beings given by id (see restore).
+        The order of the places and of the beings in them is kept since encounters are checked in that order.
+        """
+        nodes = [(node, [being.id for being in beings]) for node, beings in self._nodes.items()]
+        edges = [(edge, [(position, [being.id for being in beings]) for position, beings in positions.items()])
+                 for edge, positions in self._edges.items()]
+        filed = [(being.id, number) for being, number in self._filed.items()]
+        return (nodes, edges, dict(self._opened), filed, self._sequence)
+
+    def restore(self, snapshot, beingFunc):
+        """
+        Replace everything with what snapshot returned.
+        beingFunc - A function object with args (beingId) that returns the Being object.
+        """
+        (nodes, edges, opened, filed, self._sequence) = snapshot
+        self._nodes = {}
+        self._edges = {}
+        self._where = {}
+        self._filed = dict((beingFunc(beingId), number) for beingId, number in filed)
+        self._opened = dict(opened)
+        for node, beingIds in nodes:
+            self._nodes[node] = [beingFunc(beingId) for beingId in beingIds]
+            for being in self._nodes[node]:
+                self._where[being] = (node, None)
+        for edge, positions in edges:
+            self._edges[edge] = {}
+            for position, beingIds in positions:
+                self._edges[edge][position] = [beingFunc(beingId) for beingId in beingIds]
+                for being in self._edges[edge][position]:
+                    self._where[being] = (edge, position)
+
+    def update(self, being):
+        """
+        Re-file a being after its location or position has changed.
+        being - Being object.
+        """
+        self.remove(being)
+        self.add(being)
+
+    def beingsAtNode(self, nodeName):
+        """Return a list of the beings at a node."""
+        return self._nodes.get(nodeName, [])
+
+    def beingsAtPosition(self, edge, destination, distanceLeft):
+        """
+        Return a list of the beings on an edge heading to destination with distanceLeft to go.
+        edge - Tuple of two node names that define an edge.
+        destination - Name of the node the beings are heading to.
+        distanceLeft - How far they still have to travel.
+        """
+        positions = self._edges.get(canonicalEdge(edge[0], edge[1]))
+        if not positions:
+            return []
+        return positions.get((destination, self._dayFunc() + distanceLeft), [])
+
+    def beingsOnEdge(self, edge):
+        """
+        Return a list of the beings on an edge ordered by their distance from the first node of the canonical edge.
+        edge - Tuple of two node names that define an edge.
+        """
+        retval = []
+        for (destination, distanceLeft, beings) in self.positionsOnEdge(edge):
+            retval += beings
+        return retval
+
+    def positionsOnEdge(self, edge):
+        """
+        Return a list of (destination, distanceLeft, list of Being objects) for every position on an edge
+        that somebody is at, ordered the way beingsOnEdge orders the beings.
+        edge - Tuple of two node names that define an edge.
+        """
+        edge = canonicalEdge(edge[0], edge[1])
+        positions = self._edges.get(edge)
+        if not positions:
+            return []
+        weight = self._distanceFunc(edge[0], edge[1])
+        today = self._dayFunc()
+
+        def distanceFromStart(position):
+            # Beings going opposite ways can be at the same distance so their destination breaks the tie
+            (destination, arrivalDay) = position
+            distanceLeft = arrivalDay - today
+            if destination == edge[0]:
+                return (distanceLeft, destination)
+            return (weight - distanceLeft, destination)
+        return [(destination, arrivalDay - today, positions[(destination, arrivalDay)])
+                for (destination, arrivalDay) in sorted(positions, key=distanceFromStart)]
+
+    def occupiedNodes(self):
+        """Return the names of all nodes that have at least one being on them."""
+        return self._nodes.keys()
+
+    def occupiedEdges(self):
+        """Return the canonical names of all edges that have at least one being on them."""
+        return self._edges.keys()
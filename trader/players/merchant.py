@@ -27,6 +27,9 @@ class MerchantPlayer(Player):
     def safeTravelUpdate(self, game: Game, distanceLeft: int):
         assert False
 
+    def wantsDailyUpdates(self) -> bool:
+        return False
+
     def voteInitState(self, game: Game, being: Being) -> EncounterStateCode:
         return EncounterStateCode.TRADE
 
@@ -34,15 +34,10 @@ class RandomPlayer(Player):
 
     def chooseDestination(self, game: Game) -> Optional[str]:
         being = game.getBeingByName(self._beingName)
-        attempts = len(game.graph.nodes()) * 10
-        while attempts:
-            newDestination = random.choice(game.possibleDestinations(being))
-            travelDistance = game.distance(being.currentLocation, newDestination)
-            if being.inventory.goods['fuel'] >= travelDistance:
-                break
-            attempts -= 1
-        if attempts == 0:
-            assert(False)  # We should have found a destination
+        fuel = being.inventory.goods['fuel']
+        assert(fuel >= game.distanceOracle.minEdgeWeight(being.currentLocation))  # We should be able to go somewhere
+        newDestination = random.choice([destination for destination in game.possibleDestinations(being)
+                                        if game.distance(being.currentLocation, destination) <= fuel])
         if self._verbose:
             print('{0} {1} -> {2}'.format(self._beingName, being.currentLocation, newDestination))
         return newDestination
@@ -51,6 +46,9 @@ class RandomPlayer(Player):
         if self._verbose:
             self._stdInPlayer.safeTravelUpdate(game, distanceLeft)
 
+    def wantsDailyUpdates(self) -> bool:
+        return self._verbose
+
     def voteInitState(self, game: Game, being: Being) -> EncounterStateCode:
         return random.choice((EncounterStateCode.COMBAT,
                               EncounterStateCode.TRADE))  # Need to add encounter.SEARCH here?
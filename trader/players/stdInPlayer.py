@@ -227,25 +227,28 @@ class StdInPlayer(Player):
                 print('You can\'t abort this, you must fight!')
 
     def combatEvents(self, game: Game, events: List[CombatEvent]):
+        name = game.beingName  # Combat events refer to beings by id
         for event in events:
             if event.eventCode == CombatEventCode.DAMAGE:
                 damage_event: DamageCombatEvent = event  # type: ignore
-                print('{0} does {1} points of damage to {2}'.format(damage_event.attacker, damage_event.damage, damage_event.defender))
+                print('{0} does {1} points of damage to {2}'.format(name(damage_event.attacker),
+                                                                    damage_event.damage,
+                                                                    name(damage_event.defender)))
             elif event.eventCode == CombatEventCode.DEATH:
                 death_event: DeathCombatEvent = event  # type: ignore
-                print('{0} dies'.format(death_event.being))
+                print('{0} dies'.format(name(death_event.being)))
             elif event.eventCode == CombatEventCode.ESCAPE:
                 escape_event: EscapeCombatEvent = event  # type: ignore
-                print('{0} escapes'.format(escape_event.being))
+                print('{0} escapes'.format(name(escape_event.being)))
             elif event.eventCode == CombatEventCode.FAIL_TO_ESCAPE:
                 fail_event: FailToEscapeCombatEvent = event  # type: ignore
-                print('{0} fails to escape'.format(fail_event.being))
+                print('{0} fails to escape'.format(name(fail_event.being)))
             elif event.eventCode == CombatEventCode.JOIN:
                 join_event: JoinCombatEvent = event  # type: ignore
-                print('{0} joins combat'.format(join_event.being))
+                print('{0} joins combat'.format(name(join_event.being)))
             elif event.eventCode == CombatEventCode.VICTORY:
                 victory_event: VictoryCombatEvent = event  # type: ignore
-                print('{0} wins!'.format(victory_event.being))
+                print('{0} wins!'.format(name(victory_event.being)))
             else:
                 assert(False)
 
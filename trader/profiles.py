@@ -1,9 +1,17 @@
+from array import array
 from enum import Enum
+import math
 import random
 
 
 class EventProfile:
-    """Class that defines under what circumstances something happens."""
+    """
+    Class that defines under what circumstances something happens.
+    EventProfile objects hold no game state (that lives in an EventStateTable) so one
+    profile can be attached to many places and shared by any number of games.
+    """
+    __slots__ = ('name', 'percentChance', 'dynamicFunc', 'description', 'nodes', 'edges', 'duration')
+
     def __init__(self, name, percentChance, dynamicFunc=None, description=None, nodes=(), edges=(), duration=1):
         """
         name - name of the event.
@@ -19,27 +27,173 @@ class EventProfile:
         self.percentChance = float(percentChance)
         self.dynamicFunc = dynamicFunc
         self.description = str(description)
-        self.nodes = nodes
-        self.edges = edges
+        self.nodes = tuple(nodes)
+        self.edges = tuple(edges)
         assert(duration != 0)  # That don't make no sense
         self.duration = int(duration)
-        self._startDay = None
-
-    def isHappening(self, day, otherEvents):
-        """Calculate the odds of this event happening now and return a bool."""
-        # If this event has happened before
-        if self._startDay:
-            # and if this event is still happening:
-            if day < self._startDay + self.duration:
-                return True
-        percentChance = self.percentChance
-        if self.dynamicFunc:
-            percentChance = self.dynamicFunc(day, otherEvents)
-        happening = random.randint(1, 100) <= percentChance
+
+    def dailyChance(self):
+        """Return the probability (0-1) that a constant chance event starts on any given day."""
+        # Same odds as rolling random.randint(1, 100) <= percentChance every day
+        return min(max(math.floor(self.percentChance), 0), 100) / 100
+
+    def sampleNextStartDay(self, fromDay, rng=random):
+        """
+        Draw the day the next occurrence of a constant chance event starts on from the geometric distribution.
+        fromDay - The first day the event could start on.
+        rng - Where to get random numbers (a random.Random object or the random module).
+        Returns None if the event can never happen.
+        """
+        chance = self.dailyChance()
+        if chance <= 0:
+            return None
+        if chance >= 1:
+            return fromDay
+        return fromDay + int(math.log(1.0 - rng.random()) / math.log(1.0 - chance))
+
+    def isDynamic(self):
+        """Return True iff the odds of this event change from day to day."""
+        return self.dynamicFunc is not None
+
+    def isHappening(self, day, otherEvents, table, location=None):
+        """
+        Calculate the odds of this event happening now and return a bool.
+        day - The current day.
+        otherEvents - Names of the other events already happening at this location.
+        table - EventStateTable holding the state of this event.
+        location - Where we are asking about (a node name, a canonical edge, or None for global events).
+        """
+        return table.isHappening(self, location, day, otherEvents)
+
+    def nextTransitionDay(self, day, table, location=None):
+        """
+        Return the next day after day on which this event stops or (re)starts happening.
+        Returns None for dynamic profiles (they have to be asked every day) and for events that never happen again.
+        day - The current day.
+        table - EventStateTable holding the state of this event.
+        location - See isHappening.
+        """
+        return table.nextTransitionDay(self, location, day)
+
+
+_NO_DAY = -1  # Marks "no occurrence" in EventStateTable
+_NOT_SAMPLED = -2  # Marks "next occurrence not drawn yet" in EventStateTable
+
+
+class EventStateTable:
+    """
+    The state of every event at every place for one game.
+    Each (location, event name) pair gets a slot and the state is kept in parallel arrays:
+    the day the current (or last) occurrence expires and the day the next occurrence starts.
+    Slots that change are added to unsavedSlots so an incremental save only has to write those (see changes).
+    """
+    def __init__(self, rng=random):
+        """rng - Where to get random numbers (a random.Random object or the random module)."""
+        self._rng = rng
+        self._slots = {}  # (location, event name) -> slot number
+        self._keys = []  # slot number -> (location, event name)
+        self._expiryDays = array('q')  # Day the current or last occurrence stops happening (or _NO_DAY)
+        self._nextStartDays = array('q')  # Day the next occurrence starts (or _NO_DAY / _NOT_SAMPLED)
+        self.unsavedSlots = set()  # Slots changed since the game was last saved
+
+    def __len__(self):
+        return len(self._slots)
+
+    def snapshot(self):
+        """Return the state of every event as plain data (see restore)."""
+        return (dict(self._slots), array('q', self._expiryDays), array('q', self._nextStartDays))
+
+    def restore(self, snapshot):
+        """Replace the state of every event with one returned by snapshot."""
+        (slots, expiryDays, nextStartDays) = snapshot
+        self._slots = dict(slots)
+        self._keys = [None] * len(self._slots)
+        for key, slot in self._slots.items():
+            self._keys[slot] = key
+        self._expiryDays = array('q', expiryDays)
+        self._nextStartDays = array('q', nextStartDays)
+        self.unsavedSlots = set(range(len(self._keys)))
+
+    def changes(self):
+        """Return the state of the events in unsavedSlots as plain data (see applyChanges)."""
+        return [(self._keys[slot], self._expiryDays[slot], self._nextStartDays[slot]) for slot in sorted(self.unsavedSlots)]
+
+    def applyChanges(self, changes):
+        """Change the state of some events to what changes returned."""
+        for (key, expiryDay, nextStartDay) in changes:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = len(self._keys)
+                self._slots[key] = slot
+                self._keys.append(key)
+                self._expiryDays.append(expiryDay)
+                self._nextStartDays.append(nextStartDay)
+            else:
+                self._expiryDays[slot] = expiryDay
+                self._nextStartDays[slot] = nextStartDay
+            self.unsavedSlots.add(slot)
+
+    def slot(self, eventProfile, location):
+        """Return the slot number for an event at a location, creating it if need be."""
+        key = (location, eventProfile.name)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._expiryDays)
+            self._slots[key] = slot
+            self._keys.append(key)
+            self._expiryDays.append(_NO_DAY)
+            self._nextStartDays.append(_NOT_SAMPLED)
+            self.unsavedSlots.add(slot)
+        return slot
+
+    def _advanceTo(self, eventProfile, slot, day):
+        """
+        Bring a constant chance event up to date.
+        Rather than rolling every day we draw the day of the next occurrence and only
+        draw again once it has started, so any number of days can be skipped for free.
+        """
+        nextStartDay = self._nextStartDays[slot]
+        if nextStartDay != _NOT_SAMPLED and (nextStartDay == _NO_DAY or nextStartDay > day):
+            return  # Nothing changes until the next occurrence starts
+        if nextStartDay == _NOT_SAMPLED:
+            nextStartDay = eventProfile.sampleNextStartDay(day, self._rng)
+            nextStartDay = _NO_DAY if nextStartDay is None else nextStartDay
+        while nextStartDay != _NO_DAY and nextStartDay <= day:
+            expiryDay = nextStartDay + eventProfile.duration
+            self._expiryDays[slot] = expiryDay
+            nextStartDay = eventProfile.sampleNextStartDay(expiryDay, self._rng)
+            nextStartDay = _NO_DAY if nextStartDay is None else nextStartDay
+        self._nextStartDays[slot] = nextStartDay
+        self.unsavedSlots.add(slot)
+
+    def isHappening(self, eventProfile, location, day, otherEvents):
+        """See EventProfile.isHappening."""
+        slot = self.slot(eventProfile, location)
+        if not eventProfile.isDynamic():
+            self._advanceTo(eventProfile, slot, day)
+            return day < self._expiryDays[slot]
+
+        # If this event is still happening from an earlier day
+        if day < self._expiryDays[slot]:
+            return True
+        percentChance = eventProfile.dynamicFunc(day, otherEvents)
+        happening = self._rng.randint(1, 100) <= percentChance
         if happening:
-            self._startDay = day
+            self._expiryDays[slot] = day + eventProfile.duration
+            self.unsavedSlots.add(slot)
         return happening
 
+    def nextTransitionDay(self, eventProfile, location, day):
+        """See EventProfile.nextTransitionDay."""
+        if eventProfile.isDynamic():
+            return None
+        slot = self.slot(eventProfile, location)
+        self._advanceTo(eventProfile, slot, day)
+        if day < self._expiryDays[slot]:
+            return self._expiryDays[slot]
+        nextStartDay = self._nextStartDays[slot]
+        return None if nextStartDay == _NO_DAY else nextStartDay
+
 
 class CombatProfile:
     """Class that describes an enemy and how often that enemy is encountered."""
@@ -51,8 +205,8 @@ class CombatProfile:
         self._eventProfile = eventProfile
         self.enemyVessel = enemyVessel
 
-    def isHappening(self, day, otherEvents):
-        return self._eventProfile.isHappening(day, otherEvents)
+    def isHappening(self, day, otherEvents, table, location=None):
+        return self._eventProfile.isHappening(day, otherEvents, table, location)
 
 
 class ItemClassCode(Enum):
@@ -81,6 +235,18 @@ class Item:
         self.dynamicFunc = dynamicFunc
         self._classCode = classCode
 
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError('{0} is frozen'.format(self.__dict__['name']))
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        """Make this item read only (World catalogs are shared by every game so nothing may change them)."""
+        self._frozen = True
+
+    def isFrozen(self):
+        return self.__dict__.get('_frozen', False)
+
     def classCode(self):
         return self._classCode
 
@@ -132,11 +298,17 @@ class Vessel(Item):
         self.upgradePoints = int(upgradePoints)
         self.upgrades = []
 
+    def freeze(self):
+        self.upgrades = tuple(self.upgrades)
+        Item.freeze(self)
+
     def addUpgrade(self, upgrade):
         """
-        Add a new upgrade to this vessel.
+        Add a new upgrade to this vessel.  Frozen vessels can't be upgraded.
         upgrade - A VesselUpgrade object.
         """
+        if self.isFrozen():
+            raise AttributeError('{0} is frozen'.format(self.name))
 
         # We better have enough upgrade points to do this
         assert(self.upgradePoints >= upgrade.upgradePoints)
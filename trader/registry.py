@@ -0,0 +1,43 @@
+class BeingRegistry:
+    """
+    Gives every being in a game a stable integer id.
+    Ids are handed out in order starting at zero and never reused, so looking a being up
+    by id is a list index and looking one up by name is a single dictionary lookup.
+    Events and encounters refer to beings by id and only turn them into names for display.
+    """
+    def __init__(self):
+        self._beings = []  # id -> Being
+        self._ids = {}  # name -> id
+
+    def __len__(self):
+        return len(self._beings)
+
+    def register(self, being):
+        """
+        Give a being the next id and return it.
+        being - Being object.  Its name has to be unique in the game.
+        """
+        assert(being.name not in self._ids)
+        beingId = len(self._beings)
+        self._beings.append(being)
+        self._ids[being.name] = beingId
+        return beingId
+
+    def being(self, beingId):
+        """Return the Being with an id."""
+        return self._beings[beingId]
+
+    def beingByName(self, name):
+        """Return the Being with a name (or None if there isn't one)."""
+        beingId = self._ids.get(name)
+        if beingId is None:
+            return None
+        return self._beings[beingId]
+
+    def id(self, name):
+        """Return the id of the being with a name.  Raises KeyError if there isn't one."""
+        return self._ids[name]
+
+    def name(self, beingId):
+        """Return the name of the being with an id."""
+        return self._beings[beingId].name
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+import heapq
+
+
+class Route:
+    """A planned trip through the world."""
+    __slots__ = ('nodes', 'distance', 'refuelStops')
+
+    def __init__(self, nodes, distance, refuelStops=()):
+        """
+        nodes - Tuple of node names from the start to the destination (both included).
+        distance - Total distance (and fuel) the trip takes.
+        refuelStops - Tuple of the node names along the way where the being has to refuel.
+        """
+        self.nodes = nodes
+        self.distance = distance
+        self.refuelStops = refuelStops
+
+    def __repr__(self):
+        return 'Route({0}, {1}, {2})'.format(self.nodes, self.distance, self.refuelStops)
+
+    def nextDestination(self):
+        """Return the first node to travel to (or None if the route goes nowhere)."""
+        if len(self.nodes) < 2:
+            return None
+        return self.nodes[1]
+
+
+class RoutePlanner:
+    """
+    Plans the shortest multi-hop trips a being can actually make with the fuel it has.
+    Every day of travel burns one fuel, so without refueling a trip is possible if it is no longer
+    than the fuel on board.  Beings can refuel at refuel nodes, which tops them up to tankSize.
+    Searches are cached by (source, fuel bucket).  A bucket's search is done with the least fuel
+    in the bucket so its routes work for every fuel amount in it; when that isn't good enough for
+    a question (no route, or a longer one than an unconstrained shortest path) an exact search is done.
+    """
+    def __init__(self, csr, distanceOracle, refuelNodes=(), tankSize=None, fuelBucketSize=10, cacheSize=1024):
+        """
+        csr - CSRGraph of the world.
+        distanceOracle - DistanceOracle with the current edge weights.
+        refuelNodes - Names of the nodes where beings can refuel.
+        tankSize - How much fuel a being has after refueling.  None means as much as it started the trip with.
+        fuelBucketSize - How many fuel amounts share a cache entry.
+        cacheSize - How many searches to keep.
+        """
+        self._csr = csr
+        self._distanceOracle = distanceOracle
+        self._refuelIds = frozenset(csr.nodeId(node) for node in refuelNodes)
+        self._tankSize = tankSize
+        self._fuelBucketSize = fuelBucketSize
+        self._cacheSize = cacheSize
+        self._searches = OrderedDict()  # (source id, fuel) -> {node id -> (distance, path ids, refuel stop ids)}
+
+    def withOracle(self, distanceOracle):
+        """Return a planner with the same settings as this one that uses another DistanceOracle."""
+        retval = RoutePlanner(self._csr, distanceOracle, tankSize=self._tankSize,
+                              fuelBucketSize=self._fuelBucketSize, cacheSize=self._cacheSize)
+        retval._refuelIds = self._refuelIds
+        return retval
+
+    def clear(self):
+        """Forget every cached search (call this when edge weights change)."""
+        self._searches.clear()
+
+    def _search(self, sourceId, fuel):
+        """
+        Label setting search over (node, fuel left) from one node.
+        Returns a dictionary of node id -> (distance, path ids, refuel stop ids)
+        for the shortest feasible route to each node.
+        """
+        csr = self._csr
+        offsets = csr._offsets
+        targets = csr._targets
+        weights = self._distanceOracle._weights
+        tankSize = fuel if self._tankSize is None else self._tankSize
+        refuelIds = self._refuelIds
+
+        if sourceId in refuelIds:
+            fuel = max(fuel, tankSize)
+        labels = [(sourceId, None, ())]  # (node id, parent label index, refuel stop ids)
+        queue = [(0, -fuel, 0)]  # (distance, -fuel left, label index)
+        settled = {}  # node id -> list of (distance, fuel left) labels already expanded
+        retval = {}
+        while queue:
+            (distance, negativeFuel, labelIndex) = heapq.heappop(queue)
+            fuelLeft = -negativeFuel
+            (nodeId, parentIndex, refuelStops) = labels[labelIndex]
+            nodeLabels = settled.setdefault(nodeId, [])
+            if any(fuelLeft <= settledFuel for (settledDistance, settledFuel) in nodeLabels):
+                continue  # Somebody got here sooner with at least as much fuel
+            nodeLabels.append((distance, fuelLeft))
+            if nodeId not in retval:
+                path = []
+                index = labelIndex
+                while index is not None:
+                    path.append(labels[index][0])
+                    index = labels[index][1]
+                retval[nodeId] = (distance, tuple(reversed(path)), refuelStops)
+            for i in range(offsets[nodeId], offsets[nodeId + 1]):
+                weight = weights[i]
+                if weight > fuelLeft:
+                    continue
+                neighborId = targets[i]
+                neighborFuel = fuelLeft - weight
+                neighborStops = refuelStops
+                if neighborId in refuelIds and neighborFuel < tankSize:
+                    neighborFuel = tankSize
+                    neighborStops = refuelStops + (neighborId,)
+                labels.append((neighborId, labelIndex, neighborStops))
+                heapq.heappush(queue, (distance + weight, -neighborFuel, len(labels) - 1))
+        return retval
+
+    def _cachedSearch(self, sourceId, fuel):
+        key = (sourceId, fuel)
+        search = self._searches.get(key)
+        if search is None:
+            search = self._search(sourceId, fuel)
+            self._searches[key] = search
+            if len(self._searches) > self._cacheSize:
+                self._searches.popitem(last=False)
+        else:
+            self._searches.move_to_end(key)
+        return search
+
+    def _route(self, found):
+        (distance, pathIds, refuelStopIds) = found
+        nodeName = self._csr.nodeName
+        return Route(tuple(nodeName(nodeId) for nodeId in pathIds),
+                     distance,
+                     tuple(nodeName(nodeId) for nodeId in refuelStopIds))
+
+    def planRoute(self, source, destination, fuel):
+        """
+        Return the shortest Route from source to destination that can be made with fuel (or None if there isn't one).
+        source - Name of the node to start at.
+        destination - Name of the node to get to.
+        fuel - How much fuel the being has.
+        """
+        sourceId = self._csr.nodeId(source)
+        destinationId = self._csr.nodeId(destination)
+        bucketFuel = fuel - fuel % self._fuelBucketSize
+        found = self._cachedSearch(sourceId, bucketFuel).get(destinationId)
+        if found is None or (bucketFuel != fuel and found[0] != self._distanceOracle.shortestDistance(source, destination)):
+            found = self._cachedSearch(sourceId, fuel).get(destinationId)
+        if found is None:
+            return None
+        return self._route(found)
+
+    def planRoutes(self, queries):
+        """
+        Plan many routes at once.  Queries from the same place with similar fuel share one search.
+        queries - Iterable of (source, destination, fuel) tuples.
+        Returns a list with a Route (or None) for each query.
+        """
+        queries = list(queries)
+        retval = [None] * len(queries)
+
+        # Answer them grouped by cache key so each search is done once even if the batch is bigger than the cache
+        def key(index):
+            (source, destination, fuel) = queries[index]
+            return (source, fuel - fuel % self._fuelBucketSize)
+        for index in sorted(range(len(queries)), key=key):
+            retval[index] = self.planRoute(*queries[index])
+        return retval
+
+    def reachable(self, source, fuel):
+        """
+        Return a dictionary of node name -> distance for every node that can be reached from source with fuel.
+        source - Name of the node to start at.
+        fuel - How much fuel the being has.
+        """
+        nodeName = self._csr.nodeName
+        search = self._cachedSearch(self._csr.nodeId(source), fuel)
+        return dict((nodeName(nodeId), found[0]) for nodeId, found in search.items())
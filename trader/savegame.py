@@ -0,0 +1,153 @@
+"""
+Saving a Game to a file and loading it back.
+
+File layout (all integers little endian):
+  magic         8 bytes  b'TRADERS2'
+  header size   uint32
+  header        JSON object: the World's file name and hash, the Game options, and the number of players
+  segments...   kind uint8, size uint32, zlib compressed pickle of Game.captureState() or Game.captureChanges()
+
+The first segment is a full save.  An incremental save appends a delta segment instead: what
+Game.captureChanges returns, which only has the beings and events that changed since the previous save.
+Loading applies the deltas to the full save in order, and ignores a last segment that was cut short by a crash.
+"""
+import json
+import os
+import struct
+from trader.keyframes import dumpState, loadState
+from trader.profiles import EventStateTable
+from trader.worldloader import loadWorld
+
+
+MAGIC = b'TRADERS2'
+_HEADER_SIZE = struct.Struct('<I')
+_SEGMENT = struct.Struct('<BI')  # kind, size
+_FULL = 0
+_DELTA = 1
+
+
+class SaveError(ValueError):
+    """A save file can't be loaded (or can't be loaded into this game)."""
+    pass
+
+
+def _writeSegment(f, kind, data):
+    f.write(_SEGMENT.pack(kind, len(data)))
+    f.write(data)
+
+
+def saveGame(game, filename, incremental=False):
+    """
+    Save a game to a file.
+    game - Game object.
+    filename - Name of the save file.
+    incremental - If True and the game was last saved to (or loaded from) this file, only the beings that
+                  changed since then are written, appended to the file.  Otherwise the file is replaced.
+    """
+    if incremental and game._saveFilename == filename and os.path.exists(filename):
+        with open(filename, 'ab') as f:
+            _writeSegment(f, _DELTA, dumpState(game.captureChanges(), game.world))
+    else:
+        header = {'worldSource': game.world.source,
+                  'worldHash': game.world.sourceHash,
+                  'eventDriven': game.scheduler is not None,
+                  'lazyEvents': game.lazyEvents,
+                  'batchTravel': game.batchTravel,
+                  'autoResolveCombat': game.autoResolveCombat,
+                  'players': len(game.beings)}
+        data = json.dumps(header).encode('utf-8')
+        tempFilename = filename + '.tmp'
+        with open(tempFilename, 'wb') as f:
+            f.write(MAGIC + _HEADER_SIZE.pack(len(data)) + data)
+            _writeSegment(f, _FULL, dumpState(game.captureState(), game.world))
+        os.replace(tempFilename, filename)  # So a crash while saving leaves the last save alone
+    game.forgetChanges()
+    game._saveFilename = filename
+
+
+def _readHeader(f, filename):
+    """Return the header of an open save file, leaving the file at the first segment."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise SaveError('{0} is not a save file'.format(filename))
+    data = f.read(_HEADER_SIZE.size)
+    if len(data) < _HEADER_SIZE.size:
+        raise SaveError('{0} is not a save file'.format(filename))
+    (size,) = _HEADER_SIZE.unpack(data)
+    data = f.read(size)
+    if len(data) < size:
+        raise SaveError('{0} is not a save file'.format(filename))
+    return json.loads(data.decode('utf-8'))
+
+
+def _readSegments(f):
+    """Yield (kind, data) for each complete segment of an open save file, reading one segment at a time."""
+    while True:
+        data = f.read(_SEGMENT.size)
+        if len(data) < _SEGMENT.size:
+            return
+        (kind, size) = _SEGMENT.unpack(data)
+        data = f.read(size)
+        if len(data) < size:
+            return  # A segment cut short by a crash
+        yield (kind, data)
+
+
+def _applyChanges(beings, eventStates, state, changes):
+    """
+    Apply what Game.captureChanges returned to a state returned by Game.captureState.
+    beings - Dictionary of being name -> row that stands in for state['beings'] while deltas are applied.
+    eventStates - EventStateTable that stands in for state['eventStates'] while deltas are applied.
+    """
+    for row in changes['beings']:
+        beings[row[0]] = row
+    eventStates.applyChanges(changes['eventStates'])
+    del changes['beings']
+    del changes['eventStates']
+    state.update(changes)
+
+
+def loadGame(gameClass, filename, players, world=None, **gameOptions):
+    """
+    Return a new Game in the state it was last saved in.
+    gameClass - Game (or a subclass of it).
+    filename - Name of the save file.
+    players - Player objects, in the same order as when it was saved.  Their initGame has to name
+              their beings the same way it did then.  Players keep their own state so it isn't saved.
+    world - An already loaded World object to play in (instead of the one the save names).
+    gameOptions - Game keyword arguments that don't change how it plays (recordEvents, eventSink, ...).
+    """
+    with open(filename, 'rb') as f:
+        header = _readHeader(f, filename)
+        if len(players) != header['players']:
+            raise SaveError('{0} was saved with {1} players, not {2}'.format(filename, header['players'], len(players)))
+        if world is None:
+            world = loadWorld(header['worldSource'])
+            if header['worldHash'] and world.sourceHash != header['worldHash']:
+                raise SaveError('{0} was saved in a different version of {1}'.format(filename, header['worldSource']))
+        for option in ('eventDriven', 'lazyEvents', 'batchTravel', 'autoResolveCombat'):
+            gameOptions[option] = header.get(option, False)
+
+        # Segments are read and applied one at a time so only one of them is in memory at once
+        state = None
+        for (kind, data) in _readSegments(f):
+            if state is None:
+                if kind != _FULL:
+                    break
+                state = loadState(data, world)
+                beings = dict((row[0], row) for row in state['beings'])
+                eventStates = EventStateTable()
+                eventStates.restore(state['eventStates'])
+            else:
+                _applyChanges(beings, eventStates, state, loadState(data, world))
+        if state is None:
+            raise SaveError('{0} has no full save in it'.format(filename))
+        state['beings'] = list(beings.values())  # Dictionaries keep the order of the full save
+        state['eventStates'] = eventStates.snapshot()
+
+    game = gameClass(players, world=world, seed=state['seed'], **gameOptions)
+    if set(row[0] for row in state['beings']) != set(being.name for being in game.beings):
+        raise SaveError('the players named their beings differently than when {0} was saved'.format(filename))
+    game.restoreState(state)
+    game.forgetChanges()
+    game._saveFilename = filename
+    return game
@@ -0,0 +1,87 @@
+import heapq
+from trader.occupancy import canonicalEdge
+
+
+class DayScheduler:
+    """
+    Keeps a priority queue of the next days on which something interesting can happen.
+    Interesting means a being arrives, runs out of fuel, or could meet another being on an edge.
+    When every living being is travelling quietly the Game can jump the clock straight to the
+    next interesting day instead of stepping through each idle day.
+    Entries are only ever a lower bound so a stale entry just costs one ordinary day.
+    """
+    def __init__(self):
+        self._queue = []  # Heap of (day, sequence, reason)
+        self._sequence = 0  # Tie breaker so the heap never compares reasons
+
+    def schedule(self, day, reason):
+        """
+        Mark a day as interesting.
+        day - The day number.
+        reason - A short string saying why (handy when debugging).
+        """
+        heapq.heappush(self._queue, (day, self._sequence, reason))
+        self._sequence += 1
+
+    def snapshot(self):
+        """Return the schedule as plain data (see restore)."""
+        return (list(self._queue), self._sequence)
+
+    def restore(self, snapshot):
+        """Replace the schedule with one returned by snapshot."""
+        (queue, self._sequence) = snapshot
+        self._queue = list(queue)
+        heapq.heapify(self._queue)
+
+    def beingTravelling(self, game, being):
+        """
+        Schedule everything that can happen to a travelling being on its current edge.
+        This is called when a being embarks and again after any encounter it survives on an edge.
+        game - Game object.
+        being - Being object that is on an edge.
+        """
+        distanceLeft = being._state._distance
+        self.schedule(game.day + distanceLeft, 'arrival')
+        fuel = being.inventory.goods['fuel']
+        if fuel < distanceLeft:
+            self.schedule(game.day + max(fuel, 1), 'out of fuel')
+
+        # Anybody already on this edge might be met along the way
+        edgeWeight = game.distance(being.lastDestination, being.destination)
+        for otherBeing in game.occupancy.beingsOnEdge(canonicalEdge(being.lastDestination, being.destination)):
+            if otherBeing is being:
+                continue
+            otherDistanceLeft = otherBeing._state._distance
+            if otherBeing.destination == being.destination:
+                # Same direction at the same speed so they only meet if they are neck and neck.  When beings take
+                # their turns one at a time the one behind catches up with the other every day before it moves.
+                if abs(otherDistanceLeft - distanceLeft) <= 1:
+                    self.schedule(game.day + 1, 'meeting')
+            else:
+                # Opposing directions close the gap by two every day.  They meet about (gap + 1) // 2 days from
+                # now but exactly when depends on who moves first, so every day it could be is scheduled.
+                gap = distanceLeft + otherDistanceLeft - edgeWeight
+                if gap >= -1:
+                    for day in range(max(gap // 2 - 1, 1), (gap + 1) // 2 + 2):
+                        self.schedule(game.day + day, 'meeting')
+
+    def nextInterestingDay(self, game):
+        """
+        Return the next day that must be played out in full.
+        game - Game object.
+        """
+        tomorrow = game.day + 1
+
+        # Beings at nodes make decisions every day
+        if game.occupancy.occupiedNodes():
+            return tomorrow
+
+        # Players that asked to hear about every travel day have to get them
+        if game.dailyUpdateBeings:
+            return tomorrow
+
+        while self._queue and self._queue[0][0] < tomorrow:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            return tomorrow
+        return self._queue[0][0]
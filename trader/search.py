@@ -1,4 +1,5 @@
 from enum import IntEnum
+from trader.eventlog import EventFamily
 
 
 class SearchAction(IntEnum):
@@ -44,18 +45,23 @@ state_table = (  # BOARD                    SOLICIT_BRIDE                    PAS
 
 class Search:
     """Manage a search and seizure session between multiple beings."""
-    def __init__(self, game, beings):
+    def __init__(self, game, beings, emit=None, bounded=False):
         """
         game - The game object.
         beings - collection of Being objects to particpate in the search and seizure event.
+        Events refer to the beings by id.
+        emit - A function object with args (event) that is called for every event as it happens.
+        bounded - If True the event log only keeps the last round's events.
         """
         assert(len(beings) == 2)
         self.beings = {}
         for being in beings:
-            self.beings[being.name] = being
+            self.beings[being.id] = being
         self._keepGoing = True
         self._game = game
 
+        self._emit = emit
+        self._bounded = bounded
         self._eventLog = []
 
     def keepGoing(self):
@@ -63,23 +69,32 @@ class Search:
         return self._keepGoing
 
     def eventLog(self):
-        """Return the full event log for this search and seizure session."""
+        """Return the event log for this search and seizure session (just the last round's events if it is bounded)."""
         return self._eventLog
 
+    def snapshot(self):
+        """Return a SearchSnapshot of where this search and seizure session is now."""
+        beings = list(self.beings.values())
+        return SearchSnapshot(tuple(being.id for being in beings),
+                              [being.inventory.money for being in beings],
+                              [dict(being.inventory.goods) for being in beings])
+
     def _recordEvent(self, event, roundEvents):
         """
         Record a search and seizure event.
         event - The new event being recorded.
         roundEvents - Collection of events for this round we'll add to.
         """
-        roundEvents += [event]
-        self._eventLog += [event]
+        roundEvents.append(event)
+        self._eventLog.append(event)
+        if self._emit:
+            self._emit(event)
 
-    def _getOtherBeing(self, beingName):
-        """Given a being name return the Being of the other guy."""
+    def _getOtherBeing(self, beingId):
+        """Given a being id return the Being of the other guy."""
         assert(len(self.beings) == 2)
         for being in self.beings:
-            if being == beingName:
+            if being == beingId:
                 continue
             return self.beings[being]
         assert(False)
@@ -88,10 +103,12 @@ class Search:
     def doRound(self, commands):
         """
         Do a single round of the search encounter and return a list of SearchEvents that happened.
-        commands - Dictionary from being name -> SearchAction.
+        commands - Dictionary from being id -> SearchAction.
         Returns the search events generated (in order) during the round.
         """
         searchEvents = []  # SearchEvents for this round
+        if self._bounded:
+            del self._eventLog[:]
 
         for initiator in commands:
             currentState = SearchState.STATE_START
@@ -108,46 +125,46 @@ class Search:
                 assert(newState != XXX)
 
                 if newState == SearchState.STATE_BOARD:
-                    self._recordEvent(BoardRequestEvent(initiatorBeing.name,
-                                                        responderBeing.name), searchEvents)
+                    self._recordEvent(BoardRequestEvent(initiatorBeing.id,
+                                                        responderBeing.id), searchEvents)
                     searchAction = responderBeing.player.evaluateBoardRequest(self._game,
                                                                               responderBeing,
                                                                               initiatorBeing)
                     if searchAction == SearchAction.PASS:
-                        self._recordEvent(BoardRequestRefusalEvent(initiatorBeing.name,
-                                                                   responderBeing.name), searchEvents)
+                        self._recordEvent(BoardRequestRefusalEvent(initiatorBeing.id,
+                                                                   responderBeing.id), searchEvents)
                     continue
                 elif newState == SearchState.STATE_SOLICIT_BRIBE:
-                    self._recordEvent(SolicitBribeEvent(initiatorBeing.name,
-                                                        responderBeing.name), searchEvents)
+                    self._recordEvent(SolicitBribeEvent(initiatorBeing.id,
+                                                        responderBeing.id), searchEvents)
                     (searchAction, bribeAmount) = responderBeing.player.evaluateBribeSolicitation(self._game,
                                                                                                   responderBeing,
                                                                                                   initiatorBeing)
                     if searchAction == SearchAction.PASS:
-                        self._recordEvent(RefuseBribeEvent(responderBeing.name,
-                                                           initiatorBeing.name), searchEvents)
+                        self._recordEvent(RefuseBribeEvent(responderBeing.id,
+                                                           initiatorBeing.id), searchEvents)
                     continue
                 elif newState == SearchState.STATE_SEIZURE:
                     seizeInventory = initiatorBeing.player.seize(self._game, responderBeing.inventory)
                     initiatorBeing.inventory.add(seizeInventory)
                     responderBeing.inventory.subtract(seizeInventory)
-                    self._recordEvent(SeizeEvent(initiatorBeing.name,
-                                                 responderBeing.name,
+                    self._recordEvent(SeizeEvent(initiatorBeing.id,
+                                                 responderBeing.id,
                                                  seizeInventory), searchEvents)
                     break
                 elif newState == SearchState.STATE_COMBAT:
                     if lastState == SearchState.STATE_START:
-                        self._recordEvent(FightEvent(initiatorBeing.name,
-                                                     responderBeing.name), searchEvents)
+                        self._recordEvent(FightEvent(initiatorBeing.id,
+                                                     responderBeing.id), searchEvents)
                     else:
-                        self._recordEvent(FightEvent(responderBeing.name,
-                                                     initiatorBeing.name), searchEvents)
+                        self._recordEvent(FightEvent(responderBeing.id,
+                                                     initiatorBeing.id), searchEvents)
                     break
                 elif newState == SearchState.STATE_PASS:
                     break
                 elif newState == SearchState.STATE_PAY:
-                    self._recordEvent(PayBribeEvent(responderBeing.name,
-                                                    responderBeing.name,
+                    self._recordEvent(PayBribeEvent(responderBeing.id,
+                                                    initiatorBeing.id,
                                                     bribeAmount), searchEvents)
                     responderBeing.inventory.money -= bribeAmount
                     initiatorBeing.inventory.money += bribeAmount
@@ -158,127 +175,298 @@ class Search:
         return searchEvents
 
 
+def submitToBoarding(snapshot, meId, themId):
+    """A SearchSnapshot boarding answer function that always lets them aboard."""
+    return SearchAction.SUBMIT
+
+
+def refuseBribe(snapshot, meId, themId):
+    """A SearchSnapshot bribe answer function that never pays."""
+    return (SearchAction.PASS, 0)
+
+
+def seizeEverything(snapshot, meId, themGoods):
+    """A SearchSnapshot seize function that takes all of their goods."""
+    return dict(themGoods)
+
+
+class SearchSnapshot:
+    """
+    A search and seizure session reduced to values: the two beings' money and goods, and how it ended.
+    Stepping a snapshot plays a round through the same state table as Search.doRound.  Answers to boarding
+    and bribe requests and what gets seized come from plain functions instead of players, and no Being
+    or Inventory is touched.
+    """
+    __slots__ = ('ids', 'money', 'goods', 'outcomes', '_keepGoing', 'rounds')
+
+    def __init__(self, ids, money, goods):
+        """
+        ids - Tuple of the two being ids.
+        money - List of how much money each has, in the same order.
+        goods - List of dictionaries of good name -> count for each, in the same order.
+        """
+        assert(len(ids) == 2)
+        self.ids = ids
+        self.money = money
+        self.goods = goods
+        self.outcomes = ()  # The SearchState each initiator ended up in last round, in command order
+        self._keepGoing = True
+        self.rounds = 0
+
+    def clone(self):
+        """Return a copy that can be stepped without changing this one."""
+        retval = SearchSnapshot.__new__(SearchSnapshot)
+        retval.ids = self.ids
+        retval.money = list(self.money)
+        retval.goods = [dict(goods) for goods in self.goods]
+        retval.outcomes = self.outcomes
+        retval._keepGoing = self._keepGoing
+        retval.rounds = self.rounds
+        return retval
+
+    def keepGoing(self):
+        """Returns true iff nobody has started a fight or both passed (which is when the encounter moves on)."""
+        return self._keepGoing
+
+    def moneyOf(self, beingId):
+        """Return how much money a being has."""
+        return self.money[self.ids.index(beingId)]
+
+    def goodsOf(self, beingId):
+        """Return the dictionary of good name -> count for a being."""
+        return self.goods[self.ids.index(beingId)]
+
+    def step(self, commands, board=submitToBoarding, bribe=refuseBribe, seize=seizeEverything):
+        """
+        Play one round, changing this snapshot.
+        commands - Dictionary from being id -> SearchAction.
+        board - A function object with args (snapshot, meId, themId) that returns the SearchAction
+                answering a boarding request (like Player.evaluateBoardRequest).
+        bribe - A function object with args (snapshot, meId, themId) that returns (SearchAction, amount)
+                answering a bribe solicitation (like Player.evaluateBribeSolicitation).
+        seize - A function object with args (snapshot, meId, themGoods) that returns a dictionary of
+                good name -> count to take from the boarded being (like Player.seize).
+        """
+        self.rounds += 1
+        if all(searchAction == SearchAction.PASS for searchAction in commands.values()):
+            self.outcomes = tuple(SearchState.STATE_PASS for initiator in commands)
+            self._keepGoing = False
+            return
+        outcomes = []
+        for initiator in commands:
+            currentState = SearchState.STATE_START
+            searchAction = commands[initiator]
+            bribeAmount = 0
+            me = self.ids.index(initiator)
+            them = 1 - me
+
+            while currentState in (SearchState.STATE_START, SearchState.STATE_BOARD, SearchState.STATE_SOLICIT_BRIBE):
+                currentState = state_table[int(currentState)][int(searchAction)]
+                assert(currentState != XXX)
+                if currentState == SearchState.STATE_BOARD:
+                    searchAction = board(self, self.ids[them], initiator)
+                elif currentState == SearchState.STATE_SOLICIT_BRIBE:
+                    (searchAction, bribeAmount) = bribe(self, self.ids[them], initiator)
+                elif currentState == SearchState.STATE_SEIZURE:
+                    for goodName, count in seize(self, initiator, self.goods[them]).items():
+                        self.goods[me][goodName] = self.goods[me].get(goodName, 0) + count
+                        left = self.goods[them].get(goodName, 0) - count
+                        if left > 0:
+                            self.goods[them][goodName] = left
+                        else:
+                            self.goods[them].pop(goodName, None)
+                elif currentState == SearchState.STATE_PAY:
+                    self.money[them] -= bribeAmount
+                    self.money[me] += bribeAmount
+            outcomes.append(currentState)
+        self.outcomes = tuple(outcomes)
+        if SearchState.STATE_COMBAT in outcomes:
+            self._keepGoing = False
+
+    def rollout(self, policy, maxRounds=100, **answers):
+        """
+        Return a clone that has been stepped until the session is over (or maxRounds more rounds have been played).
+        policy - A function object with args (snapshot) that returns the commands for the next round.
+        maxRounds - Most rounds to play.
+        answers - board, bribe, and seize functions (see step).
+        """
+        retval = self.clone()
+        for x in range(maxRounds):
+            if not retval.keepGoing():
+                break
+            retval.step(policy(retval), **answers)
+        return retval
+
+
 class SearchEvent:
     """Base class for all events possible in search and seizure."""
+    __slots__ = ('eventCode',)
+    family = EventFamily.SEARCH
+
     def __init__(self, eventCode):
         """
         eventCode - SearchEvent that identifies the most derived class.
         """
         self.eventCode = int(eventCode)
 
+    def columns(self):
+        """Return (actor, target, amount) for a ColumnarEventLog."""
+        raise NotImplementedError("columns is virtual and must be overridden.")
+
+    def describe(self, game):
+        """
+        Return a readable description of the event (events hold being ids, so the names come from the game).
+        game - The Game the event happened in.
+        """
+        raise NotImplementedError("describe is virtual and must be overridden.")
+
 
 class BoardRequestEvent(SearchEvent):
     """A board request has taken place"""
+    __slots__ = ('boarder', 'boardee')
+
     def __init__(self, boarder, boardee):
         """
-        boarder - The being requesting boarding.
-        boardee - The being being requested.
+        boarder - Id of the being requesting boarding.
+        boardee - Id of the being being requested.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_BOARD)
-        self.boarder = str(boarder)
-        self.boardee = str(boardee)
+        self.boarder = boarder
+        self.boardee = boardee
+
+    def columns(self):
+        return (self.boarder, self.boardee, 0)
 
-    def __str__(self):
-        return 'BOARD REQUEST\nboarder={0}\nboardee={1}'.format(self.boarder,
-                                                                self.boardee)
+    def describe(self, game):
+        name = game.beingName
+        return 'BOARD REQUEST\nboarder={0}\nboardee={1}'.format(name(self.boarder), name(self.boardee))
 
 
 class BoardRequestRefusalEvent(SearchEvent):
     """A board request has been refused"""
+    __slots__ = ('boarder', 'boardee')
+
     def __init__(self, boarder, boardee):
         """
-        boarder - The being requesting boarding.
-        boardee - The being being requested.
+        boarder - Id of the being requesting boarding.
+        boardee - Id of the being being requested.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_BOARD_REFUSE)
-        self.boarder = str(boarder)
-        self.boardee = str(boardee)
+        self.boarder = boarder
+        self.boardee = boardee
+
+    def columns(self):
+        return (self.boardee, self.boarder, 0)
 
-    def __str__(self):
-        return 'REFUSAL\nboarder={0}\nboardee={1}'.format(self.boarder,
-                                                          self.boardee)
+    def describe(self, game):
+        name = game.beingName
+        return 'REFUSAL\nboarder={0}\nboardee={1}'.format(name(self.boarder), name(self.boardee))
 
 
 class SeizeEvent(SearchEvent):
     """A boarding and subsequent seizure has taken place"""
+    __slots__ = ('boarder', 'boardee', 'seizedInventory')
+
     def __init__(self, boarder, boardee, seizedInventory):
         """
-        boarder - The being requesting boarding.
-        boardee - The being being requested.
+        boarder - Id of the being requesting boarding.
+        boardee - Id of the being being requested.
         seizedInventory - Inventory object of the seized stuff.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_SEIZE)
-        self.boarder = str(boarder)
-        self.boardee = str(boardee)
+        self.boarder = boarder
+        self.boardee = boardee
         self.seizedInventory = seizedInventory
 
-    def __str__(self):
-        return 'SEIZE\nboarder={0}\nboardee={1}'.format(self.boarder,
-                                                        self.boardee)
+    def columns(self):
+        return (self.boarder, self.boardee, sum(self.seizedInventory.goods.values()))
+
+    def describe(self, game):
+        name = game.beingName
+        return 'SEIZE\nboarder={0}\nboardee={1}'.format(name(self.boarder), name(self.boardee))
 
 
 class SolicitBribeEvent(SearchEvent):
     """A bribe solicitation has taken place"""
+    __slots__ = ('solicitor', 'payor')
+
     def __init__(self, solicitor, payor):
         """
-        solicitor - The being soliciting a bribe.
-        payor - The being who is being asked for money.
+        solicitor - Id of the being soliciting a bribe.
+        payor - Id of the being who is being asked for money.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_SOLICIT_BRIBE)
-        self.solicitor = str(solicitor)
-        self.payor = str(payor)
+        self.solicitor = solicitor
+        self.payor = payor
+
+    def columns(self):
+        return (self.solicitor, self.payor, 0)
 
-    def __str__(self):
-        return 'SOLICIT_BRIBE\nsolicitor={0}\npayor={1}'.format(self.solicitor,
-                                                                self.payor)
+    def describe(self, game):
+        name = game.beingName
+        return 'SOLICIT_BRIBE\nsolicitor={0}\npayor={1}'.format(name(self.solicitor), name(self.payor))
 
 
 class RefuseBribeEvent(SearchEvent):
     """A bribe solicitation has been refused"""
+    __slots__ = ('refuser', 'briber')
+
     def __init__(self, refuser, briber):
         """
-        refuser - The being who is refusing to be bribed.
-        briber - The being who is doing the bribing.
+        refuser - Id of the being who is refusing to be bribed.
+        briber - Id of the being who is doing the bribing.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_BRIBE_REFUSE)
-        self.refuser = str(refuser)
-        self.briber = str(briber)
+        self.refuser = refuser
+        self.briber = briber
+
+    def columns(self):
+        return (self.refuser, self.briber, 0)
 
-    def __str__(self):
-        return 'REFUSE_BRIBE\nrefuser={0}\nbriber={1}'.format(self.refuser,
-                                                              self.briber)
+    def describe(self, game):
+        name = game.beingName
+        return 'REFUSE_BRIBE\nrefuser={0}\nbriber={1}'.format(name(self.refuser), name(self.briber))
 
 
 class FightEvent(SearchEvent):
     """A bribe solicitation has taken place"""
+    __slots__ = ('instigator', 'defender')
+
     def __init__(self, instigator, defender):
         """
-        instigator - The being who wants to initiate combat.
+        instigator - Id of the being who wants to initiate combat.
         defender - The other being.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_FIGHT)
-        self.instigator = str(instigator)
-        self.defender = str(defender)
+        self.instigator = instigator
+        self.defender = defender
 
-    def __str__(self):
-        return 'FIGHT\ninstigator={0}\ndefender={1}'.format(self.instigator,
-                                                            self.defender)
+    def columns(self):
+        return (self.instigator, self.defender, 0)
+
+    def describe(self, game):
+        name = game.beingName
+        return 'FIGHT\ninstigator={0}\ndefender={1}'.format(name(self.instigator), name(self.defender))
 
 
 class PayBribeEvent(SearchEvent):
     """A bribe has been paid"""
+    __slots__ = ('payor', 'briber', 'amount')
+
     def __init__(self, payor, briber, amount):
         """
-        payor - The being who is paying the bribe.
-        briber - The being who is receiving the bribe.
+        payor - Id of the being who is paying the bribe.
+        briber - Id of the being who is receiving the bribe.
         amount - Amount of money paid.
         """
         SearchEvent.__init__(self, SearchEventCode.EVENT_PAY)
-        self.payor = str(payor)
-        self.briber = str(briber)
+        self.payor = payor
+        self.briber = briber
         self.amount = int(amount)
 
-    def __str__(self):
-        return 'PAY_BRIBE\npayor={0}\nbriber={1}\namount={2}'.format(self.payor,
-                                                                     self.briber,
-                                                                     self.amount)
+    def columns(self):
+        return (self.payor, self.briber, self.amount)
+
+    def describe(self, game):
+        name = game.beingName
+        return 'PAY_BRIBE\npayor={0}\nbriber={1}\namount={2}'.format(name(self.payor), name(self.briber), self.amount)
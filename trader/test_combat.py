@@ -1,5 +1,6 @@
+import random
 import pytest
-from trader.combat import Combat, CombatEventCode, CombatAction
+from trader.combat import Combat, CombatEventCode, CombatAction, evaluateCombatActions, fightPolicy
 from trader.profiles import Vessel
 from trader.profiles import VesselUpgrade
 
@@ -108,3 +109,44 @@ def test_two_fleers(vessels):
     for event in c.eventLog():
         assert event.eventCode != CombatEventCode.DAMAGE
     assert c.winner() in ('being1', 'being2')
+
+
+def test_snapshot_steps_like_do_round(vessels):
+    (v1, v2) = vessels
+    for seed in range(200):
+        c = Combat({'being1': v1, 'being2': v2}, rng=random.Random(seed))
+        snapshot = c.snapshot()
+        assert snapshot.ids == ('being2', 'being1')
+        assert snapshot.life == [10, 10]
+        snapshotRng = random.Random(seed)
+        choices = random.Random(seed + 1000)
+        while c.keepGoing():
+            commands = {'being1': choices.choice(list(CombatAction)), 'being2': choices.choice(list(CombatAction))}
+            c.doRound(commands)
+            snapshot.step(commands, snapshotRng)
+            assert snapshot.life == [c._life['being2'], c._life['being1']]
+            assert snapshot.keepGoing() == c.keepGoing()
+        assert snapshot.winner() == c.winner()
+        assert set(snapshot.escaped) == set(c._escaped)
+
+
+def test_snapshot_clones_and_rollouts(vessels):
+    (v1, v2) = vessels
+    c = Combat({'being1': v1, 'being2': v2})
+    snapshot = c.snapshot()
+    clone = snapshot.clone()
+    clone.step({'being1': CombatAction.FIGHT, 'being2': CombatAction.FIGHT}, random.Random(1))
+    assert snapshot.life == [10, 10]
+    assert snapshot.rounds == 0 and clone.rounds == 1
+
+    finished = snapshot.rollout(fightPolicy, random.Random(2))
+    assert not finished.keepGoing()
+    assert finished.winner() in ('being1', 'being2')
+    assert snapshot.keepGoing()
+    assert c._life == {'being1': 10, 'being2': 10}  # The combat itself is never touched
+    assert len(c.eventLog()) == 2
+
+    odds = evaluateCombatActions(snapshot, 'being1', rollouts=50, rng=random.Random(3))
+    assert set(odds) == set(CombatAction)
+    assert all(0.0 <= odds[action] <= 1.0 for action in CombatAction)
+    assert evaluateCombatActions(snapshot, 'being1', rollouts=10 ** 9, timeBudget=0.01)
@@ -0,0 +1,105 @@
+import os
+import random
+import pytest
+from trader.combat import Combat, CombatAction, CombatEventCode, CombatSnapshot, fightPolicy
+from trader.combatoracle import combatOutcomes, damageOdds, sampleOutcome, winChance
+from trader.encounter import Encounter, EncounterStateCode
+from trader.game import Game
+from trader.journal import recordGame, replayGame
+from trader.players.randomPlayer import RandomPlayer
+from trader.profiles import Vessel
+
+
+class Fighter(RandomPlayer):
+    """Picks fights and never runs."""
+    def voteInitState(self, game, being):
+        return EncounterStateCode.COMBAT
+
+    def chooseCombatAction(self, game, being, cmbt):
+        return CombatAction.FIGHT
+
+    def alwaysFights(self, game, being):
+        return True
+
+
+def _vessel(offense, defense, maneuverability):
+    return Vessel(name='v', offense=offense, defense=defense, capacity=50, maneuverability=maneuverability,
+                  stealth=0, upgradePoints=0, price=50)
+
+
+def test_damage_odds():
+    assert damageOdds(1, 0) == pytest.approx((0.5, 0.5))
+    assert damageOdds(0, 5) == pytest.approx((1.0,))
+    odds = damageOdds(10, 7)
+    assert len(odds) == 11
+    assert sum(odds) == pytest.approx(1.0)
+
+
+def test_outcomes_are_exact():
+    # Each side hits half the time for one damage, so the first wins 1/2 + 1/4 * 1/2 + ... = 2/3 of the time
+    assert winChance((1, 0, 1), (1, 0, 1)) == pytest.approx(2.0 / 3.0)
+    outcomes = combatOutcomes((10, 10, 10), (10, 10, 10))
+    assert sum(chance for (winner, lifeLeft, chance) in outcomes) == pytest.approx(1.0)
+    assert all(1 <= lifeLeft <= 10 for (winner, lifeLeft, chance) in outcomes)
+    assert outcomes == combatOutcomes((10, 10, 10), (10, 10, 10))  # Cached
+
+
+@pytest.mark.parametrize('first, second', [((10, 10, 10), (10, 10, 10)), ((5, 3, 7), (8, 2, 4))])
+def test_outcomes_match_playing_it_out(first, second):
+    rng = random.Random(7)
+    trials = 20000
+    wins = 0
+    for x in range(trials):
+        snapshot = CombatSnapshot((0, 1), (first[0], second[0]), (first[1], second[1]), (2, 1), [first[2], second[2]])
+        if snapshot.rollout(fightPolicy, rng, maxRounds=10000).winner() == 0:
+            wins += 1
+    assert wins / trials == pytest.approx(winChance(first, second), abs=0.02)
+
+    counts = [0, 0]
+    for x in range(trials):
+        counts[sampleOutcome(first, second, rng)[0]] += 1
+    assert counts[0] / trials == pytest.approx(winChance(first, second), abs=0.02)
+
+
+def test_fights_that_cant_be_worked_out():
+    assert combatOutcomes((0, 5, 5), (0, 5, 5)) is None  # Nobody can ever hurt anybody
+    assert combatOutcomes((5, 0, 0), (5, 5, 5)) is None  # Already over
+    assert combatOutcomes((1000, 1000, 1000), (1000, 1000, 1000)) is None  # Too big
+    assert winChance((0, 5, 5), (3, 0, 5)) == pytest.approx(0.0)
+
+
+def test_combat_auto_resolve():
+    c = Combat({1: _vessel(10, 10, 5), 2: _vessel(10, 10, 50)}, rng=random.Random(3))
+    events = c.autoResolve()
+    assert [event.eventCode for event in events] == [CombatEventCode.DEATH, CombatEventCode.VICTORY]
+    assert not c.keepGoing()
+    assert c.winner() == events[1].being
+    assert c.autoResolve() is None  # Already over
+
+    c = Combat({1: _vessel(1, 1, 5), 2: _vessel(1, 1, 6), 3: _vessel(1, 1, 7)})
+    assert c.autoResolve() is None  # Only two vessel fights
+
+
+def test_encounter_auto_resolve():
+    game = Game([Fighter(verbose=False), Fighter(verbose=False)], seed=4, autoResolveCombat=True)
+    (being1, being2) = game.beings
+    e = Encounter(game, [being1, being2], {being1.id: EncounterStateCode.COMBAT, being2.id: EncounterStateCode.COMBAT})
+    assert not e.doTurn()  # All over in one turn
+    assert being1.isDead() != being2.isDead()
+
+    game = Game([Fighter(verbose=False), RandomPlayer(verbose=False)], seed=4, autoResolveCombat=True)
+    (being1, being2) = game.beings
+    e = Encounter(game, [being1, being2], {being1.id: EncounterStateCode.COMBAT, being2.id: EncounterStateCode.COMBAT})
+    e.doTurn()
+    assert e.eventLog()[0].eventCode == CombatEventCode.JOIN  # Played round by round
+
+
+def test_auto_resolved_games_replay(tmpdir):
+    filename = os.path.join(str(tmpdir), 'game.journal')
+    (game, journal) = recordGame(filename, [Fighter(verbose=False) for x in range(4)], seed=8, autoResolveCombat=True)
+    for day in range(100):
+        game.doTurn()
+    journal.close(game.day)
+    replayed = replayGame(filename)
+    assert [(being.isDead(), being.currentLocation) for being in replayed.beings] == \
+        [(being.isDead(), being.currentLocation) for being in game.beings]
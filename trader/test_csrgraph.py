@@ -0,0 +1,57 @@
+import networkx as nx
+import pytest
+from trader.csrgraph import CSRGraph
+from trader.worldloader import loadWorld
+
+
+def test_matches_networkx(randomGraph):
+    graph = randomGraph(200, 800, 7)
+    csr = CSRGraph(graph)
+    assert len(csr) == len(graph)
+    assert sorted(csr) == sorted(graph)
+    for node in graph:
+        assert sorted(csr.neighbors(node)) == sorted(graph.neighbors(node))
+        assert csr.degree(node) == graph.degree(node)
+        assert csr.nodeAttributes(node) == {'events': ()}
+        assert csr.nodeName(csr.nodeId(node)) == node
+        for neighbor in graph.neighbors(node):
+            assert csr.weight(node, neighbor) == graph[node][neighbor]['weight']
+            assert csr.hasEdge(node, neighbor)
+    assert sum(1 for edge in csr.edges()) == graph.number_of_edges()
+
+
+def test_missing_edge(randomGraph):
+    graph = randomGraph(3, 0, 1)
+    graph.add_edge('node0', 'node1', weight=3)
+    csr = CSRGraph(graph)
+    assert not csr.hasEdge('node0', 'node2')
+    with pytest.raises(KeyError):
+        csr.weight('node0', 'node2')
+    assert csr.neighbors('node2') == ()
+
+
+def test_to_networkx(randomGraph):
+    graph = randomGraph(50, 120, 3)
+    rebuilt = CSRGraph(graph).toNetworkx()
+    assert set(map(frozenset, rebuilt.edges())) == set(map(frozenset, graph.edges()))
+    for (node1, node2, weight) in graph.edges(data='weight'):
+        assert rebuilt[node1][node2]['weight'] == weight
+
+
+def test_world_has_csr():
+    world = loadWorld()
+    assert world.csr.weight('earth', 'mars') == 10
+    assert sorted(world.csr.neighbors('venus')) == ['earth', 'mars']
+
+
+def test_node_attributes_are_shared():
+    graph = nx.Graph()
+    events = [object(), object()]
+    graph.add_node('a', events=list(events), refuel=True)
+    graph.add_node('b', events=list(events), refuel=True)
+    graph.add_node('c', events=events[:1], refuel=True)
+    csr = CSRGraph(graph)
+    assert csr.nodeAttributes('a') is csr.nodeAttributes('b')
+    assert csr.nodeAttributes('a')['events'] == tuple(events)
+    assert csr.nodeAttributes('c')['events'] == tuple(events[:1])
+    assert csr.toNetworkx().nodes['c']['refuel']
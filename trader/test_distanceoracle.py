@@ -0,0 +1,66 @@
+import random
+import networkx as nx
+from trader.csrgraph import CSRGraph
+from trader.distanceoracle import DistanceOracle
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+
+
+def _checkOracle(oracle, graph):
+    lengths = dict(nx.all_pairs_dijkstra_path_length(graph))
+    for node1 in graph:
+        for node2 in graph:
+            expected = lengths[node1].get(node2)
+            assert oracle.shortestDistance(node1, node2) == expected
+            hop = oracle.nextHop(node1, node2)
+            if expected is None or node1 == node2:
+                assert hop is None
+            else:
+                assert graph.has_edge(node1, hop)
+                assert graph[node1][hop]['weight'] + lengths[hop][node2] == expected
+        weights = [graph[node1][neighbor]['weight'] for neighbor in graph.neighbors(node1)]
+        assert oracle.minEdgeWeight(node1) == (min(weights) if weights else None)
+
+
+def test_dense_oracle(randomGraph):
+    graph = randomGraph(40, 60, 1)  # Sparse enough to leave some nodes unreachable
+    oracle = DistanceOracle(CSRGraph(graph))
+    assert oracle.isDense
+    _checkOracle(oracle, graph)
+
+
+def test_lru_oracle(randomGraph):
+    graph = randomGraph(60, 150, 2)
+    oracle = DistanceOracle(CSRGraph(graph), denseLimit=10, cacheSize=5)
+    assert not oracle.isDense
+    _checkOracle(oracle, graph)
+    assert len(oracle._rows) == 5
+
+
+def test_edge_weight_changes(randomGraph):
+    rng = random.Random(3)
+    for denseLimit in (1000, 0):
+        graph = randomGraph(30, 70, 3)
+        oracle = DistanceOracle(CSRGraph(graph), denseLimit=denseLimit, cacheSize=10)
+        for change in range(40):
+            (node1, node2) = rng.choice(list(graph.edges()))
+            weight = rng.randint(1, 60)
+            graph[node1][node2]['weight'] = weight
+            oracle.setEdgeWeight(node1, node2, weight)
+            assert oracle.edgeWeight(node2, node1) == weight
+            _checkOracle(oracle, graph)
+
+
+def test_game_uses_oracle():
+    game = Game([RandomPlayer(verbose=False)])
+    assert game.distanceOracle is game.world.distanceOracle  # Worked out once per World, not per Game
+    assert game.distanceOracle.shortestDistance('mars', 'venus') == 20
+    assert game.distanceOracle.nextHop('mars', 'venus') == 'earth'
+    game.setEdgeWeight('earth', 'venus', 30)
+    assert game.distance('venus', 'earth') == 30
+    assert game.distanceOracle.shortestDistance('mars', 'venus') == 22
+    assert game.world.csr.weight('earth', 'venus') == 10  # The shared world is left alone
+    assert game.world.distanceOracle.shortestDistance('mars', 'venus') == 20
+    assert game.routePlanner is not game.world.routePlanner
+    for day in range(50):
+        game.doTurn()
@@ -5,7 +5,8 @@ from trader.players.boarder import Boarder
 from trader.players.briberrefuser import BriberRefuser
 from trader.players.randomPlayer import RandomPlayer
 from trader import search
-from trader.trade import TradeEventCode
+from trader.search import Search, SearchAction, SearchState
+from trader.trade import Trade, TradeAction, TradeEventCode
 
 
 def test_trade_encounter():
@@ -14,8 +15,8 @@ def test_trade_encounter():
         being1 = game.beings[0]
         being2 = game.beings[1]
         e = Encounter(game, [being1, being2],
-                      {'RandomPlayer1': EncounterStateCode.TRADE,
-                       'RandomPlayer2': EncounterStateCode.TRADE})
+                      {being1.id: EncounterStateCode.TRADE,
+                       being2.id: EncounterStateCode.TRADE})
         assert e.state() == EncounterStateCode.TRADE
         while True:
             keepGoing = e.doTurn()
@@ -37,8 +38,8 @@ def test_combat_encounter():
         being1 = game.beings[0]
         being2 = game.beings[1]
         e = Encounter(game, [being1, being2],
-                      {'RandomPlayer1': EncounterStateCode.COMBAT,
-                       'RandomPlayer2': EncounterStateCode.COMBAT})
+                      {being1.id: EncounterStateCode.COMBAT,
+                       being2.id: EncounterStateCode.COMBAT})
         assert e.state() == EncounterStateCode.COMBAT
         while True:
             keepGoing = e.doTurn()
@@ -59,8 +60,8 @@ def test_board_encounter():
         being1 = game.beings[0]
         being2 = game.beings[1]
         e = Encounter(game, [being1, being2],
-                      {'Boarder1': EncounterStateCode.SEARCH,
-                       'Boarder2': EncounterStateCode.TRADE})
+                      {being1.id: EncounterStateCode.SEARCH,
+                       being2.id: EncounterStateCode.TRADE})
         assert e.state() == EncounterStateCode.SEARCH
         while True:
             keepGoing = e.doTurn()
@@ -82,8 +83,8 @@ def test_bribe_refuse_encounter():
         being1 = game.beings[0]
         being2 = game.beings[1]
         e = Encounter(game, [being1, being2],
-                      {'BriberRefuser1': EncounterStateCode.SEARCH,
-                       'BriberRefuser2': EncounterStateCode.SEARCH})
+                      {being1.id: EncounterStateCode.SEARCH,
+                       being2.id: EncounterStateCode.SEARCH})
         assert e.state() == EncounterStateCode.SEARCH
         while True:
             keepGoing = e.doTurn()
@@ -97,3 +98,60 @@ def test_bribe_refuse_encounter():
         assert lastEvent.eventCode == search.SearchEventCode.EVENT_BRIBE_REFUSE
         eventBeforeLast = e.eventLog()[-2:][0]
         assert eventBeforeLast.eventCode == search.SearchEventCode.EVENT_SOLICIT_BRIBE
+
+
+def test_trade_snapshot():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    (being1, being2) = game.beings
+    being2.inventory.goods['guns'] = 5
+    snapshot = Trade(game, [being1, being2]).snapshot()
+    assert snapshot.goodsOf(being2.id)['guns'] == 5
+    assert snapshot.moneyOf(being1.id) == 1000
+
+    after = snapshot.clone()
+    after.step({being1.id: (TradeAction.BUY, 2, 'guns', 100)})
+    assert after.moneyOf(being1.id) == 800 and after.moneyOf(being2.id) == 1200
+    assert after.goodsOf(being1.id)['guns'] == 2 and after.goodsOf(being2.id)['guns'] == 3
+    after.step({being2.id: (TradeAction.SELL, 10, 'guns', 1)})  # They don't have that many so nothing happens
+    assert after.goodsOf(being2.id)['guns'] == 3
+    after.step({being1.id: (TradeAction.BUY, 1, 'guns', 100)}, accept=lambda *args: False)
+    assert after.goodsOf(being2.id)['guns'] == 3
+    assert after.keepGoing()
+    after.step({being2.id: (TradeAction.DONE, None, None, None)})
+    assert not after.keepGoing()
+
+    assert snapshot.goodsOf(being2.id)['guns'] == 5
+    assert being2.inventory.goods['guns'] == 5 and being1.inventory.money == 1000
+
+    def buyAGun(snapshot):
+        return {being1.id: (TradeAction.BUY, 1, 'guns', 10)}
+    assert snapshot.rollout(buyAGun, maxRounds=3).goodsOf(being1.id)['guns'] == 3
+
+
+def test_search_snapshot():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    (being1, being2) = game.beings
+    being2.inventory.goods['guns'] = 5
+    snapshot = Search(game, [being1, being2]).snapshot()
+
+    boarded = snapshot.clone()
+    boarded.step({being1.id: SearchAction.BOARD, being2.id: SearchAction.PASS})
+    assert boarded.outcomes == (SearchState.STATE_SEIZURE, SearchState.STATE_PASS)
+    assert boarded.goodsOf(being1.id)['guns'] == 5
+    assert 'guns' not in boarded.goodsOf(being2.id)
+    assert boarded.keepGoing()
+
+    bribed = snapshot.clone()
+    bribed.step({being1.id: SearchAction.SOLICIT_BRIBE, being2.id: SearchAction.PASS},
+                bribe=lambda snapshot, meId, themId: (SearchAction.SUBMIT, 30))
+    assert bribed.moneyOf(being1.id) == 1030 and bribed.moneyOf(being2.id) == 970
+
+    fought = snapshot.clone()
+    fought.step({being1.id: SearchAction.BOARD, being2.id: SearchAction.PASS},
+                board=lambda snapshot, meId, themId: SearchAction.FIGHT)
+    assert SearchState.STATE_COMBAT in fought.outcomes
+    assert not fought.keepGoing()
+
+    passed = snapshot.rollout(lambda snapshot: {being1.id: SearchAction.PASS, being2.id: SearchAction.PASS})
+    assert not passed.keepGoing() and passed.rounds == 1
+    assert being2.inventory.goods['guns'] == 5 and snapshot.goodsOf(being2.id)['guns'] == 5
@@ -0,0 +1,70 @@
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+
+
+def test_event_index_lookups():
+    game = Game([RandomPlayer(verbose=False)])
+    index = game.eventIndex
+    assert index.edgesFor('mars_earth_war') == (('earth', 'mars'),)
+    assert index.nodesFor('mars_earth_war') == ('earth', 'mars')
+    assert [p.name for p in index.globalProfilesAtNode('earth')] == ['mars_earth_war']
+    assert index.globalProfilesAtNode('venus') == []
+    assert [p.name for p in index.globalProfilesAtEdge(('mars', 'earth'))] == ['mars_earth_war']
+    assert index.profile('famine', 'venus').description == 'There is a general famine'
+    assert index.profile('mars_earth_war', 'venus').description == 'Mars and Earth are at war'
+    assert index.profile('nothing', 'venus') is None
+
+
+def test_global_events_reach_only_their_places():
+    game = Game([RandomPlayer(verbose=False)])
+    for day in range(500):
+        game.doTurn()
+        war = 'mars_earth_war' in game.globalEvents
+        assert ('mars_earth_war' in game.nodeEventNames['earth']) == war
+        assert 'mars_earth_war' not in game.nodeEventNames['venus']
+        assert ('mars_earth_war' in game.edgeEventNames.get(('earth', 'mars'), [])) == war
+        assert ('earth', 'venus') not in game.edgeEventNames
+
+
+def test_lazy_events_only_for_visited_places():
+    game = Game([RandomPlayer(verbose=False)], lazyEvents=True)
+    being = game.beings[0]
+    for day in range(100):
+        startLocation = being.currentLocation
+        game.doTurn()
+        today = set(node for node, eventDay in game._nodeEventDays.items() if eventDay == game.day)
+        if startLocation:
+            assert today == {startLocation}
+        else:
+            assert today <= {being.currentLocation}
+
+
+LOCAL_EVENT_WORLD = """
+import networkx as nx
+from trader.profiles import EventProfile
+
+graph = nx.Graph()
+events = []
+items = {}
+graph.add_node('a', events=[EventProfile('storm', 30, duration=3)])
+graph.add_node('b', events=[EventProfile('storm', 30, duration=3)])
+graph.add_edge('a', 'b', weight=5)
+"""
+
+
+def test_lazy_events_match_eager_frequency(tmp_path):
+    worldFile = tmp_path / 'world.py'
+    worldFile.write_text(LOCAL_EVENT_WORLD)
+    eager = Game([], customWorld=str(worldFile), lazyEvents=False)
+    lazy = Game([], customWorld=str(worldFile), lazyEvents=True)
+    eagerCount = 0
+    lazyCount = 0
+    samples = 0
+    for day in range(20000):
+        eager.doTurn()
+        lazy.doTurn()
+        if day % 7 == 0:
+            samples += 1
+            eagerCount += 'storm' in eager.getNodeEvents('a')
+            lazyCount += 'storm' in lazy.getNodeEvents('a')
+    assert abs(eagerCount - lazyCount) < 0.1 * samples
@@ -0,0 +1,55 @@
+from trader import combat
+from trader.encounter import Encounter, EncounterStateCode
+from trader.eventlog import ColumnarEventLog, EventFamily, NO_BEING
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+from trader.trade import JoinTradeEvent, TransactionTradeEvent, TradeEventCode
+
+
+def test_append_and_aggregate():
+    log = ColumnarEventLog()
+    log.append(1, 0, EventFamily.COMBAT, combat.CombatEventCode.DAMAGE, 0, 1, 5)
+    log.append(1, 0, EventFamily.COMBAT, combat.CombatEventCode.DAMAGE, 1, 0, 3)
+    log.append(2, 0, EventFamily.COMBAT, combat.CombatEventCode.DAMAGE, 0, 1, 4)
+    log.record(3, 1, TransactionTradeEvent(0, 1, 10, 'guns', 2))
+    log.record(3, 1, JoinTradeEvent(1))
+    assert len(log) == 5
+    assert log.count(EventFamily.COMBAT) == 3
+    assert log.count(EventFamily.TRADE, TradeEventCode.JOIN) == 1
+    assert log.totalAmount(EventFamily.COMBAT, combat.CombatEventCode.DAMAGE) == 12
+    assert log.amountsByActor(EventFamily.COMBAT) == {0: 9, 1: 3}
+    assert log.totalAmount(EventFamily.TRADE, TradeEventCode.TRANSACTION) == 20
+    assert log[4] == (3, 1, EventFamily.TRADE, TradeEventCode.JOIN, 1, NO_BEING, 0)
+    assert len(log.encounterRows(1)) == 2
+    assert list(log)[0] == log[0]
+    log.clear()
+    assert len(log) == 0
+
+
+def test_events_have_no_dict():
+    event = combat.DamageCombatEvent(0, 1, 5)
+    assert not hasattr(event, '__dict__')
+    assert not hasattr(JoinTradeEvent(0), '__dict__')
+
+
+def test_game_records_encounter_history():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)], recordEvents=True)
+    being1 = game.beings[0]
+    being2 = game.beings[1]
+    e = Encounter(game, [being1, being2],
+                  {being1.id: EncounterStateCode.COMBAT,
+                   being2.id: EncounterStateCode.COMBAT})
+    while e.doTurn():
+        pass
+    history = game.eventHistory
+    assert len(history) == len(e.eventLog())
+    for row, event in zip(history.encounterRows(e.id), e.eventLog()):
+        (day, encounterId, family, code, actor, target, amount) = row
+        assert family == EventFamily.COMBAT
+        assert code == event.eventCode
+        assert actor in (being1.id, being2.id)
+
+
+def test_no_history_by_default():
+    game = Game([RandomPlayer(verbose=False)])
+    assert game.eventHistory is None
@@ -0,0 +1,88 @@
+import io
+import json
+from trader import combat
+from trader.encounter import Encounter, EncounterStateCode
+from trader.eventlog import EventFamily
+from trader.eventsink import CallbackSink, FileSink, NullSink, RingBufferSink
+from trader.game import Game
+from trader.search import BoardRequestEvent
+from trader.trade import LeaveTradeEvent, TransactionTradeEvent
+from trader.players.randomPlayer import RandomPlayer
+
+
+def _fight(game):
+    being1 = game.beings[0]
+    being2 = game.beings[1]
+    e = Encounter(game, [being1, being2],
+                  {being1.id: EncounterStateCode.COMBAT,
+                   being2.id: EncounterStateCode.COMBAT})
+    rounds = 0
+    while e.doTurn():
+        rounds += 1
+    return (e, rounds)
+
+
+def test_callback_sink_sees_every_event():
+    seen = []
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)],
+                eventSink=CallbackSink(lambda day, encounterId, event: seen.append((encounterId, event))))
+    (e, rounds) = _fight(game)
+    assert [event for (encounterId, event) in seen] == e.eventLog()
+    assert all(encounterId == e.id for (encounterId, event) in seen)
+    assert seen[-1][1].eventCode == combat.CombatEventCode.VICTORY
+
+
+def test_bounded_logs_keep_one_round():
+    for x in range(20):
+        seen = []
+        game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)],
+                    eventSink=CallbackSink(lambda day, encounterId, event: seen.append(event)),
+                    boundedLogs=True)
+        (e, rounds) = _fight(game)
+        assert e.eventLog() == seen[-len(e.eventLog()):]
+        if rounds > 1:
+            assert len(e.eventLog()) < len(seen)
+        assert seen[0].eventCode == combat.CombatEventCode.JOIN
+        assert seen[-1].eventCode == combat.CombatEventCode.VICTORY
+
+
+def test_ring_buffer_sink():
+    sink = RingBufferSink(maxlen=3)
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)], eventSink=sink)
+    (e, rounds) = _fight(game)
+    assert len(sink) == 3
+    assert [event for (day, encounterId, event) in sink.events()] == e.eventLog()[-3:]
+
+
+def test_file_sink():
+    f = io.StringIO()
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)], eventSink=FileSink(f))
+    (e, rounds) = _fight(game)
+    game.eventSink.close()
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert len(records) == len(e.eventLog())
+    for record, event in zip(records, e.eventLog()):
+        assert record['family'] == EventFamily.COMBAT
+        assert record['code'] == event.eventCode
+        assert record['encounter'] == e.id
+
+
+def test_null_sink_and_history_together():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)], recordEvents=True, eventSink=NullSink())
+    (e, rounds) = _fight(game)
+    assert len(game.eventHistory) == len(e.eventLog())
+
+
+def test_file_sink_text_has_being_names():
+    f = io.StringIO()
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)], eventSink=FileSink(f))
+    (buyer, seller) = (game.beings[0], game.beings[1])
+    game.eventSink.emit(0, 0, TransactionTradeEvent(buyer.id, seller.id, 10, 'grain', 2))
+    game.eventSink.emit(0, 0, LeaveTradeEvent(seller.id))
+    game.eventSink.emit(0, 1, BoardRequestEvent(seller.id, buyer.id))
+    game.eventSink.close()
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+    expected = 'TRANSACTION\nbuyer={0}\nseller={1}\nprice=10\ngood=grain\nquantity=2'.format(buyer.name, seller.name)
+    assert records[0]['text'] == expected
+    assert records[1]['text'] == 'LEAVE {0}'.format(seller.name)
+    assert records[2]['text'] == 'BOARD REQUEST\nboarder={0}\nboardee={1}'.format(seller.name, buyer.name)
@@ -0,0 +1,82 @@
+import random
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+
+
+def _supply(game):
+    return dict((location, list(total)) for location, total in game.supplyLedger._totals.items())
+
+
+def test_fork_plays_like_the_original(gameOptions, snapshot, players):
+    game = Game(players(), seed=21, **gameOptions)
+    for day in range(20):
+        game.doTurn()
+    fork = game.fork()
+    assert snapshot(fork) == snapshot(game)
+
+    for g in (game, fork):
+        random.seed(5)  # The players' own random numbers
+        for day in range(40):
+            g.doTurn()
+    assert snapshot(fork) == snapshot(game)
+    assert _supply(fork) == _supply(game)
+
+
+def test_fork_leaves_the_original_alone(snapshot, players):
+    game = Game(players(), seed=22)
+    for day in range(10):
+        game.doTurn()
+    before = snapshot(game)
+    supplyBefore = _supply(game)
+    rngBefore = game.rng.getstate()
+
+    for x in range(5):
+        fork = game.fork()
+        for day in range(30):
+            fork.doTurn()
+        fork.beings[0].inventory.goods['fuel'] += 100
+    assert snapshot(game) == before
+    assert _supply(game) == supplyBefore
+    assert game.rng.getstate() == rngBefore
+
+    # And the other way around
+    fork = game.fork()
+    game.beings[1].inventory.goods['fuel'] += 7
+    game.beings[1].inventory.money += 7
+    assert snapshot(fork) == before
+    assert _supply(fork) == supplyBefore
+
+
+def test_routing_is_shared_until_an_edge_changes(players):
+    game = Game(players(), seed=23)
+    fork = game.fork()
+    assert fork.distanceOracle is game.distanceOracle
+    assert fork.routePlanner is game.routePlanner
+
+    (node1, node2, weight) = next(game.csr.edges())
+    fork.setEdgeWeight(node1, node2, weight * 2)
+    assert fork.distance(node1, node2) == weight * 2
+    assert game.distance(node1, node2) == weight
+    assert fork.distanceOracle is not game.distanceOracle
+
+    game.setEdgeWeight(node1, node2, weight + 1)
+    assert game.distance(node1, node2) == weight + 1
+    assert fork.distance(node1, node2) == weight * 2
+
+
+def test_policy_plays_the_fork(players):
+    game = Game(players(), seed=24)
+    policyPlayers = {}
+
+    def policy(being):
+        player = RandomPlayer(verbose=False)
+        player.initGame(being.id + 1)
+        policyPlayers[being.id] = player
+        return player
+    fork = game.fork(policy)
+    assert [being.player for being in fork.beings] == [policyPlayers[being.id] for being in game.beings]
+    assert all(being.player is not forkedBeing.player for being, forkedBeing in zip(game.beings, fork.beings))
+    assert [being.id for being in fork.beings] == [being.id for being in game.beings]
+    for day in range(10):
+        fork.doTurn()
+    assert game.day == 0
@@ -0,0 +1,126 @@
+from collections import Counter
+import operator
+import pickle
+import random
+import trader.inventory
+from trader.inventory import Inventory, itemId, itemName
+
+
+def test_item_ids_are_interned():
+    assert itemId('butter') == itemId('butter')
+    assert itemName(itemId('butter')) == 'butter'
+    assert itemId('unobtainium') != itemId('butter')
+
+
+def test_goods_view_acts_like_a_counter():
+    inventory = Inventory(goods=Counter({'fuel': 10, 'guns': 0}))
+    goods = inventory.goods
+    assert goods['fuel'] == 10
+    assert goods['nothing'] == 0
+    assert 'nothing' not in goods
+    assert 'guns' in goods  # Set to zero is still listed, like a Counter
+    assert sorted(goods) == ['fuel', 'guns']
+    assert len(goods) == 2
+    goods['fuel'] -= 3
+    goods['butter'] = 4
+    assert inventory.goods == {'fuel': 7, 'guns': 0, 'butter': 4}
+    del goods['guns']
+    assert sorted(goods.keys()) == ['butter', 'fuel']
+    assert goods.copy() == Counter({'fuel': 7, 'butter': 4})
+    inventory.goods = Counter({'guns': 2})
+    assert dict(inventory.goods) == {'guns': 2}
+
+
+def test_add_and_subtract_match_counter():
+    rng = random.Random(4)
+    names = ['fuel', 'guns', 'butter', 'widgets']
+    for trial in range(200):
+        mine = Counter(dict((name, rng.randint(0, 5)) for name in rng.sample(names, 3)))
+        theirs = Counter(dict((name, rng.randint(0, 5)) for name in rng.sample(names, 2)))
+        inventory = Inventory(goods=mine, money=10)
+        other = Inventory(goods=theirs, money=3)
+        expected = mine.copy()
+        if trial % 2:
+            inventory.add(other)
+            expected += theirs
+            assert inventory.money == 13
+        else:
+            inventory.subtract(other)
+            expected -= theirs
+            assert inventory.money == 7
+        assert dict(inventory.goods) == dict(expected)
+
+
+def test_inventory_pickles():
+    inventory = Inventory(goods={'fuel': 5}, money=3)
+    copy = pickle.loads(pickle.dumps(inventory))
+    assert dict(copy.goods) == {'fuel': 5}
+    assert copy.money == 3
+
+
+def test_fork_copies_goods_on_write():
+    inventory = Inventory(goods={'fuel': 5, 'guns': 2}, money=3)
+    fork = inventory.fork()
+    assert dict(fork.goods) == {'fuel': 5, 'guns': 2}
+    assert fork.counts() is inventory.counts()  # Nothing has been copied yet
+    fork.goods['fuel'] -= 1
+    fork.money += 10
+    assert dict(fork.goods) == {'fuel': 4, 'guns': 2}
+    assert dict(inventory.goods) == {'fuel': 5, 'guns': 2}
+    assert inventory.money == 3
+
+    other = inventory.fork()
+    inventory.subtract(Inventory(goods={'guns': 2}))
+    assert dict(inventory.goods) == {'fuel': 5}
+    assert dict(other.goods) == {'fuel': 5, 'guns': 2}
+    del other.goods['guns']
+    assert dict(other.goods) == {'fuel': 5}
+    assert dict(fork.goods) == {'fuel': 4, 'guns': 2}
+
+
+def test_inventory_pickles_by_good_name(monkeypatch):
+    inventory = Inventory(goods={'fuel': 5, 'guns': 2, 'ore': 0}, money=3)
+    data = pickle.dumps(inventory)
+
+    # Another process could have seen the goods in another order
+    names = list(reversed(trader.inventory._itemNames))
+    monkeypatch.setattr(trader.inventory, '_itemNames', names)
+    monkeypatch.setattr(trader.inventory, '_itemIds', dict((name, goodId) for goodId, name in enumerate(names)))
+    copy = pickle.loads(data)
+    assert dict(copy.goods) == {'fuel': 5, 'guns': 2, 'ore': 0}
+    assert copy.money == 3
+
+
+def test_goods_view_has_the_counter_api():
+    mine = Counter({'fuel': 10, 'guns': 2, 'butter': 0})
+    theirs = Counter({'fuel': 4, 'guns': 5, 'widgets': 1})
+    inventory = Inventory(goods=mine)
+    other = Inventory(goods=theirs)
+    goods = inventory.goods
+    assert goods + other.goods == mine + theirs
+    assert goods - theirs == mine - theirs
+    assert theirs - goods == theirs - mine
+    assert goods | other.goods == mine | theirs
+    assert theirs & goods == theirs & mine
+    assert goods.total() == mine.total()
+    assert goods.most_common(1) == mine.most_common(1)
+    assert sorted(goods.elements()) == sorted(mine.elements())
+    assert inventory.goods == mine  # None of that changed the inventory
+
+    for (operation, arguments) in (('update', (theirs,)), ('update', (['fuel', 'rum'],)), ('update', ((), )),
+                                   ('subtract', (theirs,)), ('subtract', (['guns', 'guns'],))):
+        expected = mine.copy()
+        getattr(expected, operation)(*arguments, butter=3)
+        inventory.goods = mine
+        getattr(inventory.goods, operation)(*arguments, butter=3)
+        assert dict(inventory.goods) == dict(expected)
+
+    for (inPlace, expected) in ((operator.iadd, mine + theirs), (operator.isub, mine - theirs),
+                                (operator.ior, mine | theirs), (operator.iand, mine & theirs)):
+        inventory.goods = mine
+        goods = inventory.goods
+        assert inPlace(goods, theirs) is goods
+        assert dict(inventory.goods) == dict(expected)
+    inventory.goods = mine
+    inventory.goods += other.goods
+    assert dict(inventory.goods) == dict(mine + theirs)
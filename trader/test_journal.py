@@ -0,0 +1,90 @@
+import os
+import random
+import pytest
+from trader.game import Game, Inventory
+from trader.journal import JournalError, JournalReader, JournalWriter, DecisionCode, recordGame, replayGame
+from trader.players.randomPlayer import RandomPlayer
+
+
+def test_replay_matches_recording(tmpdir, gameOptions, snapshot, players):
+    for x in range(5):
+        filename = os.path.join(str(tmpdir), 'game{0}.journal'.format(x))
+        (game, journal) = recordGame(filename, players(), **gameOptions)
+        for day in range(200):
+            game.doTurn()
+        journal.close(game.day)
+        recorded = snapshot(game)
+
+        random.seed(x)  # Replays don't draw from the global random numbers
+        assert snapshot(replayGame(filename)) == recorded
+
+
+def test_unfinished_journal_replays_to_last_decision(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'crash.journal')
+    (game, journal) = recordGame(filename, players(), seed=5)
+    for day in range(50):
+        game.doTurn()
+    journal.flush()  # Never closed, like a game that crashed
+    assert replayGame(filename).day <= game.day
+    journal.close()
+
+
+def test_reader(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'game.journal')
+    (game, journal) = recordGame(filename, players(), seed=1234, batchTravel=True)
+    for day in range(10):
+        game.doTurn()
+    journal.close(game.day)
+    with JournalReader(filename) as reader:
+        assert reader.header['seed'] == 1234
+        assert reader.header['players'] == 4
+        assert reader.header['batchTravel']
+        records = list(reader)
+    assert [record.decisionCode for record in records[:4]] == [DecisionCode.INIT_GAME] * 4
+    assert [record.playerNumber for record in records[:4]] == [0, 1, 2, 3]
+    assert records[-1].decisionCode == DecisionCode.END
+    assert records[-1].day == 10
+    assert all(records[i].day <= records[i + 1].day for i in range(len(records) - 1))
+
+
+def test_not_a_journal(tmpdir):
+    filename = os.path.join(str(tmpdir), 'junk')
+    with open(filename, 'wb') as f:
+        f.write(b'this is not a journal')
+    with pytest.raises(JournalError):
+        JournalReader(filename)
+
+
+def test_decisions_round_trip(tmpdir):
+    from trader.combat import CombatAction
+    from trader.encounter import EncounterStateCode
+    from trader.search import SearchAction
+    from trader.trade import TradeAction
+    from trader.journal import _CODECS
+    game = Game([RandomPlayer(verbose=False)])
+    decisions = [(DecisionCode.INIT_GAME, ('RandomPlayer1', True)),
+                 (DecisionCode.DESTINATION, game.csr.nodes()[1]),
+                 (DecisionCode.DESTINATION, None),
+                 (DecisionCode.INIT_STATE, EncounterStateCode.SEARCH),
+                 (DecisionCode.COMBAT_ACTION, CombatAction.FLEE),
+                 (DecisionCode.TRADE_ACTION, (TradeAction.BUY, 3, 'guns', 75)),
+                 (DecisionCode.TRADE_ACTION, (TradeAction.DONE, None, None, None)),
+                 (DecisionCode.TRADE_REQUEST, True),
+                 (DecisionCode.SEARCH_ACTION, SearchAction.SOLICIT_BRIBE),
+                 (DecisionCode.BOARD_REQUEST, SearchAction.SUBMIT),
+                 (DecisionCode.BRIBE_SOLICITATION, (SearchAction.SUBMIT, 250))]
+    filename = os.path.join(str(tmpdir), 'decisions.journal')
+    journal = JournalWriter(filename, {})
+    journal.bind(game)
+    for (decisionCode, value) in decisions:
+        journal.decision(3, 0, decisionCode, value)
+    journal.decision(3, 0, DecisionCode.SEIZE, Inventory(goods={'guns': 2, 'butter': 0}, money=7))
+    journal.close()
+    with JournalReader(filename) as reader:
+        records = list(reader)
+    for record, (decisionCode, value) in zip(records, decisions):
+        assert record.decisionCode == decisionCode
+        assert _CODECS[decisionCode].decode(game, record.payload) == value
+    seized = _CODECS[DecisionCode.SEIZE].decode(game, records[-1].payload)
+    assert seized.money == 7
+    assert dict(seized.goods) == {'guns': 2, 'butter': 0}
@@ -0,0 +1,93 @@
+import os
+import random
+import pytest
+from trader.game import Game
+from trader.journal import keyframeFilename, recordGame, replayGame, seekGame
+from trader.keyframes import KeyframeError, KeyframeReader, KeyframeWriter, dumpState, loadState
+
+
+def test_restore_state_plays_on_the_same(snapshot, players):
+    game = Game(players(), seed=42)
+    for day in range(30):
+        game.doTurn()
+    state = loadState(dumpState(game.captureState(), game.world), game.world)
+    random.seed(1)  # The players' own random numbers aren't part of the game's state
+    for day in range(30):
+        game.doTurn()
+    expected = snapshot(game)
+
+    game.restoreState(state)
+    assert game.day == 30
+    assert game.captureState() == state
+    random.seed(1)
+    for day in range(30):
+        game.doTurn()
+    assert snapshot(game) == expected
+
+
+def test_writer_and_reader(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'game.keyframes')
+    game = Game(players(), seed=7)
+    game.keyframes = KeyframeWriter(filename, interval=10)
+    for day in range(35):
+        game.doTurn()
+    game.keyframes.close()
+    with KeyframeReader(filename) as reader:
+        assert len(reader) == 3
+        assert reader.days() == [10, 20, 30]
+        assert reader.nearest(9) is None
+        assert reader.nearest(25) == 20
+        assert reader.nearest(1000) == 30
+        (state, journalOffset) = reader.load(20, game.world)
+        assert state['day'] == 20
+        assert journalOffset == 0
+        with pytest.raises(KeyError):
+            reader.load(25, game.world)
+
+
+def test_unclosed_file_is_scanned(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'crash.keyframes')
+    game = Game(players(), seed=8)
+    writer = KeyframeWriter(filename, interval=5)
+    game.keyframes = writer
+    for day in range(12):
+        game.doTurn()
+    writer.flush()  # Never closed, so there is no index
+    with KeyframeReader(filename) as reader:
+        assert reader.days() == [5, 10]
+    writer.close()
+
+
+def test_not_a_keyframe_file(tmpdir):
+    filename = os.path.join(str(tmpdir), 'junk.keyframes')
+    with open(filename, 'wb') as f:
+        f.write(b'not keyframes at all')
+    with pytest.raises(KeyframeError):
+        KeyframeReader(filename)
+
+
+def test_seek_matches_replay(tmpdir, gameOptions, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.journal')
+    (game, journal) = recordGame(filename, players(), seed=99, keyframeInterval=25, **gameOptions)
+    recorded = {}
+    for day in range(120):
+        game.doTurn()
+        recorded[game.day] = snapshot(game)
+    journal.close(game.day)
+    assert os.path.exists(keyframeFilename(filename))
+
+    for day in (10, 25, 26, 74, 120):
+        turnDay = min(recordedDay for recordedDay in recorded if recordedDay >= day)  # Event driven games skip days
+        assert snapshot(seekGame(filename, day)) == recorded[turnDay]
+    assert snapshot(replayGame(filename)) == recorded[game.day]
+
+
+def test_seek_without_keyframes(tmpdir, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.journal')
+    (game, journal) = recordGame(filename, players(), seed=3)
+    for day in range(40):
+        game.doTurn()
+        if game.day == 15:
+            expected = snapshot(game)
+    journal.close(game.day)
+    assert snapshot(seekGame(filename, 15)) == expected
@@ -0,0 +1,114 @@
+from collections import Counter
+import random
+from trader.game import Game, Inventory
+from trader.inventory import itemId
+from trader.players.randomPlayer import RandomPlayer
+
+
+def _naivePrices(game, nodeName):
+    """localPrices the slow way: walk every being for the node."""
+    nodesToSearch = set([nodeName]).union(game.csr.neighbors(nodeName))
+    supply = Counter()
+    for being in game.beings:
+        if being.isDead():
+            continue
+        if being.currentLocation in nodesToSearch or (being.currentLocation == '' and
+                                                      being.lastDestination in nodesToSearch and
+                                                      being.destination in nodesToSearch):
+            supply += being.inventory.goods
+    demandMod = game.getNodeAttrDict(nodeName).get('demandMod', {})
+    events = game.getNodeEvents(nodeName)
+    retval = Counter()
+    for name, item in game.items.items():
+        demand = demandMod.get(name, 0)
+        if item.dynamicFunc:
+            demand += item.dynamicFunc(game.day, events)
+        retval[name] = item.price * ((demand * 10) + 100) / max(min(supply[name], 10), 1)
+    return retval
+
+
+def test_prices_match_naive():
+    random.seed(11)
+    game = Game([RandomPlayer(verbose=False) for i in range(6)])
+    for being in game.beings:
+        being.inventory.goods = Counter({'fuel': 1000, 'guns': random.randint(0, 12), 'butter': random.randint(0, 12)})
+    game.supplyLedger.rebuild()
+    for day in range(40):
+        game.doTurn()
+        for node in game.csr:
+            prices = game.localPrices(node)
+            expected = _naivePrices(game, node)
+            assert sorted(prices) == sorted(expected)
+            for name in expected:
+                assert abs(prices[name] - expected[name]) < 1e-9
+
+
+def test_prices_cached_for_the_day():
+    game = Game([RandomPlayer(verbose=False)])
+    game.doTurn()
+    row = game.priceEngine.priceRow('earth')
+    assert game.priceEngine.priceRow('earth') is row
+    game.priceEngine.invalidate()
+    assert game.priceEngine.priceRow('earth') is not row
+    game.doTurn()
+    assert game.priceEngine.priceRow('earth') is not row
+
+
+def test_supply_ledger_tracks_deltas():
+    random.seed(12)
+    game = Game([RandomPlayer(verbose=False) for i in range(8)])
+    for being in game.beings:
+        being.inventory.goods = Counter({'fuel': 300, 'guns': random.randint(0, 12), 'butter': random.randint(0, 12)})
+    game.supplyLedger.rebuild()
+    ledger = game.supplyLedger
+    for day in range(120):
+        game.doTurn()
+        expected = {}
+        for being in game.beings:
+            if being.isDead():
+                continue
+            location = ledger._locationFor(being)
+            expected.setdefault(location, Counter()).update(being.inventory.goods)
+        for location in set(expected).union(ledger.locations()):
+            for name in ('fuel', 'guns', 'butter'):
+                assert ledger.totalAt(location, itemId(name)) == expected.get(location, Counter())[name]
+
+
+def test_seizure_updates_ledger():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    (robber, victim) = game.beings
+    victim.inventory.goods['guns'] = 5
+    game.supplyLedger.rebuild()
+    gunsId = itemId('guns')
+    before = game.supplyLedger.totalAt(victim.currentLocation, gunsId)
+    seized = Inventory(goods=Counter({'guns': 7}))  # More than there is
+    robber.inventory.add(seized)
+    victim.inventory.subtract(seized)
+    robberGuns = game.supplyLedger.totalAt(robber.currentLocation, gunsId)
+    if robber.currentLocation == victim.currentLocation:
+        assert robberGuns == before + 7 - 5
+    else:
+        assert game.supplyLedger.totalAt(victim.currentLocation, gunsId) == before - 5
+
+
+def test_prices_only_look_at_the_node_asked_about():
+    game = Game([], lazyEvents=True)
+    game.doTurn()
+    game.localPrices('earth')
+    assert list(game._nodeEventDays) == ['earth']
+
+
+def test_supply_changes_drop_nearby_prices():
+    game = Game([RandomPlayer(verbose=False)])
+    game.doTurn()
+    (being,) = game.beings
+    node = being.currentLocation or being.destination
+    row = game.priceEngine.priceRow(node)
+    being.inventory.goods['fuel'] -= 1  # Fuel isn't priced
+    assert game.priceEngine.priceRow(node) is row
+    being.inventory.goods['guns'] += 20
+    assert game.priceEngine.priceRow(node) is not row
+    prices = game.localPrices(node)
+    expected = _naivePrices(game, node)
+    for name in expected:
+        assert abs(prices[name] - expected[name]) < 1e-9
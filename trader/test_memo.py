@@ -0,0 +1,75 @@
+import gc
+import pickle
+from trader import memo
+from trader.memo import internEvents, memoize
+from trader.worldfuncs import ButterPriceFunc, GunsPriceFunc
+
+
+calls = []
+
+
+def _price(day, events):
+    calls.append((day, tuple(events)))
+    return day % 7 + len(events)
+
+
+def test_memoize_counts_hits_and_misses():
+    del calls[:]
+    func = memoize(_price)
+    assert func(3, ['war', 'famine']) == 5
+    assert func(3, ('famine', 'war')) == 5  # Same set of events in another order
+    assert func(4, ['war']) == 5
+    assert func.cacheInfo() == (1, 2, 1024, 2)
+    assert len(calls) == 2
+    func.cacheClear()
+    assert func.cacheInfo() == (0, 0, 1024, 0)
+
+
+def test_memoize_period():
+    del calls[:]
+    func = memoize(period=7)(_price)
+    for day in range(70):
+        assert func(day, ['war']) == _price(day, ['war'])
+    assert func.misses == 7
+    assert func.hits == 63
+
+
+def test_memoize_lru_eviction():
+    func = memoize(_price, maxsize=3)
+    for day in range(5):
+        func(day, [])
+    assert func.cacheInfo()[3] == 3
+    func(4, [])
+    assert func.hits == 1
+    func(0, [])
+    assert func.misses == 6
+
+
+def test_intern_events():
+    assert internEvents(['a', 'b']) is internEvents(('b', 'a'))
+    assert internEvents(['a', 'b']) == frozenset(['a', 'b'])
+
+
+def test_interned_events_are_let_go():
+    before = len(memo._internedEvents)
+    func = memoize(_price, maxsize=3)
+    for day in range(100):
+        func(day, ['event{0}'.format(day)])
+    gc.collect()
+    assert len(memo._internedEvents) <= before + 3  # Only the sets still in the cache are kept
+
+
+def test_pickle_memoized_functions():
+    assert pickle.loads(pickle.dumps(ButterPriceFunc)) is ButterPriceFunc
+    assert pickle.loads(pickle.dumps(GunsPriceFunc)) is GunsPriceFunc
+    func = memoize(_price, period=7)
+    func(1, [])
+    copy = pickle.loads(pickle.dumps(func))
+    assert copy.func is _price and copy.period == 7
+    assert copy.cacheInfo() == (0, 0, 1024, 0)
+
+
+def test_world_functions_are_memoized():
+    assert ButterPriceFunc(95, ['famine']) == 20
+    assert ButterPriceFunc(195, ['famine']) == 20
+    assert ButterPriceFunc.hits > 0
@@ -0,0 +1,110 @@
+import pytest
+from trader.game import Game
+from trader.occupancy import canonicalEdge
+from trader.players.randomPlayer import RandomPlayer
+
+
+def _assert_index_matches_beings(game):
+    for being in game.beings:
+        if being.isDead():
+            continue
+        if being.currentLocation != '':
+            assert being in game.occupancy.beingsAtNode(being.currentLocation)
+        else:
+            edge = canonicalEdge(being.lastDestination, being.destination)
+            assert being in game.occupancy.beingsAtPosition(edge, being.destination, being._state._distance)
+            assert being in game.occupancy.beingsOnEdge(edge)
+
+
+def test_occupancy_follows_beings():
+    for x in range(20):
+        game = Game([RandomPlayer(verbose=False) for p in range(5)])
+        _assert_index_matches_beings(game)
+        for day in range(100):
+            game.doTurn()
+            _assert_index_matches_beings(game)
+
+
+def test_dead_beings_leave_index():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    being = game.beings[0]
+    location = being.currentLocation
+    being.makeDead(game)
+    assert being not in game.occupancy.beingsAtNode(location)
+
+
+class _Traveller(RandomPlayer):
+    """Sits at a node until leaveDay, then goes to one neighbor and stays there."""
+    def __init__(self, start, destination, leaveDay):
+        RandomPlayer.__init__(self, verbose=False)
+        self.start = start
+        self.to = destination
+        self.leaveDay = leaveDay
+
+    def chooseDestination(self, game):
+        return self.to if game.day == self.leaveDay else None
+
+    def wantsDailyUpdates(self):
+        return False
+
+
+class _MeetingGame(Game):
+    """Notes the days beings meet instead of having encounters."""
+    def createEncounter(self, being1, being2):
+        self.meetings.append(self.day)
+        return True
+
+
+@pytest.mark.parametrize('batchTravel', [False, True])
+@pytest.mark.parametrize('headStart', [0, 1, 2, 3, 4, 5])
+@pytest.mark.parametrize('marsFirst', [False, True])
+def test_opposite_travellers_always_meet(batchTravel, headStart, marsFirst):
+    # The earth-mars edge is 10 long.  Whether the gap between the two is odd or even they can't slip past each other.
+    players = [_Traveller('earth', 'mars', 1), _Traveller('mars', 'earth', 1 + headStart)]
+    if marsFirst:
+        players.reverse()
+    game = _MeetingGame(players, seed=1, batchTravel=batchTravel)
+    game.meetings = []
+    for being in game.beings:
+        being.currentLocation = being.player.start
+        game.occupancy.update(being)
+        game.supplyLedger.move(being)
+    for day in range(15):
+        game.doTurn()
+    assert sorted(set(game.meetings)) == [6 + (headStart + 1) // 2]
+
+
+@pytest.mark.parametrize('batchTravel', [False, True])
+def test_travellers_side_by_side_meet(batchTravel):
+    game = _MeetingGame([_Traveller('earth', 'mars', 1), _Traveller('earth', 'mars', 1)], seed=1, batchTravel=batchTravel)
+    game.meetings = []
+    for being in game.beings:
+        being.currentLocation = being.player.start
+        game.occupancy.update(being)
+        game.supplyLedger.move(being)
+    game.doTurn()
+    game.doTurn()
+    assert game.meetings  # Neck and neck on the edge after the first day of travel
+
+
+class _PairingGame(Game):
+    """Notes who gets paired up for encounters."""
+    def createEncounter(self, being1, being2):
+        created = Game.createEncounter(self, being1, being2)
+        if created:
+            self.pairs.append((being1.id, being2.id))
+        return created
+
+
+@pytest.mark.parametrize('batchTravel', [False, True])
+def test_busy_beings_dont_stop_others_meeting(batchTravel):
+    game = _PairingGame([_Traveller('earth', 'mars', -1) for x in range(7)], seed=1, batchTravel=batchTravel)
+    game.pairs = []
+    for being in game.beings:
+        being.currentLocation = being.player.start
+        game.occupancy.update(being)
+        game.supplyLedger.move(being)
+    game.doTurn()
+    # Everybody is at earth so they pair off, whoever their first choice was busy with
+    assert len(game.pairs) == 3
+    assert len(set(beingId for pair in game.pairs for beingId in pair)) == 6
@@ -1,4 +1,6 @@
+import random
 from trader.profiles import EventProfile
+from trader.profiles import EventStateTable
 from trader.profiles import Item
 from trader.profiles import Vessel
 from trader.profiles import VesselUpgrade
@@ -21,9 +23,10 @@ def test_price_profile():
 def test_event_profile_percent_chance():
     for percentChance in range(0, 100, 1):
         e = EventProfile('foo', percentChance)
+        table = EventStateTable(random.Random(percentChance))  # Seeded so the odds check isn't flaky
         count = 0
         for day in range(10000):
-            if e.isHappening(day, ()):
+            if e.isHappening(day, (), table):
                 count += 1
         if percentChance == 0:
             assert count == 0
@@ -42,9 +45,10 @@ def test_event_profile_dynamic_func():
             return self._percent
     for dynamicPercent in range(0, 100, 1):
         e = EventProfile('foo', 12, DynamicFuncObj(dynamicPercent))
+        table = EventStateTable(random.Random(dynamicPercent))
         count = 0
         for day in range(10000):
-            if e.isHappening(day, ()):
+            if e.isHappening(day, (), table):
                 count += 1
         if dynamicPercent == 0:
             assert count == 0
@@ -57,9 +61,10 @@ def test_event_profile_dynamic_func():
 def test_event_profile_duration():
     for d in range(1, 11):
         e = EventProfile('foo', percentChance=1, duration=d)
+        table = EventStateTable()
         consecutiveDays = 0
         for day in range(10000):
-            if e.isHappening(day, ()):
+            if e.isHappening(day, (), table):
                 consecutiveDays += 1
             else:
                 if consecutiveDays != 0:
@@ -104,3 +109,50 @@ def test_vessel_profile():
                                price=100))
     assert v.offense == 20
     assert v.defense == 20
+
+
+def test_event_profile_skipped_days():
+    # Constant chance events don't need to be asked every day to have the right odds
+    for percentChance in (5, 20, 50):
+        e = EventProfile('foo', percentChance, duration=3)
+        table = EventStateTable()
+        count = 0
+        samples = 0
+        for day in range(0, 30000, 7):
+            samples += 1
+            if e.isHappening(day, (), table):
+                count += 1
+        expected = samples * (3 * percentChance / 100) / (1 + 2 * percentChance / 100)
+        assert expected * 0.8 < count < expected * 1.2
+
+
+def test_event_profile_next_transition_day():
+    e = EventProfile('foo', percentChance=10, duration=5)
+    table = EventStateTable()
+    day = 0
+    happening = e.isHappening(day, (), table)
+    for x in range(100):
+        nextDay = e.nextTransitionDay(day, table)
+        assert nextDay > day
+        for between in range(day + 1, nextDay):
+            assert e.isHappening(between, (), table) == happening
+        day = nextDay
+        happening = e.isHappening(day, (), table)
+    assert EventProfile('foo', 0).nextTransitionDay(0, EventStateTable()) is None
+    assert EventProfile('foo', 10, dynamicFunc=lambda day, events: 10).nextTransitionDay(0, EventStateTable()) is None
+
+
+def test_event_state_is_per_location():
+    # The same profile attached to two places must not leak state between them
+    e = EventProfile('foo', percentChance=1, duration=100)
+    table = EventStateTable()
+    both = 0
+    either = 0
+    for day in range(0, 20000):
+        a = e.isHappening(day, (), table, 'a')
+        b = e.isHappening(day, (), table, 'b')
+        either += a or b
+        both += a and b
+    assert either > 0
+    assert both < either
+    assert len(table) == 2
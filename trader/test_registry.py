@@ -0,0 +1,44 @@
+from trader import combat
+from trader.encounter import Encounter, EncounterStateCode
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+
+
+def test_ids_are_stable_and_unique():
+    game = Game([RandomPlayer(verbose=False) for x in range(5)])
+    assert len(game.beingRegistry) == 5
+    assert [being.id for being in game.beings] == list(range(5))
+    for being in game.beings:
+        assert game.getBeingById(being.id) is being
+        assert game.getBeingByName(being.name) is being
+        assert game.beingName(being.id) == being.name
+        assert game.beingRegistry.id(being.name) == being.id
+    assert game.getBeingByName('nobody') is None
+
+
+def test_combat_events_use_ids():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    being1 = game.beings[0]
+    being2 = game.beings[1]
+    e = Encounter(game, [being1, being2],
+                  {being1.id: EncounterStateCode.COMBAT,
+                   being2.id: EncounterStateCode.COMBAT})
+    while e.doTurn():
+        pass
+    for event in e.eventLog():
+        if event.eventCode == combat.CombatEventCode.DAMAGE:
+            assert event.attacker in (being1.id, being2.id)
+            assert event.defender in (being1.id, being2.id)
+        else:
+            assert event.being in (being1.id, being2.id)
+    for event in e.eventLog():
+        if event.eventCode == combat.CombatEventCode.DEATH:
+            assert game.getBeingById(event.being).isDead()
+
+
+def test_being_only_in_one_encounter():
+    game = Game([RandomPlayer(verbose=False) for x in range(3)])
+    (being1, being2, being3) = game.beings
+    game.createEncounter(being1, being2)
+    game.createEncounter(being2, being3)
+    assert len(game.encounters) == 1
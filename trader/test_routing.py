@@ -0,0 +1,77 @@
+import random
+import networkx as nx
+from trader.csrgraph import CSRGraph
+from trader.distanceoracle import DistanceOracle
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+from trader.routing import RoutePlanner
+
+
+def _lineGraph():
+    """a -5- b -5- c -5- d with a long way round a -40- d"""
+    graph = nx.Graph()
+    for node in 'abcd':
+        graph.add_node(node, events=[])
+    graph.add_edge('a', 'b', weight=5)
+    graph.add_edge('b', 'c', weight=5)
+    graph.add_edge('c', 'd', weight=5)
+    graph.add_edge('a', 'd', weight=40)
+    return graph
+
+
+def _planner(graph, **kwargs):
+    csr = CSRGraph(graph)
+    return RoutePlanner(csr, DistanceOracle(csr), **kwargs)
+
+
+def test_fuel_limits_routes():
+    planner = _planner(_lineGraph())
+    route = planner.planRoute('a', 'd', 15)
+    assert route.nodes == ('a', 'b', 'c', 'd')
+    assert route.distance == 15
+    assert route.nextDestination() == 'b'
+    assert planner.planRoute('a', 'd', 14) is None
+    assert planner.planRoute('a', 'a', 0).nodes == ('a',)
+    assert planner.reachable('a', 12) == {'a': 0, 'b': 5, 'c': 10}
+
+
+def test_refuel_nodes():
+    planner = _planner(_lineGraph(), refuelNodes=['c'], tankSize=5)
+    route = planner.planRoute('a', 'd', 10)
+    assert route.nodes == ('a', 'b', 'c', 'd')
+    assert route.refuelStops == ('c',)
+    assert planner.planRoute('a', 'd', 9) is None
+
+
+def test_matches_brute_force():
+    rng = random.Random(5)
+    graph = nx.gnm_random_graph(25, 50, seed=5)
+    graph = nx.relabel_nodes(graph, dict((node, 'n{0}'.format(node)) for node in graph))
+    for (node1, node2) in graph.edges():
+        graph[node1][node2]['weight'] = rng.randint(1, 20)
+    planner = _planner(graph, fuelBucketSize=7)
+    lengths = dict(nx.all_pairs_dijkstra_path_length(graph))
+    queries = [(rng.choice(list(graph)), rng.choice(list(graph)), rng.randint(0, 60)) for i in range(300)]
+    for (query, route) in zip(queries, planner.planRoutes(queries)):
+        (source, destination, fuel) = query
+        shortest = lengths[source].get(destination)
+        if shortest is None or shortest > fuel:
+            assert route is None
+        else:
+            assert route.distance == shortest
+            assert route.nodes[0] == source and route.nodes[-1] == destination
+            assert sum(graph[n1][n2]['weight'] for n1, n2 in zip(route.nodes, route.nodes[1:])) == shortest
+
+
+def test_game_plans_for_beings():
+    game = Game([RandomPlayer(verbose=False), RandomPlayer(verbose=False)])
+    for being in game.beings:
+        being.currentLocation = 'mars'
+        being.inventory.goods['fuel'] = 20
+    (route1, route2) = game.planRoutes([(game.beings[0], 'venus'), (game.beings[1], 'earth')])
+    assert route1.nodes == ('mars', 'earth', 'venus')
+    assert route2.nodes == ('mars', 'earth')
+    game.beings[0].inventory.goods['fuel'] = 19
+    assert game.planRoute(game.beings[0], 'venus') is None
+    game.setEdgeWeight('mars', 'venus', 19)
+    assert game.planRoute(game.beings[0], 'venus').nodes == ('mars', 'venus')
@@ -0,0 +1,124 @@
+import os
+import random
+import pytest
+from trader.game import Game
+from trader.savegame import SaveError
+
+
+def test_load_plays_on_the_same(tmpdir, gameOptions, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=11, **gameOptions)
+    for day in range(40):
+        game.doTurn()
+    game.save(filename)
+    loaded = Game.load(filename, players())
+    assert snapshot(loaded) == snapshot(game)
+    assert loaded.scheduler is not None if gameOptions.get('eventDriven') else loaded.scheduler is None
+
+    for g in (game, loaded):
+        random.seed(2)  # The players' own random numbers aren't part of the game's state
+        for day in range(40):
+            g.doTurn()
+    assert snapshot(loaded) == snapshot(game)
+
+
+def test_incremental_saves(tmpdir, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=12)
+    game.save(filename, incremental=True)  # Nothing to build on so this is a full save
+    fullSize = os.path.getsize(filename)
+    for day in range(20):
+        game.doTurn()
+        game.save(filename, incremental=True)
+    assert os.path.getsize(filename) > fullSize
+    assert snapshot(Game.load(filename, players())) == snapshot(game)
+
+    game.save(filename)  # A full save starts the file over
+    assert os.path.getsize(filename) < fullSize * 2
+
+
+def test_unchanged_beings_are_left_out(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=13)
+    game.save(filename)
+    before = os.path.getsize(filename)
+    game.save(filename, incremental=True)
+    with open(filename, 'rb') as f:
+        f.seek(before)
+        delta = f.read()
+    game.save(os.path.join(str(tmpdir), 'other.save'), incremental=True)
+    assert len(delta) < os.path.getsize(os.path.join(str(tmpdir), 'other.save'))
+
+
+def test_loaded_game_saves_incrementally(tmpdir, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=14)
+    for day in range(10):
+        game.doTurn()
+    game.save(filename)
+    loaded = Game.load(filename, players())
+    for day in range(10):
+        loaded.doTurn()
+    loaded.save(filename, incremental=True)
+    assert snapshot(Game.load(filename, players())) == snapshot(loaded)
+
+
+def test_crash_while_appending(tmpdir, snapshot, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=15)
+    game.save(filename)
+    expected = snapshot(game)
+    size = os.path.getsize(filename)
+    for day in range(10):
+        game.doTurn()
+    game.save(filename, incremental=True)
+    with open(filename, 'r+b') as f:
+        f.truncate(size + 10)  # Cut the delta short
+    assert snapshot(Game.load(filename, players())) == expected
+
+
+def test_bad_files(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'junk.save')
+    with open(filename, 'wb') as f:
+        f.write(b'not a save at all')
+    with pytest.raises(SaveError):
+        Game.load(filename, players())
+
+    filename = os.path.join(str(tmpdir), 'game.save')
+    Game(players(), seed=16).save(filename)
+    with pytest.raises(SaveError):
+        Game.load(filename, players()[:3])
+
+
+def test_only_changed_beings_are_written(tmpdir, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=17)
+    for day in range(5):
+        game.doTurn()
+    game.save(filename)
+    changes = game.captureChanges()
+    assert changes['beings'] == []
+    assert changes['eventStates'] == []
+
+    being = game.beings[1]
+    being.inventory.money += 5
+    assert [row[0] for row in game.captureChanges()['beings']] == [being.name]
+    game.save(filename, incremental=True)
+    assert game.captureChanges()['beings'] == []
+    assert Game.load(filename, players()).beings[1].inventory.money == being.inventory.money
+
+
+def test_occupancy_is_rebuilt_in_order(tmpdir, gameOptions, players):
+    filename = os.path.join(str(tmpdir), 'game.save')
+    game = Game(players(), seed=18, **gameOptions)
+    game.save(filename)
+    for day in range(30):
+        game.doTurn()
+        game.save(filename, incremental=True)
+    (nodes, edges, opened, filed, sequence) = game.occupancy.snapshot()
+    (loadedNodes, loadedEdges, loadedOpened, loadedFiled, loadedSequence) = Game.load(filename, players()).occupancy.snapshot()
+    assert (loadedNodes, loadedOpened) == (nodes, opened)
+    # Beings are looked at edge by edge (in order) and then by position, so only the order of positions doesn't matter
+    assert ([(edge, dict(positions)) for edge, positions in loadedEdges] ==
+            [(edge, dict(positions)) for edge, positions in edges])
+    assert sorted(loadedFiled) == sorted(filed)
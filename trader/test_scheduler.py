@@ -0,0 +1,66 @@
+import random
+from trader.encounter import EncounterStateCode
+from trader.eventsink import CallbackSink
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+
+
+def test_event_driven_game_skips_idle_days():
+    skipped = False
+    for x in range(20):
+        game = Game([RandomPlayer(verbose=False) for p in range(3)], eventDriven=True)
+        lastDay = game.day
+        while game.day < 500:
+            game.doTurn()
+            assert game.day > lastDay
+            if game.day > lastDay + 1:
+                skipped = True
+            lastDay = game.day
+            for being in game.beings:
+                if not being.isDead() and being.currentLocation == '':
+                    assert 0 < being._state._distance
+                    assert being.inventory.goods['fuel'] > 0
+    assert skipped
+
+
+class ChattyPlayer(RandomPlayer):
+    def wantsDailyUpdates(self) -> bool:
+        return True
+
+
+def test_chatty_players_get_every_day():
+    game = Game([ChattyPlayer(verbose=False), RandomPlayer(verbose=False)], eventDriven=True)
+    for day in range(1, 50):
+        game.doTurn()
+        if not game.beings[0].isDead():
+            assert game.day == day
+
+
+class TradingPlayer(RandomPlayer):
+    """Never fights so the combat rolls (which use the game's random numbers) can't tell the two games apart."""
+    def voteInitState(self, game, being):
+        return EncounterStateCode.TRADE
+
+
+def _playTradingGame(seed, eventDriven, snapshot):
+    random.seed(seed)  # RandomPlayer decides with the random module
+    events = []
+    sink = CallbackSink(lambda day, encounterId, event: events.append((day, event.family, event.eventCode,
+                                                                      event.columns())))
+    game = Game([TradingPlayer(verbose=False) for p in range(6)], seed=seed, eventDriven=eventDriven, eventSink=sink)
+    snapshots = {}
+    while game.day < 300:
+        game.doTurn()
+        snapshots[game.day] = snapshot(game)
+    return (snapshots, events)
+
+
+def test_event_driven_game_plays_out_the_same(snapshot):
+    for seed in range(3):
+        (steppedSnapshots, steppedEvents) = _playTradingGame(seed, False, snapshot)
+        (skippingSnapshots, skippingEvents) = _playTradingGame(seed, True, snapshot)
+        assert len(skippingSnapshots) < len(steppedSnapshots)
+        for (day, skippingSnapshot) in skippingSnapshots.items():
+            if day in steppedSnapshots:
+                assert skippingSnapshot == steppedSnapshots[day]
+        assert skippingEvents == steppedEvents
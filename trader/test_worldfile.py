@@ -0,0 +1,84 @@
+import json
+import pytest
+from trader import worldloader
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+from trader.worldfile import WorldFileError, readWorldFile, writeWorldFile
+from trader.worldloader import DEFAULT_WORLD, loadWorld, readCustomWorld
+
+
+DEFAULT_WORLD_FILE = DEFAULT_WORLD.replace('world.py', 'world.jsonl')
+
+
+@pytest.fixture
+def freshWorlds(monkeypatch):
+    monkeypatch.setattr(worldloader, '_loadedWorlds', {})
+
+
+def test_world_file_matches_world_script():
+    script = readCustomWorld(DEFAULT_WORLD)
+    worldFile = readWorldFile(DEFAULT_WORLD_FILE)
+    assert sorted(worldFile['graph'].nodes()) == sorted(script['graph'].nodes())
+    for (node1, node2, weight) in script['graph'].edges(data='weight'):
+        assert worldFile['graph'][node1][node2]['weight'] == weight
+    for node in script['graph']:
+        assert ([eventProfile.name for eventProfile in worldFile['graph'].nodes[node]['events']] ==
+                [eventProfile.name for eventProfile in script['graph'].nodes[node]['events']])
+    assert ([eventProfile.name for eventProfile in worldFile['events']] ==
+            [eventProfile.name for eventProfile in script['events']])
+    assert worldFile['events'][0].edges == script['events'][0].edges
+    assert sorted(worldFile['items']) == sorted(script['items'])
+    for name, item in script['items'].items():
+        assert worldFile['items'][name].price == item.price
+        assert worldFile['items'][name].dynamicFunc is item.dynamicFunc
+
+
+def test_round_trip(tmp_path):
+    script = readCustomWorld(DEFAULT_WORLD)
+    filename = str(tmp_path / 'roundtrip.jsonl')
+    writeWorldFile(filename, script['graph'], script['events'], script['items'])
+    worldFile = readWorldFile(filename)
+    megaShip = script['items']['mega ship']
+    megaShip.addUpgrade(script['items']['super gun'])
+    writeWorldFile(filename, script['graph'], script['events'], script['items'])
+    readShip = readWorldFile(filename)['items']['mega ship']
+    assert readShip.offense == megaShip.offense
+    assert readShip.upgradePoints == megaShip.upgradePoints
+    assert [upgrade.name for upgrade in readShip.upgrades] == ['super gun']
+    assert sorted(worldFile['graph'].edges()) == sorted(script['graph'].edges())
+
+
+def test_game_on_world_file(freshWorlds):
+    world = loadWorld(DEFAULT_WORLD_FILE)
+    assert loadWorld(DEFAULT_WORLD_FILE) is world
+    game = Game([RandomPlayer(verbose=False)], world=world)
+    for day in range(50):
+        game.doTurn()
+
+
+def _writeRecords(path, records):
+    path.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+    return str(path)
+
+
+def test_bad_records_report_line_numbers(tmp_path):
+    node = {'type': 'node', 'name': 'earth', 'events': []}
+    filename = _writeRecords(tmp_path / 'bad.jsonl', [node, {'type': 'moon', 'name': 'luna'}])
+    with pytest.raises(WorldFileError) as excinfo:
+        readWorldFile(filename)
+    assert excinfo.value.lineNumber == 2
+
+    filename = _writeRecords(tmp_path / 'bad.jsonl', [node, {'type': 'edge', 'nodes': ['earth', 'mars'], 'weight': 1}])
+    with pytest.raises(WorldFileError) as excinfo:
+        readWorldFile(filename)
+    assert excinfo.value.lineNumber == 2
+
+    filename = _writeRecords(tmp_path / 'bad.jsonl', [{'type': 'item', 'name': 'guns', 'price': 1, 'dynamicFunc': 'nope'}])
+    with pytest.raises(WorldFileError) as excinfo:
+        readWorldFile(filename)
+    assert excinfo.value.lineNumber == 1
+
+    (tmp_path / 'bad.jsonl').write_text('{"type": "node", "name": "earth"}\n\n{not json\n')
+    with pytest.raises(WorldFileError) as excinfo:
+        readWorldFile(str(tmp_path / 'bad.jsonl'))
+    assert excinfo.value.lineNumber == 3
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import pytest
+from trader import worldloader
+from trader.game import Game
+from trader.players.randomPlayer import RandomPlayer
+from trader.worldloader import loadWorld
+
+
+@pytest.fixture
+def freshWorlds(monkeypatch):
+    monkeypatch.setattr(worldloader, '_loadedWorlds', {})
+
+
+def test_world_loaded_once(freshWorlds):
+    world = loadWorld()
+    assert loadWorld() is world
+    game1 = Game([RandomPlayer(verbose=False)])
+    game2 = Game([RandomPlayer(verbose=False)], world=world)
+    assert game1.world is world
+    assert game2.world is world
+    for day in range(50):
+        game1.doTurn()
+        game2.doTurn()
+
+
+def test_world_graph_is_frozen(freshWorlds):
+    world = loadWorld()
+    with pytest.raises(Exception):
+        world.graph.add_node('pluto')
+    assert 'graph' not in vars(world)  # Only the CSRGraph is kept
+    assert sorted(world.toNetworkx().edges()) == sorted(world.graph.edges())
+
+
+def test_compiled_world_cache(freshWorlds, tmp_path, monkeypatch):
+    world = loadWorld(cacheDir=str(tmp_path))
+    cacheFiles = os.listdir(str(tmp_path))
+    assert len(cacheFiles) == 1
+
+    # A new process would not have the world loaded and must not run the script again
+    monkeypatch.setattr(worldloader, '_loadedWorlds', {})
+
+    def noExec(filename):
+        assert False, 'world script should come from the cache'
+    monkeypatch.setattr(worldloader, 'readCustomWorld', noExec)
+    cachedWorld = loadWorld(cacheDir=str(tmp_path))
+    assert cachedWorld is not world
+    assert sorted(cachedWorld.graph.nodes()) == sorted(world.graph.nodes())
+    assert cachedWorld.sourceHash == world.sourceHash
+    guns = cachedWorld.items['guns']
+    assert guns.getPrice(0, ('civil_war',)) == world.items['guns'].getPrice(0, ('civil_war',))
+    butter = cachedWorld.items['butter']
+    assert butter.getPrice(95, ('famine',)) == world.items['butter'].getPrice(95, ('famine',))
+    game = Game([RandomPlayer(verbose=False)], world=cachedWorld)
+    for day in range(50):
+        game.doTurn()
+
+
+def test_changed_script_misses_cache(freshWorlds, tmp_path):
+    script = tmp_path / 'myworld.py'
+    script.write_text(open(worldloader.DEFAULT_WORLD).read())
+    cacheDir = tmp_path / 'cache'
+    loadWorld(str(script), cacheDir=str(cacheDir))
+    script.write_text(open(worldloader.DEFAULT_WORLD).read() + '\ngraph.add_node("pluto", events=[])\n')
+    world = loadWorld(str(script), cacheDir=str(cacheDir))
+    assert 'pluto' in world.graph
+    assert len(os.listdir(str(cacheDir))) == 2
+
+
+_GLOBALS_WORLD = """
+import networkx as nx
+from trader.profiles import Item
+
+RATES = {'famine': 5, 'civil_war': 7}
+
+
+def _bump(events):
+    return sum(RATES.get(event, 0) for event in events)
+
+
+def teaPrice(day, events):
+    return _bump(events)
+
+
+graph = nx.Graph()
+graph.add_node('earth', events=[])
+graph.add_node('mars', events=[])
+graph.add_edge('earth', 'mars', weight=3)
+events = []
+items = {'tea': Item(name='tea', price=10, dynamicFunc=teaPrice),
+         'milk': Item(name='milk', price=2, dynamicFunc=lambda day, events: RATES['famine'] * len(events))}
+"""
+
+
+def test_cached_world_keeps_script_globals(freshWorlds, tmp_path, monkeypatch):
+    script = tmp_path / 'globalsworld.py'
+    script.write_text(_GLOBALS_WORLD)
+    cacheDir = str(tmp_path / 'cache')
+    loadWorld(str(script), cacheDir=cacheDir)
+    assert len(os.listdir(cacheDir)) == 1
+
+    monkeypatch.setattr(worldloader, '_loadedWorlds', {})
+
+    def noExec(filename):
+        assert False, 'world script should come from the cache'
+    monkeypatch.setattr(worldloader, 'readCustomWorld', noExec)
+    world = loadWorld(str(script), cacheDir=cacheDir)
+    assert world.items['tea'].getPrice(0, ('famine', 'civil_war')) == 22
+    assert world.items['milk'].getPrice(0, ('famine',)) == 7
+
+
+def test_world_with_unpicklable_globals_isnt_cached(freshWorlds, tmp_path):
+    script = tmp_path / 'lockworld.py'
+    script.write_text(_GLOBALS_WORLD.replace("RATES = {", "import threading\nLOCK = threading.Lock()\nRATES = {")
+                      .replace("    return _bump(events)", "    with LOCK:\n        return _bump(events)"))
+    cacheDir = str(tmp_path / 'cache')
+    world = loadWorld(str(script), cacheDir=cacheDir)
+    assert world.items['tea'].getPrice(0, ('famine',)) == 15
+    assert os.listdir(cacheDir) == []
+
+
+def test_world_items_are_frozen(freshWorlds):
+    world = loadWorld()
+    with pytest.raises(TypeError):
+        world.items['tea'] = world.items['guns']
+    with pytest.raises(AttributeError):
+        world.items['guns'].price = 1
+    with pytest.raises(AttributeError):
+        world.items['mega ship'].addUpgrade(world.items['super gun'])
+    assert world.items['mega ship'].offense == 20
+
+
+def test_file_hash_reads_in_blocks(tmp_path):
+    path = tmp_path / 'big.jsonl'
+    data = b'x' * ((1 << 20) * 2 + 5)
+    path.write_bytes(data)
+    assert worldloader._fileHash(str(path)) == hashlib.sha256(data).hexdigest()
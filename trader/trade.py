@@ -1,4 +1,5 @@
 from enum import Enum, IntEnum
+from trader.eventlog import EventFamily
 
 
 class TradeAction(Enum):
@@ -17,44 +18,58 @@ class TradeEventCode(IntEnum):
 
 class Trade:
     """Manage a trade session between multiple beings."""
-    def __init__(self, game, beings):
+    def __init__(self, game, beings, emit=None, bounded=False):
         """
         game - The game object.
         beings - collection of Being objects to particpate in the trading.
+        emit - A function object with args (event) that is called for every event as it happens.
+        bounded - If True the event log only keeps the last round's events.
         """
         assert(len(beings) == 2)
         self.beings = {}
         for being in beings:
-            self.beings[being.name] = being
+            self.beings[being.id] = being
         self._keepGoing = True
         self._game = game
 
+        self._emit = emit
+        self._bounded = bounded
         self._eventLog = []
         for being in beings:
-            self._eventLog.append(JoinTradeEvent(being.name))
+            self._recordEvent(JoinTradeEvent(being.id), [])
 
     def keepGoing(self):
         """Returns true iff there is more transacting to be done."""
         return self._keepGoing
 
     def eventLog(self):
-        """Return the full event log for this trade session."""
+        """Return the event log for this trade session (just the last round's events if it is bounded)."""
         return self._eventLog
 
+    def snapshot(self):
+        """Return a TradeSnapshot of where this trade session is now."""
+        beings = list(self.beings.values())
+        return TradeSnapshot(tuple(being.id for being in beings),
+                             [being.inventory.money for being in beings],
+                             [dict(being.inventory.goods) for being in beings],
+                             self._keepGoing)
+
     def _recordEvent(self, event, roundEvents):
         """
         Record a trade event.
         event - The new event being recorded.
         roundEvents - Collection of events for this round we'll add to.
         """
-        roundEvents += [event]
-        self._eventLog += [event]
+        roundEvents.append(event)
+        self._eventLog.append(event)
+        if self._emit:
+            self._emit(event)
 
-    def _getOtherBeing(self, beingName):
-        """Given a being name return the Being of the other guy."""
+    def _getOtherBeing(self, beingId):
+        """Given a being id return the Being of the other guy."""
         assert(len(self.beings) == 2)
         for being in self.beings:
-            if being == beingName:
+            if being == beingId:
                 continue
             return self.beings[being]
         assert(False)
@@ -81,11 +96,13 @@ class Trade:
     def doRound(self, commands):
         """
         Do a single round of trading and return a list of TradeEvents that happened.
-        commands - Dictionary from being name -> (TradeAction, quantity, goodName).
+        commands - Dictionary from being id -> (TradeAction, quantity, goodName).
         Returns the trade events generated (in order) during the round.
         """
 
         tradeEvents = []  # TradeEvents for this round
+        if self._bounded:
+            del self._eventLog[:]
 
         for initiator in commands:
             (tradeAction, quantity, goodName, price) = commands[initiator]
@@ -95,8 +112,8 @@ class Trade:
 
                 # Make sure this transaction is valid
                 if not self.isValidGoodsTransaction(buyerBeing, sellerBeing, goodName, quantity, price):
-                    self._recordEvent(TransactionTradeEvent(buyerBeing.name,
-                                                            sellerBeing.name,
+                    self._recordEvent(TransactionTradeEvent(buyerBeing.id,
+                                                            sellerBeing.id,
                                                             price,
                                                             goodName,
                                                             quantity), tradeEvents)
@@ -118,15 +135,15 @@ class Trade:
                                             goodName,
                                             quantity,
                                             price)
-                    self._recordEvent(TransactionTradeEvent(buyerBeing.name,
-                                                            sellerBeing.name,
+                    self._recordEvent(TransactionTradeEvent(buyerBeing.id,
+                                                            sellerBeing.id,
                                                             price,
                                                             goodName,
                                                             quantity), tradeEvents)
                 else:
                     # If not accepted just record the event
-                    self._recordEvent(RefusalTradeEvent(buyerBeing.name,
-                                                        sellerBeing.name,
+                    self._recordEvent(RefusalTradeEvent(buyerBeing.id,
+                                                        sellerBeing.id,
                                                         price,
                                                         goodName,
                                                         quantity), tradeEvents)
@@ -136,8 +153,8 @@ class Trade:
 
                 # Make sure this transaction is valid
                 if not self.isValidGoodsTransaction(buyerBeing, sellerBeing, goodName, quantity, price):
-                    self._recordEvent(TransactionTradeEvent(buyerBeing.name,
-                                                            sellerBeing.name,
+                    self._recordEvent(TransactionTradeEvent(buyerBeing.id,
+                                                            sellerBeing.id,
                                                             price,
                                                             goodName,
                                                             quantity), tradeEvents)
@@ -159,15 +176,15 @@ class Trade:
                                             goodName,
                                             quantity,
                                             price)
-                    self._recordEvent(TransactionTradeEvent(buyerBeing.name,
-                                                            sellerBeing.name,
+                    self._recordEvent(TransactionTradeEvent(buyerBeing.id,
+                                                            sellerBeing.id,
                                                             price,
                                                             goodName,
                                                             quantity), tradeEvents)
                 else:
                     # If not accepted just record the event
-                    self._recordEvent(RefusalTradeEvent(buyerBeing.name,
-                                                        sellerBeing.name,
+                    self._recordEvent(RefusalTradeEvent(buyerBeing.id,
+                                                        sellerBeing.id,
                                                         price,
                                                         goodName,
                                                         quantity), tradeEvents)
@@ -183,35 +200,145 @@ class Trade:
         return tradeEvents
 
 
+def acceptAll(snapshot, beingId, tradeAction, quantity, goodName, price):
+    """A TradeSnapshot answer function that takes every offer."""
+    return True
+
+
+class TradeSnapshot:
+    """
+    A trade session reduced to values: the two beings' money and goods.
+    Stepping a snapshot plays a round by the same rules as Trade.doRound, but offers are answered by a
+    plain function instead of the other being's player and no Being or Inventory is touched.
+    """
+    __slots__ = ('ids', 'money', 'goods', '_keepGoing', 'rounds')
+
+    def __init__(self, ids, money, goods, keepGoing=True):
+        """
+        ids - Tuple of the two being ids.
+        money - List of how much money each has, in the same order.
+        goods - List of dictionaries of good name -> count for each, in the same order.
+        keepGoing - False if somebody has already left.
+        """
+        assert(len(ids) == 2)
+        self.ids = ids
+        self.money = money
+        self.goods = goods
+        self._keepGoing = keepGoing
+        self.rounds = 0
+
+    def clone(self):
+        """Return a copy that can be stepped without changing this one."""
+        retval = TradeSnapshot.__new__(TradeSnapshot)
+        retval.ids = self.ids
+        retval.money = list(self.money)
+        retval.goods = [dict(goods) for goods in self.goods]
+        retval._keepGoing = self._keepGoing
+        retval.rounds = self.rounds
+        return retval
+
+    def keepGoing(self):
+        """Returns true iff there is more transacting to be done."""
+        return self._keepGoing
+
+    def moneyOf(self, beingId):
+        """Return how much money a being has."""
+        return self.money[self.ids.index(beingId)]
+
+    def goodsOf(self, beingId):
+        """Return the dictionary of good name -> count for a being."""
+        return self.goods[self.ids.index(beingId)]
+
+    def step(self, commands, accept=acceptAll):
+        """
+        Play one round, changing this snapshot.
+        commands - Dictionary from being id -> (TradeAction, quantity, goodName, price).
+        accept - A function object with args (snapshot, beingId, tradeAction, quantity, goodName, price) that
+                 returns True iff the being takes the offer (like Player.evaluateTradeRequest).
+        """
+        self.rounds += 1
+        for initiator in commands:
+            (tradeAction, quantity, goodName, price) = commands[initiator]
+            if tradeAction == TradeAction.BUY or tradeAction == TradeAction.SELL:
+                me = self.ids.index(initiator)
+                (buyer, seller) = (me, 1 - me) if tradeAction == TradeAction.BUY else (1 - me, me)
+                if self.money[buyer] < price * quantity or self.goods[seller].get(goodName, 0) < quantity:
+                    continue
+                responder = 1 - me
+                if accept(self, self.ids[responder], TradeAction.SELL if responder == seller else TradeAction.BUY,
+                          quantity, goodName, price):
+                    self.money[buyer] -= price * quantity
+                    self.money[seller] += price * quantity
+                    self.goods[buyer][goodName] = self.goods[buyer].get(goodName, 0) + quantity
+                    self.goods[seller][goodName] -= quantity
+            elif tradeAction == TradeAction.DONE:
+                self._keepGoing = False
+                break
+
+    def rollout(self, policy, accept=acceptAll, maxRounds=100):
+        """
+        Return a clone that has been stepped until somebody leaves (or maxRounds more rounds have been played).
+        policy - A function object with args (snapshot) that returns the commands for the next round.
+        accept - See step.
+        maxRounds - Most rounds to play.
+        """
+        retval = self.clone()
+        for x in range(maxRounds):
+            if not retval.keepGoing():
+                break
+            retval.step(policy(retval), accept)
+        return retval
+
+
 class TradeEvent:
     """Base class for all events possible in trade."""
+    __slots__ = ('eventCode',)
+    family = EventFamily.TRADE
+
     def __init__(self, eventCode: TradeEventCode):
         """
         eventCode - TradeEvent that identifies the most derived class.
         """
         self.eventCode = int(eventCode)
 
+    def columns(self):
+        """Return (actor, target, amount) for a ColumnarEventLog."""
+        return (self.being, None, 0)
+
+    def describe(self, game):
+        """
+        Return a readable description of the event (events hold being ids, so the names come from the game).
+        game - The Game the event happened in.
+        """
+        raise NotImplementedError("describe is virtual and must be overridden.")
+
 
 class TransactionTradeEvent(TradeEvent):
     """A successful transaction has taken place"""
+    __slots__ = ('buyer', 'seller', 'price', 'good', 'quantity')
+
     def __init__(self, buyer, seller, price, good, quantity):
         """
-        buyer - The buyer in the transaction.
-        seller - The seller in the transaction.
+        buyer - Id of the buyer in the transaction.
+        seller - Id of the seller in the transaction.
         price - The price paid per unit.
         good - The name of the good.
         quantity - The quantity of the good.
         """
         TradeEvent.__init__(self, TradeEventCode.TRANSACTION)
-        self.buyer = str(buyer)
-        self.seller = str(seller)
+        self.buyer = buyer
+        self.seller = seller
         self.price = int(price)
         self.good = str(good)
         self.quantity = int(quantity)
 
-    def __str__(self):
-        return 'TRANSACTION\nbuyer={0}\nseller={1}\nprice={2}\ngood={3}\nquantity={4}'.format(self.buyer,
-                                                                                              self.seller,
+    def columns(self):
+        return (self.buyer, self.seller, self.price * self.quantity)
+
+    def describe(self, game):
+        name = game.beingName
+        return 'TRANSACTION\nbuyer={0}\nseller={1}\nprice={2}\ngood={3}\nquantity={4}'.format(name(self.buyer),
+                                                                                              name(self.seller),
                                                                                               self.price,
                                                                                               self.good,
                                                                                               self.quantity)
@@ -219,24 +346,30 @@ class TransactionTradeEvent(TradeEvent):
 
 class RefusalTradeEvent(TradeEvent):
     """An offer has been refused."""
+    __slots__ = ('buyer', 'seller', 'price', 'good', 'quantity')
+
     def __init__(self, buyer, seller, price, good, quantity):
         """
-        buyer - The buyer in the transaction.
-        seller - The seller in the transaction.
+        buyer - Id of the buyer in the transaction.
+        seller - Id of the seller in the transaction.
         price - The price paid per unit.
         good - The name of the good.
         quantity - The quantity of the good.
         """
-        TradeEvent.__init__(self, TradeEventCode.TRANSACTION)
-        self.buyer = str(buyer)
-        self.seller = str(seller)
+        TradeEvent.__init__(self, TradeEventCode.REFUSAL)
+        self.buyer = buyer
+        self.seller = seller
         self.price = int(price)
         self.good = str(good)
         self.quantity = int(quantity)
 
-    def __str__(self):
-        return 'REFUSAL\nbuyer={0}\nseller={1}\nprice={2}\ngood={3}\nquantity={4}'.format(self.buyer,
-                                                                                          self.seller,
+    def columns(self):
+        return (self.buyer, self.seller, self.price * self.quantity)
+
+    def describe(self, game):
+        name = game.beingName
+        return 'REFUSAL\nbuyer={0}\nseller={1}\nprice={2}\ngood={3}\nquantity={4}'.format(name(self.buyer),
+                                                                                          name(self.seller),
                                                                                           self.price,
                                                                                           self.good,
                                                                                           self.quantity)
@@ -244,21 +377,27 @@ class RefusalTradeEvent(TradeEvent):
 
 class LeaveTradeEvent(TradeEvent):
     """A being is leaving the trading session."""
-    def __init__(self, beingName):
-        """beingName - Name of the being leaving the trading session."""
+    __slots__ = ('being',)
+
+    def __init__(self, being):
+        """being - Id of the being leaving the trading session."""
         TradeEvent.__init__(self, TradeEventCode.LEAVE)
-        self.beingName = str(beingName)
+        self.being = being
 
-    def __str__(self):
-        return 'LEAVE {0}'.format(self.beingName)
+    def describe(self, game):
+        name = game.beingName
+        return 'LEAVE {0}'.format(name(self.being))
 
 
 class JoinTradeEvent(TradeEvent):
     """A being is joining the trading session."""
-    def __init__(self, beingName):
-        """beingName - Name of the being joining the trading session."""
+    __slots__ = ('being',)
+
+    def __init__(self, being):
+        """being - Id of the being joining the trading session."""
         TradeEvent.__init__(self, TradeEventCode.JOIN)
-        self.beingName = str(beingName)
+        self.being = being
 
-    def __str__(self):
-        return 'JOIN {0}'.format(self.beingName)
+    def describe(self, game):
+        name = game.beingName
+        return 'JOIN {0}'.format(name(self.being))
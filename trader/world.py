@@ -3,33 +3,13 @@ from trader.profiles import Item
 from trader.profiles import VesselUpgrade
 from trader.profiles import Vessel
 from trader.profiles import EventProfile
+from trader.worldfuncs import ButterPriceFunc, GunsPriceFunc
 
 
 graph = nx.Graph()
 standardCommodities = {}
 
-
-def GunsPriceFunc(day, events):
-    offset = 0
-    if 'civil_war' in events:
-        offset += 20
-    if 'mars_earth_war' in events:
-        offset += 20
-    return offset
-
-
 standardCommodities['guns'] = Item(name='guns', price=75, dynamicFunc=GunsPriceFunc)
-
-
-def ButterPriceFunc(day, events):
-    offset = 0
-    if day % 100 > 90:
-        offset += 10
-    if 'famine' in events:
-        offset += 10
-    return offset
-
-
 standardCommodities['butter'] = Item(name='butter', price=10, dynamicFunc=ButterPriceFunc)
 standardCommodities['super gun'] = VesselUpgrade(name='super gun',
                                                  offenseMod=200,
@@ -64,7 +44,7 @@ marsEarthWarEvent = EventProfile('mars_earth_war',
                                  description='Mars and Earth are at war',
                                  duration=50,
                                  nodes=('earth', 'mars'),
-                                 edges=(('earth', 'mars')))
+                                 edges=(('earth', 'mars'),))
 
 events = [marsEarthWarEvent]
 items = standardCommodities
@@ -0,0 +1,251 @@
+"""
+A declarative world format: JSON lines, one record per line.
+
+Every record is an object with a "type":
+  {"type": "event", "name": "famine", "percentChance": 50, "description": "...", "duration": 1,
+   "dynamicFunc": "some_registered_name", "global": false, "nodes": [...], "edges": [[n1, n2], ...]}
+  {"type": "item", "name": "guns", "price": 75, "dynamicFunc": "guns_price"}
+  {"type": "upgrade", "name": "gun", "offenseMod": 10, "defenseMod": 0, "capacityMod": 0,
+   "maneuverabilityMod": 0, "stealthMod": 0, "upgradePoints": 5, "price": 100}
+  {"type": "vessel", "name": "ship", "offense": 0, "defense": 0, "capacity": 50, "maneuverability": 10,
+   "stealth": 0, "upgradePoints": 10, "price": 100, "upgrades": ["gun", {an upgrade record without "type"}]}
+  {"type": "node", "name": "earth", "events": ["famine"], ...any other node attributes...}
+  {"type": "edge", "nodes": ["earth", "mars"], "weight": 10}
+
+Global events ("global": true) are the world's events list, the rest are attached to nodes by name.
+Events and upgrades have to be defined before the records that refer to them by name.
+Functions are referred to by the names they are registered under in trader.worldfuncs.
+The file is read one line at a time so only the world being built is held in memory.
+"""
+import json
+import networkx as nx
+from trader.profiles import EventProfile, Item, ItemClassCode, Vessel, VesselUpgrade
+from trader.worldfuncs import registeredFunction, registeredName
+
+
+FORMAT_VERSION = 1
+
+
+class WorldFileError(ValueError):
+    """A world file has a record that can't be understood."""
+    def __init__(self, filename, lineNumber, message):
+        ValueError.__init__(self, '{0}:{1}: {2}'.format(filename, lineNumber, message))
+        self.filename = filename
+        self.lineNumber = lineNumber
+
+
+def iterWorldFile(filename):
+    """
+    Generator of (lineNumber, record) for every record in a world file.
+    Blank lines are skipped.
+    """
+    with open(filename) as f:
+        for lineNumber, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise WorldFileError(filename, lineNumber, str(e))
+            if not isinstance(record, dict) or 'type' not in record:
+                raise WorldFileError(filename, lineNumber, 'records must be objects with a "type"')
+            yield (lineNumber, record)
+
+
+class _WorldBuilder:
+    """Builds the pieces of a world up one record at a time."""
+    def __init__(self):
+        self.graph = nx.Graph()
+        self.events = []  # Global EventProfile objects
+        self.items = {}  # item name -> Item
+        self.eventProfiles = {}  # event name -> EventProfile (global or not)
+
+    def _function(self, record):
+        name = record.get('dynamicFunc')
+        if name is None:
+            return None
+        return registeredFunction(name)
+
+    def addEvent(self, record):
+        eventProfile = EventProfile(record['name'],
+                                    record.get('percentChance', 0),
+                                    dynamicFunc=self._function(record),
+                                    description=record.get('description'),
+                                    nodes=tuple(record.get('nodes', ())),
+                                    edges=tuple(tuple(edge) for edge in record.get('edges', ())),
+                                    duration=record.get('duration', 1))
+        self.eventProfiles[eventProfile.name] = eventProfile
+        if record.get('global', False):
+            self.events.append(eventProfile)
+
+    def addItem(self, record):
+        self.items[record['name']] = Item(record['name'], record['price'], dynamicFunc=self._function(record))
+
+    def _upgrade(self, record):
+        return VesselUpgrade(record['name'],
+                             record.get('offenseMod', 0),
+                             record.get('defenseMod', 0),
+                             record.get('capacityMod', 0),
+                             record.get('maneuverabilityMod', 0),
+                             record.get('stealthMod', 0),
+                             record.get('upgradePoints', 0),
+                             record['price'],
+                             dynamicFunc=self._function(record))
+
+    def addUpgrade(self, record):
+        self.items[record['name']] = self._upgrade(record)
+
+    def addVessel(self, record):
+        vessel = Vessel(record['name'],
+                        record.get('offense', 0),
+                        record.get('defense', 0),
+                        record.get('capacity', 0),
+                        record.get('maneuverability', 0),
+                        record.get('stealth', 0),
+                        record.get('upgradePoints', 0),
+                        record['price'],
+                        dynamicFunc=self._function(record))
+        for upgrade in record.get('upgrades', ()):
+            if isinstance(upgrade, dict):
+                vessel.addUpgrade(self._upgrade(upgrade))
+            else:
+                vessel.addUpgrade(self.items[upgrade])
+        self.items[vessel.name] = vessel
+
+    def addNode(self, record):
+        attributes = dict((key, value) for key, value in record.items() if key not in ('type', 'name'))
+        attributes['events'] = [self.eventProfiles[eventName] for eventName in record.get('events', ())]
+        self.graph.add_node(record['name'], **attributes)
+
+    def addEdge(self, record):
+        (node1, node2) = record['nodes']
+        for node in (node1, node2):
+            if node not in self.graph:
+                raise KeyError(node)
+        attributes = dict((key, value) for key, value in record.items() if key not in ('type', 'nodes'))
+        self.graph.add_edge(node1, node2, **attributes)
+
+
+def readWorldFile(filename):
+    """
+    Read a world file and return a dictionary with 'graph', 'events', and 'items'
+    (the same things a world script defines).
+    filename - Name of the world file.
+    """
+    builder = _WorldBuilder()
+    handlers = {'event': builder.addEvent,
+                'item': builder.addItem,
+                'upgrade': builder.addUpgrade,
+                'vessel': builder.addVessel,
+                'node': builder.addNode,
+                'edge': builder.addEdge}
+    for lineNumber, record in iterWorldFile(filename):
+        recordType = record['type']
+        if recordType == 'world':
+            if record.get('format', FORMAT_VERSION) != FORMAT_VERSION:
+                raise WorldFileError(filename, lineNumber, 'unsupported format {0}'.format(record['format']))
+            continue
+        handler = handlers.get(recordType)
+        if not handler:
+            raise WorldFileError(filename, lineNumber, 'unknown record type "{0}"'.format(recordType))
+        try:
+            handler(record)
+        except KeyError as e:
+            raise WorldFileError(filename, lineNumber, 'unknown name {0}'.format(e))
+        except (TypeError, ValueError, AssertionError) as e:
+            raise WorldFileError(filename, lineNumber, 'bad {0} record ({1})'.format(recordType, e))
+    return {'graph': builder.graph, 'events': builder.events, 'items': builder.items}
+
+
+def _functionRecord(record, func):
+    if func is not None:
+        name = registeredName(func)
+        if name is None:
+            raise ValueError('{0} has to be registered to be written to a world file'.format(func))
+        record['dynamicFunc'] = name
+    return record
+
+
+def _eventRecord(eventProfile, isGlobal):
+    record = {'type': 'event',
+              'name': eventProfile.name,
+              'percentChance': eventProfile.percentChance,
+              'description': eventProfile.description,
+              'duration': eventProfile.duration}
+    if isGlobal:
+        record['global'] = True
+        record['nodes'] = list(eventProfile.nodes)
+        record['edges'] = [list(edge) for edge in eventProfile.edges]
+    return _functionRecord(record, eventProfile.dynamicFunc)
+
+
+def _upgradeRecord(upgrade):
+    record = {'name': upgrade.name,
+              'offenseMod': upgrade.offenseMod,
+              'defenseMod': upgrade.defenseMod,
+              'capacityMod': upgrade.capacityMod,
+              'maneuverabilityMod': upgrade.maneuverabilityMod,
+              'stealthMod': upgrade.stealthMod,
+              'upgradePoints': upgrade.upgradePoints,
+              'price': upgrade.price}
+    return _functionRecord(record, upgrade.dynamicFunc)
+
+
+def _itemRecord(item):
+    if item.classCode() == ItemClassCode.WEAPON:
+        return dict(type='upgrade', **_upgradeRecord(item))
+    elif item.classCode() == ItemClassCode.VESSEL:
+        # Vessels are written with their base stats and re-upgraded when they are read
+        upgrades = item.upgrades
+        record = {'type': 'vessel',
+                  'name': item.name,
+                  'offense': item.offense - sum(upgrade.offenseMod for upgrade in upgrades),
+                  'defense': item.defense - sum(upgrade.defenseMod for upgrade in upgrades),
+                  'capacity': item.capacity - sum(upgrade.capacityMod for upgrade in upgrades),
+                  'maneuverability': item.maneuverability - sum(upgrade.maneuverabilityMod for upgrade in upgrades),
+                  'stealth': item.stealth - sum(upgrade.stealthMod for upgrade in upgrades),
+                  'upgradePoints': item.upgradePoints + sum(upgrade.upgradePoints for upgrade in upgrades),
+                  'price': item.price,
+                  'upgrades': [_upgradeRecord(upgrade) for upgrade in upgrades]}
+    else:
+        record = {'type': 'item', 'name': item.name, 'price': item.price}
+    return _functionRecord(record, item.dynamicFunc)
+
+
+def writeWorldFile(filename, graph, events, items):
+    """
+    Write a world out as a world file (handy for converting world scripts).
+    filename - Name of the world file to write.
+    graph - networkx graph of the world.
+    events - The global EventProfile objects.
+    items - Dictionary of item name -> Item.
+    """
+    with open(filename, 'w') as f:
+        def write(record):
+            f.write(json.dumps(record))
+            f.write('\n')
+        write({'type': 'world', 'format': FORMAT_VERSION})
+
+        written = set()
+        for eventProfile in events:
+            write(_eventRecord(eventProfile, True))
+            written.add(eventProfile.name)
+        for node in graph:
+            for eventProfile in graph.nodes[node]['events']:
+                if eventProfile.name not in written:
+                    write(_eventRecord(eventProfile, False))
+                    written.add(eventProfile.name)
+
+        for item in items.values():
+            write(_itemRecord(item))
+
+        for node in graph:
+            record = {'type': 'node', 'name': node}
+            record.update(graph.nodes[node])
+            record['events'] = [eventProfile.name for eventProfile in graph.nodes[node]['events']]
+            write(record)
+        for (node1, node2, attributes) in graph.edges(data=True):
+            record = {'type': 'edge', 'nodes': [node1, node2]}
+            record.update(attributes)
+            write(record)
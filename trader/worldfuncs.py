@@ -0,0 +1,56 @@
+"""
+Named functions that world definitions can refer to.
+Declarative world files can't contain code, so price and event functions are registered
+here under a name and world files refer to them by that name.
+"""
+from trader.memo import memoize
+
+
+_registeredFunctions: dict = {}  # name -> function object
+
+
+def registerFunction(name):
+    """
+    Decorator that registers a function (day, events) -> number under a name.
+    name - The name world files use to refer to the function.
+    """
+    def register(func):
+        assert(name not in _registeredFunctions or _registeredFunctions[name] is func)
+        _registeredFunctions[name] = func
+        return func
+    return register
+
+
+def registeredFunction(name):
+    """Return the function registered under name.  Raises KeyError if there isn't one."""
+    return _registeredFunctions[name]
+
+
+def registeredName(func):
+    """Return the name a function was registered under (or None if it wasn't)."""
+    for name, registered in _registeredFunctions.items():
+        if registered is func:
+            return name
+    return None
+
+
+@registerFunction('guns_price')
+@memoize(period=1)
+def GunsPriceFunc(day, events):
+    offset = 0
+    if 'civil_war' in events:
+        offset += 20
+    if 'mars_earth_war' in events:
+        offset += 20
+    return offset
+
+
+@registerFunction('butter_price')
+@memoize(period=100)
+def ButterPriceFunc(day, events):
+    offset = 0
+    if day % 100 > 90:
+        offset += 10
+    if 'famine' in events:
+        offset += 10
+    return offset
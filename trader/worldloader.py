@@ -0,0 +1,256 @@
+import builtins
+import hashlib
+import importlib
+import marshal
+import os
+import pickle
+import sys
+import types
+import networkx as nx
+from trader.csrgraph import CSRGraph
+from trader.distanceoracle import DistanceOracle
+from trader.eventindex import EventIndex
+from trader.inventory import registerItems
+from trader.routing import RoutePlanner
+from trader.worldfile import readWorldFile
+
+
+DEFAULT_WORLD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'world.py')
+
+# Bump this whenever the layout of a pickled World changes so stale cache files are ignored
+CACHE_FORMAT_VERSION = 5
+
+
+def readCustomWorld(filename: str) -> dict:
+    worldGlobals: dict = {}
+    with open(filename) as f:
+        code = compile(f.read(), filename, 'exec')
+        exec(code, worldGlobals)
+    return worldGlobals
+
+
+class World:
+    """
+    Everything about a game that does not change while it is played:
+    the graph, the item catalog, the event profiles, and the indexes built from them.
+    A World is loaded once and can be referenced by any number of Game objects.
+    """
+    def __init__(self, graph, eventProfiles, items, source=None, sourceHash=None):
+        """
+        graph - networkx graph of the world.  Only the CSRGraph built from it is kept (see toNetworkx).
+        eventProfiles - The global EventProfile objects.
+        items - Dictionary of item name -> Item for everything that can be bought and sold.
+                The World keeps a read only view of it and freezes the items.
+        source - Name of the file the world was loaded from (if any).
+        sourceHash - Hash of the contents of that file (if any).
+        """
+        self.csr = CSRGraph(graph)
+        # Shortest paths and route searches with the world's own edge weights.  Games share these
+        # and only make their own copies when they change an edge weight (see Game.setEdgeWeight).
+        self.distanceOracle = DistanceOracle(self.csr)
+        refuelNodes = [node for node in self.csr if self.csr.nodeAttributes(node).get('refuel')]
+        self.routePlanner = RoutePlanner(self.csr, self.distanceOracle, refuelNodes=refuelNodes)
+        self.eventProfiles = tuple(eventProfiles)
+        for item in items.values():
+            item.freeze()
+        self.items = types.MappingProxyType(dict(items))
+        registerItems(['fuel'] + list(items))  # So the goods everybody deals in get the low ids
+        self.source = source
+        self.sourceHash = sourceHash
+        self.eventIndex = EventIndex(self.csr, self.eventProfiles)
+
+        # How many days back we have to look to know what events are still going on.
+        # Constant chance profiles know when their next occurrence is so only dynamic ones count.
+        allEventProfiles = list(self.eventProfiles) + [eventProfile
+                                                       for node in self.csr
+                                                       for eventProfile in self.csr.nodeAttributes(node)['events']]
+        self.eventLookback = max([eventProfile.duration for eventProfile in allEventProfiles
+                                  if eventProfile.isDynamic()] + [0])
+
+    def toNetworkx(self):
+        """
+        Return a new networkx graph of the world, built from the CSRGraph (for world authoring tools
+        and anything else that wants networkx's algorithms).  Games never need one.
+        """
+        return self.csr.toNetworkx()
+
+    @property
+    def graph(self):
+        """A frozen networkx graph of the world.  It is built every time it is asked for (see toNetworkx)."""
+        return nx.freeze(self.toNetworkx())
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['items'] = dict(self.items)  # Mapping proxies can't be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.items = types.MappingProxyType(self.items)
+
+    @classmethod
+    def fromGlobals(cls, worldGlobals, source=None, sourceHash=None):
+        """
+        Build a World from the globals left behind by running a world script.
+        worldGlobals - Dictionary with 'graph', 'events', and 'items'.
+        """
+        return cls(worldGlobals['graph'], worldGlobals['events'], worldGlobals['items'], source, sourceHash)
+
+
+class _WorldPickler(pickle.Pickler):
+    """
+    Pickler that can save the functions a world script defines (price functions and so on).
+    Those functions don't live in an importable module so they are saved as marshalled code.
+    """
+    def __init__(self, f, worldGlobals):
+        pickle.Pickler.__init__(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._worldGlobals = worldGlobals
+        self.functions = []  # The world script functions pickled so far
+
+    def persistent_id(self, obj):
+        if isinstance(obj, types.FunctionType) and obj.__globals__ is self._worldGlobals:
+            if obj.__closure__:
+                raise pickle.PicklingError('Cannot cache closure {0}'.format(obj.__name__))
+            self.functions.append(obj)
+            return ('world-function', obj.__name__, marshal.dumps(obj.__code__), obj.__defaults__)
+        return None
+
+
+class _WorldUnpickler(pickle.Unpickler):
+    """Unpickler that rebuilds world script functions saved by _WorldPickler."""
+    def __init__(self, f):
+        pickle.Unpickler.__init__(self, f)
+        self.worldGlobals = {'__builtins__': builtins}  # Shared by every rebuilt function, like the script's globals
+
+    def persistent_load(self, pid):
+        (tag, name, code, defaults) = pid
+        if tag != 'world-function':
+            raise pickle.UnpicklingError('Unknown persistent id {0}'.format(tag))
+        function = types.FunctionType(marshal.loads(code), self.worldGlobals, name, defaults)
+        self.worldGlobals[name] = function
+        return function
+
+
+def _codeNames(code):
+    """Return the names a code object (and any code nested in it) could look up as globals."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _codeNames(const)
+    return names
+
+
+def _scriptContext(worldGlobals, names):
+    """
+    Return the (modules, values) of the script globals out of names.
+    modules - Dictionary of global name -> module name.
+    values - Dictionary of global name -> any other value (dictionaries, helper functions, and so on).
+    """
+    modules = {}
+    values = {}
+    for name in names:
+        if name.startswith('__') or name not in worldGlobals:
+            continue
+        value = worldGlobals[name]
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+        else:
+            values[name] = value
+    return (modules, values)
+
+
+def _cachePath(cacheDir, filename, sourceHash):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cacheDir, '{0}-{1}-{2}.world'.format(stem, sourceHash[:16], sys.implementation.cache_tag))
+
+
+def _readCache(path):
+    """Return the World saved at path (or None if there isn't a usable one)."""
+    try:
+        with open(path, 'rb') as f:
+            unpickler = _WorldUnpickler(f)
+            if unpickler.load() != CACHE_FORMAT_VERSION:
+                return None
+            world = unpickler.load()
+            context = unpickler.load()
+            while context is not None:
+                (modules, values) = context
+                for name, moduleName in modules.items():
+                    unpickler.worldGlobals[name] = importlib.import_module(moduleName)
+                unpickler.worldGlobals.update(values)
+                context = unpickler.load()
+    except (OSError, EOFError, ImportError, pickle.UnpicklingError, ValueError):
+        return None
+    return world
+
+
+def _writeCache(path, world, worldGlobals):
+    """
+    Save a World at path.  Worlds that can't be pickled just don't get cached.
+    The file holds the version, the World, and then rounds of (modules, values) for the script globals
+    the pickled functions use, ended by None.  Pickling the values of one round can turn up more
+    functions (helpers) whose globals go in the next round.
+    """
+    tmpPath = '{0}.{1}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmpPath, 'wb') as f:
+            pickler = _WorldPickler(f, worldGlobals)
+            pickler.dump(CACHE_FORMAT_VERSION)
+            pickler.dump(world)
+            known = set()
+            checked = 0
+            while checked < len(pickler.functions):
+                names = set()
+                for function in pickler.functions[checked:]:
+                    names |= _codeNames(function.__code__)
+                checked = len(pickler.functions)
+                names -= known
+                known |= names
+                pickler.dump(_scriptContext(worldGlobals, names))
+            pickler.dump(None)
+        os.replace(tmpPath, path)
+    except (pickle.PicklingError, TypeError, AttributeError, ValueError):
+        os.remove(tmpPath)
+
+
+def _fileHash(filename):
+    """Return the sha256 of a file's contents, read a block at a time so big world files aren't held in memory."""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+_loadedWorlds: dict = {}  # (absolute file name, source hash) -> World
+
+
+def loadWorld(filename=None, cacheDir=None):
+    """
+    Return the World defined by a world script or world file, loading it at most once per process.
+    filename - Name of a Python script that defines a world, or of a declarative world file
+               (.jsonl, see trader.worldfile).  Defaults to trader/world.py.
+    cacheDir - Directory for compiled world files.  If given, a world whose script hasn't changed
+               (same hash) is read from there instead of running the script again.
+    """
+    filename = os.path.abspath(filename or DEFAULT_WORLD)
+    sourceHash = _fileHash(filename)
+    key = (filename, sourceHash)
+    world = _loadedWorlds.get(key)
+    if world:
+        return world
+
+    cachePath = _cachePath(cacheDir, filename, sourceHash) if cacheDir else None
+    if cachePath and os.path.exists(cachePath):
+        world = _readCache(cachePath)
+    if not world:
+        if filename.endswith('.jsonl'):
+            worldGlobals = readWorldFile(filename)
+        else:
+            worldGlobals = readCustomWorld(filename)
+        world = World.fromGlobals(worldGlobals, filename, sourceHash)
+        if cachePath:
+            os.makedirs(cacheDir, exist_ok=True)
+            _writeCache(cachePath, world, worldGlobals)
+    _loadedWorlds[key] = world
+    return world